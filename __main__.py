@@ -7,7 +7,7 @@ Copyright (c) 2019 Davod (Amitie 10g)
 
 Licensed under the MIT license. See LICENSE for details
 
-Usage: python3 pywikibot/pwb.py __main.py__ [-i <Wikidata item> -t <TOP500 id> | --mass] num
+Usage: python3 pywikibot/pwb.py __main.py__ [--incremental] [--priority] [--resolve] [-i <Wikidata item> -t <TOP500 id> | --mass num | --export <file> | --quickstatements <file> | --ingest <file> ... | --from-file <file> [--jobs N] | --daemon [--consumer <name>] | --query <field>[=<value>] | --reindex | --metrics | --review | --changes <group> [--consumer <name>] | --warm <range> | --replay] [--adaptive] [--enqueue] [--journal | --async] [--max-runtime <seconds>] [--max-edits N] [--profile <file>] [--profile-sample <file>] [--tracemalloc N]
 """
 
 # :: Prepare
@@ -16,13 +16,17 @@ try:
         # :: Import standard libraries
         try:
             import sys
+            import json
             import getopt
+            import signal
+            import importlib
         except ModuleNotFoundError as e:
             sys.stderr.write(str(e) + '\n')
             sys.exit(1)
 
-        # Import local library
+        # Import local libraries
         from library import Top500Importer
+        import profiling
 
         # :: Check Python version (3.5 or above)
         if sys.version_info < (3, 5):
@@ -41,13 +45,26 @@ try:
             status_page = config.config['status_page']
             redis_server = config.config['redis_server']
             redis_port = config.config['redis_port']
+            job_queue = config.config['job_queue']
+            cache_backend = config.config['cache_backend']
+            cache_path = config.config['cache_path']
+            warm_workers = config.config['warm_workers']
+            warm_delay = config.config['warm_delay']
+            fetch_floor = config.config['fetch_floor']
+            fetch_ceiling = config.config['fetch_ceiling']
+            fetch_target_latency = config.config['fetch_target_latency']
+            journal_path = config.config['journal_path']
+            targets = config.config['targets']
+            drain_timeout = config.config['drain_timeout']
+            save_backlog = config.config['save_backlog']
+            resolver_index = config.config['resolver_index']
         except (NameError, IndexError) as e:
             sys.stderr.write(str(e) + '\n')
             sys.exit(1)
 
         # :: Get args
         argv = sys.argv[1:]
-        usage = 'Usage: python3 pywikibot/pwb.py __main.py__ [-i <Wikidata item> -t <TOP500 id> | --mass] num\n'
+        usage = 'Usage: python3 pywikibot/pwb.py __main.py__ [--incremental] [--priority] [--resolve] [-i <Wikidata item> -t <TOP500 id> | --mass num | --export <file> | --quickstatements <file> | --ingest <file> ... | --from-file <file> [--jobs N] | --daemon [--consumer <name>] | --query <field>[=<value>] | --reindex | --metrics | --review | --changes <group> [--consumer <name>] | --warm <range> | --replay] [--adaptive] [--enqueue] [--journal | --async] [--max-runtime <seconds>] [--max-edits N] [--profile <file>] [--profile-sample <file>] [--tracemalloc N]\n'
 
         # :: Parse args
         if argv == []:
@@ -55,18 +72,84 @@ try:
             sys.exit(0)
 
         try:
-            opts, args = getopt.getopt(argv, "i:t:", "mass")
+            opts, args = getopt.getopt(argv, "i:t:", ["mass", "export=", "quickstatements=", "incremental", "priority", "ingest", "daemon", "enqueue", "from-file=", "jobs=", "adaptive", "query=", "reindex", "metrics", "review", "changes=", "consumer=", "resolve", "warm=", "journal", "async", "replay", "max-runtime=", "max-edits=", "profile=", "profile-sample=", "tracemalloc="])
             args2 = []
+            incremental = False
+            priority = False
+            resolve = False
+            adaptive = False
+            consumer = None
+            enqueue = False
+            jobs = 1
+            use_journal = False
+            use_async = False
+            max_runtime = None
+            max_edits = None
+            profile_stats = None
+            profile_sample = None
+            tracemalloc_every = 0
             for opt, arg in opts:
                 if opt in ("-i", "-t"):
                     args2.append(arg)
+                elif opt == "--incremental":
+                    incremental = True
+                elif opt == "--priority":
+                    priority = True
                 elif opt in "--mass":
                     try:
-                        args2 = ['mass', argv[1]]
+                        args2 = ['mass', args[0]]
                     except (ValueError, IndexError):
                         args2 = ['mass', 0]
-
-        except getopt.GetoptError:
+                elif opt == "--export":
+                    args2 = ['export', arg]
+                elif opt == "--quickstatements":
+                    args2 = ['quickstatements', arg]
+                elif opt == "--ingest":
+                    args2 = ['ingest'] + args
+                elif opt == "--daemon":
+                    args2 = ['daemon']
+                elif opt == "--enqueue":
+                    enqueue = True
+                elif opt == "--from-file":
+                    args2 = ['batch', arg]
+                elif opt == "--jobs":
+                    jobs = arg
+                elif opt == "--adaptive":
+                    adaptive = True
+                elif opt == "--query":
+                    args2 = ['query'] + arg.split('=', 1)
+                elif opt == "--reindex":
+                    args2 = ['reindex']
+                elif opt == "--metrics":
+                    args2 = ['metrics']
+                elif opt == "--review":
+                    args2 = ['review']
+                elif opt == "--changes":
+                    args2 = ['changes', arg]
+                elif opt == "--consumer":
+                    consumer = arg
+                elif opt == "--resolve":
+                    resolve = True
+                elif opt == "--warm":
+                    args2 = ['warm', arg]
+                elif opt == "--journal":
+                    use_journal = True
+                elif opt == "--replay":
+                    args2 = ['replay']
+                elif opt == "--async":
+                    use_async = True
+                elif opt == "--max-runtime":
+                    max_runtime = float(arg)
+                elif opt == "--max-edits":
+                    max_edits = int(arg)
+                elif opt == "--profile":
+                    profile_stats = arg
+                elif opt == "--profile-sample":
+                    profile_sample = arg
+                elif opt == "--tracemalloc":
+                    tracemalloc_every = int(arg)
+
+        except (getopt.GetoptError, ValueError):
             print(usage)
             sys.exit(0)
 
@@ -74,6 +157,13 @@ try:
             print(usage)
             sys.exit(0)
 
+        # With --enqueue, -i/-t are added to the daemon queue instead
+        if enqueue and len(args2) == 2:
+            args2 = ['enqueue'] + args2
+
+        # Modes that only work with the local cache, and don't touch the status page
+        offline_modes = ('export', 'quickstatements', 'ingest', 'enqueue', 'query', 'reindex', 'metrics', 'review', 'changes', 'warm')
+
         # :: Call the Top500Importer object
         try:
             top500importer = Top500Importer(
@@ -84,7 +174,11 @@ try:
                 instance_of,
                 top500url,
                 log_page,
-                status_page)
+                status_page,
+                job_queue,
+                lazy=args2[0] in offline_modes or args2[0] == 'daemon',
+                cache_backend=cache_backend,
+                cache_path=cache_path)
         except TypeError as e:
             sys.stderr.write(str(e) + '\n')
             sys.exit(1)
@@ -95,6 +189,62 @@ try:
         except (NameError, AttributeError):
             pass
 
+        # :: Write-ahead journal: edits are journaled, and applied in background
+        if use_journal or args2[0] == 'replay':
+            if not top500importer.useJournal(journal_path):
+                sys.exit(1)
+
+            if use_journal and args2[0] != 'replay':
+                top500importer.startApplier()
+
+        # :: Background save queue: edits are saved while the next systems are fetched
+        elif use_async and args2[0] not in offline_modes:
+            top500importer.useSaveQueue(save_backlog)
+
+        # :: Adaptive concurrency of the TOP500 requests (AIMD)
+        if adaptive:
+            top500importer.useAdaptiveConcurrency(fetch_floor, fetch_ceiling, fetch_target_latency)
+
+        # :: Resolver for the strings missing from slist.py
+        if resolve and args2[0] not in offline_modes:
+            if not top500importer.useResolver(resolver_index):
+                sys.exit(1)
+
+        # :: Other Wikibase targets, fed from the same fetch in parallel writers
+        if args2[0] not in offline_modes and args2[0] != 'replay':
+            for target in targets:
+                try:
+                    importer = Top500Importer(
+                        target['site'],
+                        target['lang'],
+                        redis_server,
+                        redis_port,
+                        target.get('instance_of', instance_of),
+                        top500url,
+                        target['log_page'],
+                        target['status_page'],
+                        job_queue,
+                        lazy=True,
+                        mapping=importlib.import_module(target['mapping']),
+                        target=target['name'],
+                        store=top500importer.cache)
+                except (ImportError, KeyError, TypeError) as e:
+                    sys.stderr.write(str(e) + '\n')
+                    sys.exit(1)
+
+                top500importer.addTarget(importer, target.get('delay', 0))
+
+        # :: Run budget: on SIGTERM (eg. grid job killed) or once reached, stop taking
+        # new systems, finish the current one and drain for drain_timeout seconds at most
+        # (only the modes checking it; the others are just terminated)
+        top500importer.setBudget(max_runtime, max_edits, drain_timeout)
+        if args2[0] not in offline_modes and args2[0] != 'replay':
+            signal.signal(signal.SIGTERM, top500importer.requestStop)
+
+        # :: Profiling: snapshots every N items
+        if tracemalloc_every > 0:
+            top500importer.memory_tracker = profiling.MemoryTracker(tracemalloc_every)
+
     except KeyboardInterrupt as e:
         sys.stderr.write(str(e) + '\n')
         sys.exit(1)
@@ -109,9 +259,39 @@ try:
         if args2[0] == 'mass':
             top500importer.updateStatus(0)
 
-            if top500importer.mass(args2[1]):
+            with profiling.profiled(profile_stats, profile_sample):
+                done = top500importer.mass(args2[1], incremental, priority)
+
+            if done:
                 print('Everything OK\n')
 
+            top500importer.stopWriters()
+
+            try:
+                system_status = top500importer.qstat()
+                if system_status.returncode == 0:
+                    sys.exit(128)
+
+                else:
+                    sys.exit(2)
+
+            except FileNotFoundError:
+                sys.exit(2)
+
+        # :: Batch import from a file of -i/-t pairs
+        elif args2[0] == 'batch':
+            top500importer.updateStatus(0)
+
+            with profiling.profiled(profile_stats, profile_sample):
+                done = top500importer.batch(args2[1], jobs, incremental)
+
+            if not done:
+                sys.exit(1)
+
+            top500importer.stopWriters()
+
+            print('Everything OK\n')
+
             try:
                 system_status = top500importer.qstat()
                 if system_status.returncode == 0:
@@ -123,12 +303,132 @@ try:
             except FileNotFoundError:
                 sys.exit(2)
 
+        # :: Daemon, consuming -i/-t jobs from Redis with a single login
+        elif args2[0] == 'daemon':
+            # The status page is updated on the first job, so the login is deferred
+            with profiling.profiled(profile_stats, profile_sample):
+                done = top500importer.daemon(incremental=incremental, worker=consumer)
+
+            if not done:
+                sys.exit(1)
+
+            # Stopped by SIGTERM or the run budget
+            top500importer.stopWriters()
+            sys.exit(2)
+
+        # :: Add a job to the daemon queue (no Wiki edits)
+        elif args2[0] == 'enqueue':
+            if not top500importer.enqueueJob(args2[2], args2[1]):
+                sys.exit(1)
+
+            sys.exit(0)
+
+        # :: Replay the edits left pending in the journal
+        elif args2[0] == 'replay':
+            top500importer.updateStatus(0)
+
+            applied = top500importer.applyJournal()
+            print(str(applied) + ' edits applied\n')
+            sys.exit(0)
+
+        # :: Cache warmer, fetching ranges ahead of the writers (no Wiki edits)
+        elif args2[0] == 'warm':
+            ranges = top500importer.parseRanges(args2[1])
+            if not ranges:
+                print(usage)
+                sys.exit(1)
+
+            if not top500importer.warm(ranges, warm_workers, warm_delay):
+                sys.exit(1)
+
+            sys.exit(0)
+
+        # :: Query the local indexes (no Wiki edits)
+        elif args2[0] == 'query':
+            result = top500importer.query(*args2[1:3])
+            if result is False:
+                print(usage)
+                sys.exit(1)
+
+            print('\n'.join(result))
+            sys.exit(0)
+
+        # :: Rebuild the local indexes (no Wiki edits)
+        elif args2[0] == 'reindex':
+            indexed = top500importer.rebuildIndex()
+            if indexed is False:
+                sys.exit(1)
+
+            print(str(indexed) + ' systems indexed\n')
+            sys.exit(0)
+
+        # :: Derived metrics of the cached systems (no Wiki edits)
+        elif args2[0] == 'metrics':
+            saved = top500importer.updateMetrics()
+            if saved is False:
+                sys.exit(1)
+
+            print(str(saved) + ' systems saved\n')
+            sys.exit(0)
+
+        # :: Follow the change feed, as a member of a consumer group (no Wiki edits)
+        elif args2[0] == 'changes':
+            handled = top500importer.followChanges(args2[1], lambda event: print(json.dumps(event, sort_keys=True), flush=True), consumer)
+            if handled is False:
+                sys.exit(1)
+
+            sys.exit(0)
+
+        # :: Strings resolved remotely, waiting for review (no Wiki edits)
+        elif args2[0] == 'review':
+            entries = top500importer.reviewQueue()
+            if entries is False:
+                sys.exit(1)
+
+            for entry in entries:
+                candidates = ', '.join(str(candidate['id']) + ' (' + str(candidate['label']) + ')' for candidate in entry['candidates'])
+                print(entry['text'] + '\t' + str(entry['item'] or '-') + '\t' + candidates)
+
+            print(str(len(entries)) + ' strings to review\n')
+            sys.exit(0)
+
+        # :: Snapshot export (no Wiki edits)
+        elif args2[0] == 'export':
+            rows = top500importer.exportSnapshot(args2[1])
+            if rows is False:
+                sys.exit(1)
+
+            print(str(rows) + ' rows exported\n')
+            sys.exit(0)
+
+        # :: QuickStatements export (no Wiki edits)
+        elif args2[0] == 'quickstatements':
+            systems = top500importer.exportQuickStatements(args2[1])
+            if systems is False:
+                sys.exit(1)
+
+            print(str(systems) + ' systems exported\n')
+            sys.exit(0)
+
+        # :: Bulk ingest from list files (no Wiki edits)
+        elif args2[0] == 'ingest':
+            saved = top500importer.ingest(args2[1:])
+            if saved is False:
+                sys.exit(1)
+
+            print(str(saved) + ' systems saved\n')
+            sys.exit(0)
+
         # :: One-file import
         else:
             if len(args2) == 2:
                 top500importer.updateStatus(0)
 
-                if top500importer.main(args2[1], args2[0]):
+                with profiling.profiled(profile_stats, profile_sample):
+                    done = top500importer.main(args2[1], args2[0], incremental)
+
+                if done:
+                    top500importer.stopWriters()
                     print('Everything OK\n')
 
                     try:
@@ -161,5 +461,10 @@ try:
             sys.exit(2)
 
 except SystemExit as e:
-    top500importer.updateStatus(e.code)
+    # Stop the writers after the edit in progress; journaled edits stay for --replay
+    top500importer.stopWriters(drain=False)
+
+    # An idle daemon never logged in
+    if args2[0] not in offline_modes and (args2[0] != 'daemon' or top500importer.connected):
+        top500importer.updateStatus(e.code)
     sys.exit(0) # This, to avoid restart the task
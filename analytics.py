@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+Derived metrics of every cached system, computed from the whole Rank
+history at once with NumPy (needs numpy):
+
+* best_rank, best_list: the best rank ever, and the first list it was reached
+* first_list, last_list: the first and last list the system appears in
+* peak_rmax: the highest Rmax, in GFlops
+* efficiency: Rmax/Rpeak at the last list
+* growth: compound annual Rmax growth between the first and last list
+* curve: [list, Rmax in GFlops] pairs, in list order
+
+The corpus is loaded into flat arrays once (see records.SystemRecord), and
+every metric is a vectorized pass over them. Results are saved as JSON at
+top500-metrics-<ID>, where planItem() picks the best rank up as ranking.
+
+Copyright (c) 2019 Davod (Amitie 10g)
+
+Licensed under the MIT license. See LICENSE for details
+"""
+
+# :: Standard libraries
+import json
+
+# :: Third party libraries (optional)
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# :: Local libraries
+import records
+
+prefix = 'top500-metrics-'
+
+def loadArrays(corpus):
+    """Flatten the Rank tables of a corpus into arrays.
+
+    Parameters
+    ----------
+    corpus : dict
+        Pairs of ID=>SystemRecord, as returned by records.loadCorpus().
+
+    Returns
+    -------
+    tuple
+        (IDs, dict of row arrays: 'system' (index in IDs), 'lists', 'ranks', 'rmax', 'rpeak').
+    """
+
+    if numpy is None:
+        raise ImportError('Error: NumPy is needed for the metrics.')
+
+    identifiers = sorted(corpus, key=lambda identifier: int(identifier) if identifier.isdigit() else 0)
+    systems = [corpus[identifier] for identifier in identifiers]
+    counts = numpy.array([len(record.lists) for record in systems], dtype=numpy.int64)
+
+    def column(name, dtype):
+        if not systems:
+            return numpy.empty(0, dtype=dtype)
+        return numpy.concatenate([numpy.asarray(getattr(record, name), dtype=dtype) for record in systems])
+
+    rows = {
+        'system':numpy.repeat(numpy.arange(len(systems)), counts),
+        'lists':column('lists', numpy.int64),
+        'ranks':column('ranks', numpy.int64),
+        'rmax':column('rmax', numpy.float64),
+        'rpeak':column('rpeak', numpy.float64),
+    }
+
+    return identifiers, rows
+
+def computeMetrics(identifiers, rows):
+    """Compute the metrics of every system.
+
+    Parameters
+    ----------
+    identifiers : list
+        The IDs, as returned by loadArrays().
+    rows : dict
+        The row arrays, as returned by loadArrays().
+
+    Returns
+    -------
+    dict
+        Pairs of ID=>metrics; systems without valid Rank rows are left out.
+    """
+
+    # Odd rows (see records.SystemRecord.addRow()) are stored as rank 0 and NaN
+    valid = (rows['ranks'] > 0) & numpy.isfinite(rows['rmax']) & numpy.isfinite(rows['rpeak'])
+    system = rows['system'][valid]
+    lists = rows['lists'][valid]
+    order = numpy.lexsort((lists, system))
+
+    system = system[order]
+    lists = lists[order]
+    ranks = rows['ranks'][valid][order]
+    rmax = rows['rmax'][valid][order]
+    rpeak = rows['rpeak'][valid][order]
+
+    if len(system) == 0:
+        return {}
+
+    # One segment of rows per system, in list order
+    boundary = numpy.r_[True, system[1:] != system[:-1]]
+    starts = numpy.flatnonzero(boundary)
+    ends = numpy.r_[starts[1:], len(system)] - 1
+    segment = numpy.cumsum(boundary) - 1
+
+    best_rank = numpy.minimum.reduceat(ranks, starts)
+    positions = numpy.where(ranks == best_rank[segment], numpy.arange(len(ranks)), len(ranks))
+    best_list = lists[numpy.minimum.reduceat(positions, starts)]
+
+    first_list = lists[starts]
+    last_list = lists[ends]
+    peak_rmax = numpy.maximum.reduceat(rmax, starts)
+
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        efficiency = numpy.where(rpeak[ends] > 0, rmax[ends] / rpeak[ends], numpy.nan)
+        months = last_list - first_list
+        growth = numpy.where((months > 0) & (rmax[starts] > 0),
+                             (rmax[ends] / rmax[starts]) ** (12.0 / numpy.maximum(months, 1)) - 1, numpy.nan)
+
+    curves = zip(numpy.split(lists, starts[1:]), numpy.split(rmax, starts[1:]))
+
+    metrics = {}
+    for i, curve in enumerate(curves):
+        metrics[identifiers[system[starts[i]]]] = {
+            'best_rank':int(best_rank[i]),
+            'best_list':listName(best_list[i]),
+            'first_list':listName(first_list[i]),
+            'last_list':listName(last_list[i]),
+            'peak_rmax':float(peak_rmax[i]),
+            'efficiency':None if numpy.isnan(efficiency[i]) else float(efficiency[i]),
+            'growth':None if numpy.isnan(growth[i]) else float(growth[i]),
+            'curve':[[listName(packed), float(value)] for packed, value in zip(curve[0], curve[1])],
+        }
+
+    return metrics
+
+def listName(packed):
+    """Write a packed month as list date (mm/YYYY)."""
+
+    year, month = records.unpackMonth(int(packed))
+    return '%02d/%d' % (month, year)
+
+def storeMetrics(store, metrics, batch_size=500):
+    """Save the metrics next to the systems, at top500-metrics-<ID>.
+
+    Parameters
+    ----------
+    store : object
+        The cache backend (see cache.py).
+    metrics : dict
+        Pairs of ID=>metrics, as returned by computeMetrics().
+    batch_size : int
+        The amount of systems saved at once.
+
+    Returns
+    -------
+    int
+        The amount of systems saved.
+    """
+
+    pairs = {}
+    for identifier, values in metrics.items():
+        pairs[prefix + identifier] = json.dumps(values)
+        if len(pairs) >= batch_size:
+            store.setMany(pairs)
+            pairs = {}
+
+    if pairs:
+        store.setMany(pairs)
+
+    return len(metrics)
+
+def getMetrics(store, identifier):
+    """Get the saved metrics of a system; None if not computed."""
+
+    try:
+        return json.loads(store.get(prefix + str(identifier)))
+    except (json.JSONDecodeError, TypeError):
+        return None
+
+def updateMetrics(store, batch_size=500):
+    """Compute and save the metrics of every cached system.
+
+    Parameters
+    ----------
+    store : object
+        The cache backend (see cache.py).
+    batch_size : int
+        The amount of systems fetched and saved at once.
+
+    Returns
+    -------
+    int
+        The amount of systems saved.
+    """
+
+    identifiers, rows = loadArrays(records.loadCorpus(store, batch_size))
+    return storeMetrics(store, computeMetrics(identifiers, rows), batch_size)
@@ -0,0 +1,363 @@
+# -*- coding: utf-8 -*-
+"""
+Cache backends for the scraped TOP500 data: Redis, SQLite and a local
+memory-mapped store (LMDB if installed, the standard dbm otherwise).
+
+All of them store strings by key, plus small sets of strings, so the
+importer doesn't need to know where the data lives. Features that need
+a Redis server (queues, streams, locks) use the 'client' attribute,
+which is None for the local backends.
+
+Copyright (c) 2019 Davod (Amitie 10g)
+
+Licensed under the MIT license. See LICENSE for details
+"""
+
+# :: Standard libraries
+import dbm
+import sqlite3
+import threading
+
+# :: Third party libraries
+import redis
+
+try:
+    import lmdb
+except ImportError:
+    lmdb = None
+
+# :: Exceptions raised by any backend, to be used in except clauses
+errors = (redis.exceptions.RedisError, sqlite3.Error) + tuple(dbm.error)
+if lmdb is not None:
+    errors = errors + (lmdb.Error,)
+
+def openCache(backend, redis_server='localhost', redis_port=6379, path='top500.cache'):
+    """Open the cache backend selected at config.py.
+
+    Parameters
+    ----------
+    backend : str
+        'redis', 'sqlite' or 'mmap'.
+    redis_server : str
+        The Redis server address.
+    redis_port : int
+        The Redis server port.
+    path : str
+        The file for the local backends.
+
+    Returns
+    -------
+    object
+        The cache backend.
+    """
+
+    if backend == 'sqlite':
+        return SQLiteCache(path)
+    if backend in ('mmap', 'dbm', 'lmdb'):
+        return MmapCache(path)
+    if backend == 'redis':
+        return RedisCache(redis_server, redis_port)
+
+    raise ValueError('Error: Unknown cache backend: ' + str(backend))
+
+class RedisCache:
+    """Cache stored at a Redis server."""
+
+    def __init__(self, redis_server, redis_port):
+        """Parameters
+        ----------
+        redis_server : str
+            The Redis server address.
+        redis_port : int
+            The Redis server port.
+        """
+
+        self.client = redis.Redis(host=redis_server, port=redis_port, db=0)
+
+    def get(self, key):
+        """Get a value; None if not found."""
+
+        value = self.client.get(key)
+        return value.decode('utf-8') if value is not None else None
+
+    def getMany(self, keys):
+        """Get several values at once, in the same order; None for the ones not found."""
+
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.get(key)
+        return [value.decode('utf-8') if value is not None else None for value in pipe.execute()]
+
+    def set(self, key, value):
+        """Set a value."""
+
+        self.client.set(key, value)
+
+    def setMany(self, pairs):
+        """Set several Key=>Value pairs at once."""
+
+        pipe = self.client.pipeline()
+        for key, value in pairs.items():
+            pipe.set(key, value)
+        pipe.execute()
+
+    def delete(self, key):
+        """Delete a value."""
+
+        self.client.delete(key)
+
+    def scan(self, prefix, count=500):
+        """Iterate over the keys starting with prefix, without loading all of them."""
+
+        for key in self.client.scan_iter(match=prefix + '*', count=count):
+            yield key.decode('utf-8')
+
+    def sadd(self, key, *members):
+        """Add members to a set."""
+
+        if members:
+            self.client.sadd(key, *members)
+
+    def srem(self, key, *members):
+        """Remove members from a set."""
+
+        if members:
+            self.client.srem(key, *members)
+
+    def smembers(self, key):
+        """Get the members of a set; empty if not found."""
+
+        return {member.decode('utf-8') for member in self.client.smembers(key)}
+
+class SQLiteCache:
+    """Cache stored at a local SQLite database, in WAL mode."""
+
+    client = None
+
+    def __init__(self, path):
+        """Parameters
+        ----------
+        path : str
+            The database file.
+        """
+
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute('CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID')
+        self.db.execute('CREATE TABLE IF NOT EXISTS sets (key TEXT, member TEXT, PRIMARY KEY (key, member)) WITHOUT ROWID')
+
+    def get(self, key):
+        """Get a value; None if not found."""
+
+        with self.lock:
+            row = self.db.execute('SELECT value FROM kv WHERE key = ?', (key,)).fetchone()
+        return row[0] if row is not None else None
+
+    def getMany(self, keys):
+        """Get several values at once, in the same order; None for the ones not found."""
+
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value):
+        """Set a value."""
+
+        self.setMany({key:value})
+
+    def setMany(self, pairs):
+        """Set several Key=>Value pairs at once."""
+
+        with self.lock:
+            with self.db:
+                self.db.execute('BEGIN')
+                self.db.executemany('INSERT OR REPLACE INTO kv (key, value) VALUES (?, ?)', pairs.items())
+
+    def delete(self, key):
+        """Delete a value."""
+
+        with self.lock:
+            self.db.execute('DELETE FROM kv WHERE key = ?', (key,))
+
+    def scan(self, prefix, count=500):
+        """Iterate over the keys starting with prefix, without loading all of them."""
+
+        # Keys are fetched in pages, so the database isn't locked during the whole iteration
+        last = prefix
+        while True:
+            with self.lock:
+                rows = self.db.execute('SELECT key FROM kv WHERE key > ? AND key < ? ORDER BY key LIMIT ?',
+                                       (last, prefix + '\uffff', count)).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield row[0]
+            last = rows[-1][0]
+
+    def sadd(self, key, *members):
+        """Add members to a set."""
+
+        with self.lock:
+            self.db.executemany('INSERT OR IGNORE INTO sets (key, member) VALUES (?, ?)', [(key, str(m)) for m in members])
+
+    def srem(self, key, *members):
+        """Remove members from a set."""
+
+        with self.lock:
+            self.db.executemany('DELETE FROM sets WHERE key = ? AND member = ?', [(key, str(m)) for m in members])
+
+    def smembers(self, key):
+        """Get the members of a set; empty if not found."""
+
+        with self.lock:
+            rows = self.db.execute('SELECT member FROM sets WHERE key = ?', (key,)).fetchall()
+        return {row[0] for row in rows}
+
+class MmapCache:
+    """Cache stored at a local memory-mapped file: LMDB if installed, dbm otherwise.
+    Every member of a set is stored under its own key ('set:<key>\\0<member>'),
+    so adding or removing one doesn't rewrite the whole set."""
+
+    client = None
+
+    def __init__(self, path):
+        """Parameters
+        ----------
+        path : str
+            The database file (a directory for LMDB).
+        """
+
+        self.lock = threading.Lock()
+        if lmdb is not None:
+            self.env = lmdb.open(path, map_size=2 ** 32, subdir=True)
+            self.db = None
+        else:
+            self.env = None
+            self.db = dbm.open(path, 'c')
+
+    def get(self, key):
+        """Get a value; None if not found."""
+
+        with self.lock:
+            if self.env is not None:
+                with self.env.begin() as txn:
+                    value = txn.get(key.encode('utf-8'))
+            else:
+                value = self.db.get(key.encode('utf-8'))
+        return value.decode('utf-8') if value is not None else None
+
+    def getMany(self, keys):
+        """Get several values at once, in the same order; None for the ones not found."""
+
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value):
+        """Set a value."""
+
+        self.setMany({key:value})
+
+    def setMany(self, pairs):
+        """Set several Key=>Value pairs at once."""
+
+        with self.lock:
+            if self.env is not None:
+                with self.env.begin(write=True) as txn:
+                    for key, value in pairs.items():
+                        txn.put(key.encode('utf-8'), value.encode('utf-8'))
+            else:
+                for key, value in pairs.items():
+                    self.db[key.encode('utf-8')] = value.encode('utf-8')
+
+    def delete(self, key):
+        """Delete a value."""
+
+        with self.lock:
+            if self.env is not None:
+                with self.env.begin(write=True) as txn:
+                    txn.delete(key.encode('utf-8'))
+            elif key.encode('utf-8') in self.db:
+                del self.db[key.encode('utf-8')]
+
+    def scan(self, prefix, count=500):
+        """Iterate over the keys starting with prefix, without loading all of them."""
+
+        prefix = prefix.encode('utf-8')
+        if self.env is None:
+            yield from self.scanDbm(prefix, count)
+            return
+
+        # Keys are read in pages, each in a read transaction of its own, so writers aren't held
+        last = None
+        while True:
+            keys = []
+            with self.lock:
+                with self.env.begin() as txn:
+                    cursor = txn.cursor()
+                    if cursor.set_range(last if last is not None else prefix):
+                        for key in cursor.iternext(keys=True, values=False):
+                            if key == last:
+                                continue
+                            if not key.startswith(prefix) or len(keys) >= count:
+                                break
+                            keys.append(key)
+
+            if not keys:
+                return
+            for key in keys:
+                yield key.decode('utf-8')
+            last = keys[-1]
+
+    def scanDbm(self, prefix, count=500):
+        """Iterate over the keys of the dbm file starting with prefix (see scan()).
+        Walked key by key with gdbm; the other dbm modules only list all the keys."""
+
+        if not hasattr(self.db, 'firstkey'):
+            with self.lock:
+                keys = [key for key in self.db.keys() if key.startswith(prefix)]
+            for key in keys:
+                yield key.decode('utf-8')
+            return
+
+        with self.lock:
+            key = self.db.firstkey()
+        while key is not None:
+            keys = []
+            with self.lock:
+                examined = 0
+                while key is not None and examined < count:
+                    examined = examined + 1
+                    if key.startswith(prefix):
+                        keys.append(key)
+                    key = self.db.nextkey(key)
+            for found in keys:
+                yield found.decode('utf-8')
+
+    def sadd(self, key, *members):
+        """Add members to a set."""
+
+        self.setMany({self.memberKey(key, m):'' for m in members})
+
+    def srem(self, key, *members):
+        """Remove members from a set."""
+
+        keys = [self.memberKey(key, m).encode('utf-8') for m in members]
+        with self.lock:
+            if self.env is not None:
+                with self.env.begin(write=True) as txn:
+                    for member in keys:
+                        txn.delete(member)
+            else:
+                for member in keys:
+                    if member in self.db:
+                        del self.db[member]
+
+    def smembers(self, key):
+        """Get the members of a set; empty if not found."""
+
+        prefix = self.memberKey(key, '')
+        return {member[len(prefix):] for member in self.scan(prefix)}
+
+    def memberKey(self, key, member):
+        """Get the key of a set member."""
+
+        return 'set:' + key + '\0' + str(member)
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+Change feed of the systems, as a Redis Stream (top500-changes by default),
+so dashboards and exports can follow the changes instead of scanning the
+cache. Every event has these fields:
+
+* kind: 'stored' (a new or changed system has been cached) or 'updated'
+  (the edits of a system have been written to a Wikibase target)
+* id: the TOP500 system ID
+* item: the Wikibase item (QXXX); empty if unknown yet
+* hash: the content hash of the system (see Top500Importer.recordHash())
+* changes: JSON summary of the change (see summarize())
+* time: Unix time of the event
+
+Consumers read it through a consumer group (see consume()): every event is
+delivered to one consumer of the group, and acknowledged once handled. The
+events not acknowledged are delivered again: to the same consumer once it
+comes back (with the same name), or to any consumer of the group once they
+have been pending for a while (eg. the consumer died for good; needs
+Redis 6.2 or newer).
+
+Copyright (c) 2019 Davod (Amitie 10g)
+
+Licensed under the MIT license. See LICENSE for details
+"""
+
+# :: Standard libraries
+import json
+import time
+
+# :: Third party libraries
+import redis
+
+def summarize(new, old=None, known=True):
+    """Summarize the change of a system.
+
+    Parameters
+    ----------
+    new : dict
+        The system, as saved.
+    old : dict
+        The system previously cached; None if none (or not loaded).
+    known : bool
+        False if it was cached before, but not loaded (the changes are unknown).
+
+    Returns
+    -------
+    dict
+        'new' (True if not cached before), 'fields' (the changed fields, besides
+        Rank) and 'lists' (the Rank lists added); None where unknown.
+    """
+
+    if old is None:
+        return {'new':known, 'fields':None if not known else sorted(key for key in new if key != 'Rank'),
+                'lists':None if not known else [row.get('List') for row in new.get('Rank', [])]}
+
+    lists = {row.get('List') for row in old.get('Rank', [])}
+
+    return {'new':False,
+            'fields':sorted(key for key in set(new) | set(old) if key != 'Rank' and new.get(key) != old.get(key)),
+            'lists':[row.get('List') for row in new.get('Rank', []) if row.get('List') not in lists]}
+
+def publish(client, stream, kind, identifier, item, digest, changes, maxlen=None):
+    """Append an event to the stream.
+
+    Parameters
+    ----------
+    client : redis.Redis
+        The Redis client.
+    stream : str
+        The stream key.
+    kind : str
+        'stored' or 'updated'.
+    identifier : str
+        The TOP500 system ID.
+    item : str
+        The Wikibase item; None if unknown.
+    digest : str
+        The content hash of the system.
+    changes : dict
+        The change summary.
+    maxlen : int
+        Trim the stream to about this many events; None to keep them all.
+
+    Returns
+    -------
+    str
+        The event ID.
+    """
+
+    fields = {'kind':kind, 'id':str(identifier), 'item':item or '', 'hash':digest or '',
+              'changes':json.dumps(changes, sort_keys=True), 'time':repr(time.time())}
+
+    return client.xadd(stream, fields, maxlen=maxlen, approximate=True)
+
+def decode(fields):
+    """Decode the fields of an event, as read from Redis."""
+
+    event = {key.decode('utf-8') if isinstance(key, bytes) else key:
+             value.decode('utf-8') if isinstance(value, bytes) else value for key, value in fields.items()}
+
+    try:
+        event['changes'] = json.loads(event.get('changes', 'null'))
+    except ValueError:
+        event['changes'] = None
+
+    return event
+
+def ensureGroup(client, stream, group):
+    """Create a consumer group, reading the stream from the start, unless it exists."""
+
+    try:
+        client.xgroup_create(stream, group, id='0', mkstream=True)
+    except redis.exceptions.ResponseError as e:
+        if 'BUSYGROUP' not in str(e):
+            raise
+
+def claimIdle(client, stream, group, consumer, min_idle, count=100):
+    """Take over the events pending at any consumer of the group for a while
+    (eg. it died), so they are delivered again to this one.
+
+    Parameters
+    ----------
+    client : redis.Redis
+        The Redis client.
+    stream : str
+        The stream key.
+    group : str
+        The consumer group.
+    consumer : str
+        The consumer taking them over.
+    min_idle : int
+        Milliseconds an event must have been pending.
+    count : int
+        The amount of events claimed at once.
+
+    Returns
+    -------
+    int
+        The amount of events claimed; 0 if not supported (Redis older than 6.2).
+    """
+
+    claimed = 0
+    start = '0-0'
+    while True:
+        # Not justid: redis-py returns only the IDs then, without the next start
+        try:
+            response = client.xautoclaim(stream, group, consumer, min_idle, start_id=start, count=count)
+        except redis.exceptions.ResponseError:
+            return claimed
+
+        start = response[0]
+        claimed = claimed + len(response[1])
+        if start in (b'0-0', '0-0'):
+            return claimed
+
+def consume(client, stream, group, consumer, handler, count=100, block=5000, once=False, min_idle=60000):
+    """Handle the events of a stream as a member of a consumer group.
+
+    The events delivered before and not acknowledged are handled first: the
+    ones of this consumer (eg. it died while handling them, and comes back
+    with the same name), and the ones pending at any consumer for min_idle
+    milliseconds; then the new ones. Once no new events come, the pending
+    ones are checked again.
+
+    Parameters
+    ----------
+    client : redis.Redis
+        The Redis client.
+    stream : str
+        The stream key.
+    group : str
+        The consumer group; created if missing.
+    consumer : str
+        The consumer name, unique within the group.
+    handler : callable
+        Called with every event (dict, see decode()); the event is acknowledged
+        once it returns. Return False to stop consuming.
+    count : int
+        The amount of events read at once.
+    block : int
+        Milliseconds to wait for new events.
+    once : bool
+        If True, stop once no more events are waiting.
+    min_idle : int
+        Milliseconds an event must have been pending at another consumer
+        before taking it over.
+
+    Returns
+    -------
+    int
+        The amount of events handled.
+    """
+
+    ensureGroup(client, stream, group)
+
+    handled = 0
+    position = '0'
+    while True:
+        if position == '0':
+            claimIdle(client, stream, group, consumer, min_idle, count)
+
+        response = client.xreadgroup(group, consumer, {stream:position}, count=count,
+                                     block=None if position == '0' else block)
+        messages = response[0][1] if response else []
+
+        # Nothing pending anymore: go on with the new events
+        if not messages:
+            if position == '0':
+                position = '>'
+                continue
+            if once:
+                return handled
+
+            # No new events: look for abandoned ones again
+            position = '0'
+            continue
+
+        for event_id, fields in messages:
+            # Pending events already trimmed from the stream are only acknowledged
+            if not fields:
+                client.xack(stream, group, event_id)
+                continue
+
+            result = handler(decode(fields))
+            client.xack(stream, group, event_id)
+            handled = handled + 1
+
+            if result is False:
+                return handled
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Adaptive concurrency for the TOP500 requests, using AIMD (additive
+increase, multiplicative decrease), as TCP congestion control does:
+
+* Once as many requests as the current limit have succeeded in a row
+  within the target latency, the limit grows by one (up to the ceiling).
+* On HTTP 429, a server error (5xx), a failed request, or once the
+  average latency exceeds the target, the limit is cut in half (down to
+  the floor), at most once per cooldown, so a burst of failures of the
+  requests already in flight counts once.
+
+Workers call acquire() before every request and release() after it, with
+the latency and the HTTP status. The current limit, the counters and the
+last adjustments (with their reasons) are returned by metrics().
+
+Copyright (c) 2019 Davod (Amitie 10g)
+
+Licensed under the MIT license. See LICENSE for details
+"""
+
+# :: Standard libraries
+import time
+import threading
+import collections
+
+class AdaptiveLimit:
+    """The limit of requests in flight."""
+
+    def __init__(self, floor=1, ceiling=16, target_latency=2.0, backoff=0.5, cooldown=5.0, on_adjust=None):
+        """Parameters
+        ----------
+        floor : int
+            The lowest limit.
+        ceiling : int
+            The highest limit.
+        target_latency : float
+            Seconds a request may take on average before the limit is cut.
+        backoff : float
+            Factor the limit is multiplied by when cut.
+        cooldown : float
+            Seconds after a cut before the next one.
+        on_adjust : callable
+            Called with metrics() after every adjustment (eg. to save them).
+        """
+
+        self.floor = max(1, int(floor))
+        self.ceiling = max(self.floor, int(ceiling))
+        self.target_latency = target_latency
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self.on_adjust = on_adjust
+
+        self.limit = self.floor
+        self.in_flight = 0
+        self.successes = 0
+        self.latency = None
+        self.last_cut = 0.0
+        self.counters = collections.Counter()
+        self.reasons = collections.Counter()
+        self.adjustments = collections.deque(maxlen=50)
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        """Wait until a request may be sent."""
+
+        with self.condition:
+            while self.in_flight >= self.limit:
+                self.condition.wait()
+            self.in_flight = self.in_flight + 1
+
+    def release(self, latency, status=None):
+        """Record the result of a request, and adjust the limit.
+
+        Parameters
+        ----------
+        latency : float
+            Seconds the request took.
+        status : int
+            The HTTP status code; None if the request failed.
+        """
+
+        with self.condition:
+            self.in_flight = self.in_flight - 1
+            self.counters['requests'] += 1
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+
+            if status == 429:
+                self.counters['throttled'] += 1
+                adjusted = self.cut('throttled')
+            elif status is None or status >= 500:
+                self.counters['errors'] += 1
+                adjusted = self.cut('error')
+            elif self.latency > self.target_latency:
+                adjusted = self.cut('latency')
+            else:
+                self.successes = self.successes + 1
+                adjusted = self.successes >= self.limit and self.adjust(self.limit + 1, 'increase')
+
+            self.condition.notify_all()
+            metrics = self.snapshot() if adjusted else None
+
+        if metrics is not None and self.on_adjust is not None:
+            self.on_adjust(metrics)
+
+    def cut(self, reason):
+        """Cut the limit, unless cut within the cooldown (call with the lock held)."""
+
+        # The limit only grows after as many successes in a row
+        self.successes = 0
+
+        now = time.time()
+        if now - self.last_cut < self.cooldown:
+            return False
+
+        self.last_cut = now
+        return self.adjust(int(self.limit * self.backoff), reason)
+
+    def adjust(self, limit, reason):
+        """Set the limit, within floor and ceiling (call with the lock held).
+
+        Returns
+        -------
+        bool
+            True if the limit has changed.
+        """
+
+        self.successes = 0
+        limit = min(self.ceiling, max(self.floor, limit))
+        if limit == self.limit:
+            return False
+
+        self.reasons[reason] += 1
+        self.adjustments.append({'time':time.time(), 'from':self.limit, 'to':limit, 'reason':reason,
+                                 'latency':self.latency})
+        self.limit = limit
+
+        return True
+
+    def metrics(self):
+        """Get the current limit, the counters and the last adjustments.
+
+        Returns
+        -------
+        dict
+            'limit', 'floor', 'ceiling', 'in_flight', 'latency' (average seconds),
+            'counters' (requests, errors and throttled), 'reasons' (adjustments
+            per reason) and 'adjustments' (the last ones, with their reason).
+        """
+
+        with self.condition:
+            return self.snapshot()
+
+    def snapshot(self):
+        """Get the metrics (call with the lock held)."""
+
+        return {'limit':self.limit, 'floor':self.floor, 'ceiling':self.ceiling, 'in_flight':self.in_flight,
+                'latency':self.latency, 'counters':dict(self.counters), 'reasons':dict(self.reasons),
+                'adjustments':list(self.adjustments)}
@@ -9,6 +9,23 @@ config = {
     'log_page':'User:TOP500_importer/created',
     'status_page':'User:TOP500_importer/status',
     'counter_page':'User:TOP500_importer/counter',
+    'cache_backend':'redis', # redis, sqlite or mmap
+    'cache_path':'top500.cache', # for sqlite and mmap
     'redis_server':'localhost',
     'redis_port':'6379',
+    'job_queue':'top500-jobs',
+    'warm_workers':4,
+    'warm_delay':0.5,
+    'fetch_floor':1, # lowest TOP500 requests in flight, with --adaptive
+    'fetch_ceiling':16, # highest TOP500 requests in flight, with --adaptive
+    'fetch_target_latency':2.0, # average seconds per request before cutting the limit, with --adaptive
+    'journal_path':'top500.journal',
+    'drain_timeout':60, # seconds to apply the journaled/queued edits once stopping
+    'save_backlog':50, # items waiting to be saved, with --async
+    'resolver_index':None, # TSV of label and item, looked up before wbsearchentities, with --resolve
+    # Other Wikibase targets written from the same fetch, eg.
+    # {'name':'mirror', 'site':'mirror', 'lang':'en', 'mapping':'slist_mirror',
+    #  'log_page':'User:TOP500_importer/created', 'status_page':'User:TOP500_importer/status', 'delay':1}
+    # where 'mapping' is a module like slist.py with the properties and statements of that Wikibase
+    'targets':[],
 }
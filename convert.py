@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+Typed parsers for the raw strings scraped from the TOP500 pages.
+
+Copyright (c) 2019 Davod (Amitie 10g)
+
+Licensed under the MIT license. See LICENSE for details
+"""
+
+# :: Standard libraries
+import re
+import decimal
+import datetime
+import functools
+
+# :: Local dictionaries
+import slist
+
+# :: Canonical units (everything is converted to these)
+flops_scale = {'G':1.0, 'T':1000.0, 'P':1000000.0}
+memory_scale = {'KB':1.0 / 1048576, 'MB':1.0 / 1024, 'GB':1.0, 'TB':1024.0, 'PB':1048576.0}
+power_scale = {'W':0.001, 'kW':1.0, 'MW':1000.0, 'GW':1000000.0}
+
+rank_header = re.compile(r'^(Rmax|Rpeak) \(([GTP])Flop/?s\)$')
+
+def parseNumber(value):
+    """Parse a TOP500 number (eg. '10,649,600' or '93.01') into a float.
+
+    Parameters
+    ----------
+    value : mixed
+        The string (or number) to be parsed.
+
+    Returns
+    -------
+    float
+        The number; None if fails.
+    """
+
+    try:
+        return float(str(value).replace(',', '').strip())
+    except ValueError:
+        return None
+
+def parseAmount(value):
+    """Split a TOP500 amount (eg. '1,024 GB') into number and unit.
+
+    Parameters
+    ----------
+    value : str
+        The amount to be parsed.
+
+    Returns
+    -------
+    tuple
+        (number, unit) where unit may be None; (None, None) if fails.
+    """
+
+    try:
+        value = str(value).strip().split(' ')
+    except (ValueError, AttributeError):
+        return (None, None)
+
+    number = parseNumber(value[0])
+    if number is None:
+        return (None, None)
+
+    unit = value[1] if len(value) > 1 else None
+    return (number, unit)
+
+def parseScaled(value, scale, default=None):
+    """Parse an amount and convert it to the canonical unit of the scale.
+
+    Parameters
+    ----------
+    value : str
+        The amount to be parsed.
+    scale : dict
+        Pairs of Unit=>Factor to the canonical unit.
+    default : str
+        The unit assumed when the value has none.
+
+    Returns
+    -------
+    float
+        The amount in canonical units; None if fails.
+    """
+
+    number, unit = parseAmount(value)
+    if number is None:
+        return None
+
+    factor = scale.get(unit or default)
+    if factor is None:
+        return None
+
+    return number * factor
+
+def parseListDate(value):
+    """Parse a TOP500 list date (mm/YYYY) into a datetime.date.
+
+    Parameters
+    ----------
+    value : str
+        The date to be parsed.
+
+    Returns
+    -------
+    datetime.date
+        First day of the list month; None if fails.
+    """
+
+    try:
+        return datetime.datetime.strptime(str(value).strip(), '%m/%Y').date()
+    except ValueError:
+        return None
+
+def rankPerformance(row):
+    """Get Rmax and Rpeak from a Rank table row, in GFlops.
+
+    Parameters
+    ----------
+    row : dict
+        A row from the 'Rank' list of a system.
+
+    Returns
+    -------
+    tuple
+        (rmax, rpeak) as floats; each may be None if missing.
+    """
+
+    performance = {'Rmax':None, 'Rpeak':None}
+    for header, value in row.items():
+        match = rank_header.match(header)
+        if match is None:
+            continue
+        number = parseNumber(value)
+        if number is not None:
+            performance[match.group(1)] = number * flops_scale[match.group(2)]
+
+    return (performance['Rmax'], performance['Rpeak'])
+
+# :: Memoized conversion into Wikibase-ready values
+#
+# TOP500 strings repeat a lot across systems ('1,024 GB', '06/2015', vendors...),
+# so every conversion below is cached (bounded, least recently used first out).
+
+entity_url = 'http://www.wikidata.org/entity/'
+
+@functools.lru_cache(maxsize=8192)
+def stripped(value):
+    """Keep only printable ASCII characters.
+
+    Parameters
+    ----------
+    value : str
+        The string to be stripped.
+
+    Returns
+    -------
+    str
+        The stripped string.
+    """
+
+    return ''.join(i for i in str(value) if 31 < ord(i) < 127)
+
+@functools.lru_cache(maxsize=8192)
+def toDecimal(num):
+    """Normalize decimal numbers, remove trailing zeroes
+    (credits: https://stackoverflow.com/questions/2440692).
+
+    Parameters
+    ----------
+    num : str
+        The number to be parsed; thousands separators (',') are ignored.
+
+    Returns
+    -------
+    Decimal
+        The number as Decimal value, with trailing zeroes removed; False if fails.
+    """
+
+    try:
+        dec = decimal.Decimal(str(num).replace(',', ''))
+        return dec.quantize(decimal.Decimal(1)) if dec == dec.to_integral() else dec.normalize()
+
+    except decimal.InvalidOperation:
+        return False
+
+@functools.lru_cache(maxsize=8192)
+def toStatement(value, mapping=slist):
+    """Get the Wikidata item (QXXX) of an arbitrary string (see slist.py).
+
+    Parameters
+    ----------
+    value : str
+        The string to be looked up; non printable ASCII is stripped first.
+    mapping : module
+        The mapping table (slist.py, or the one of another Wikibase target).
+
+    Returns
+    -------
+    str
+        The item; False if unknown.
+    """
+
+    return mapping.statements.get(stripped(value), False)
+
+@functools.lru_cache(maxsize=1024)
+def toUnit(unit, mapping=slist):
+    """Get the unit URI of a TOP500 unit (eg. 'GB').
+
+    Parameters
+    ----------
+    unit : str
+        The unit.
+    mapping : module
+        The mapping table; its 'entity_url' (if any) replaces the Wikidata one.
+
+    Returns
+    -------
+    str
+        The entity URI; False if unknown.
+    """
+
+    item = mapping.statements.get(str(unit), False)
+    return getattr(mapping, 'entity_url', entity_url) + item if item else False
+
+@functools.lru_cache(maxsize=8192)
+def toAmount(value, mapping=slist):
+    """Convert a TOP500 amount (eg. '1,024 GB') into a Wikibase quantity.
+
+    Parameters
+    ----------
+    value : str
+        The amount, with optional unit.
+    mapping : module
+        The mapping table of the units.
+
+    Returns
+    -------
+    tuple
+        (Decimal amount, unit URI or None); False if the number or the unit is invalid.
+    """
+
+    if not value:
+        return False
+
+    value = str(value).split(' ')
+    amount = toDecimal(value[0])
+    if not amount:
+        return False
+
+    if len(value) > 1:
+        unit = toUnit(value[1], mapping)
+        if not unit:
+            return False
+        return (amount, unit)
+
+    return (amount, None)
+
+@functools.lru_cache(maxsize=1024)
+def toDate(value):
+    """Convert a TOP500 list date (mm/YYYY) into a Wikibase time.
+
+    Parameters
+    ----------
+    value : str
+        The date.
+
+    Returns
+    -------
+    tuple
+        (year, month) as integers; False if invalid.
+    """
+
+    date = parseListDate(value)
+    if date is None:
+        return False
+
+    return (date.year, date.month)
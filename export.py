@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+Columnar snapshot export of the cached TOP500 systems.
+
+One row is written per Rank table row, with the system columns repeated.
+Parquet and Arrow IPC need pyarrow; without it, CSV is written instead.
+
+Copyright (c) 2019 Davod (Amitie 10g)
+
+Licensed under the MIT license. See LICENSE for details
+"""
+
+# :: Standard libraries
+import os
+import sys
+import csv
+import json
+
+# :: Third party library (optional)
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# :: Local library
+import convert
+
+columns = ['id', 'manufacturer', 'cores', 'memory_gb', 'power_kw', 'list_date', 'rank', 'rmax_gflops', 'rpeak_gflops']
+
+def schema():
+    """Build the Arrow schema for the snapshot.
+
+    Returns
+    -------
+    pyarrow.Schema
+        The typed columns.
+    """
+
+    return pyarrow.schema([
+        ('id', pyarrow.int64()),
+        ('manufacturer', pyarrow.string()),
+        ('cores', pyarrow.int64()),
+        ('memory_gb', pyarrow.float64()),
+        ('power_kw', pyarrow.float64()),
+        ('list_date', pyarrow.date32()),
+        ('rank', pyarrow.int32()),
+        ('rmax_gflops', pyarrow.float64()),
+        ('rpeak_gflops', pyarrow.float64()),
+    ])
+
+def systemRows(data):
+    """Flatten a system (as returned by getTOP500Data()) into typed rows.
+
+    Parameters
+    ----------
+    data : dict
+        The system data.
+
+    Returns
+    -------
+    list
+        One tuple per Rank row, ordered as the columns; one row with
+        empty rank columns if the system has no Rank table.
+    """
+
+    cores = convert.parseNumber(data.get('Cores', ''))
+    system = (
+        int(data['ID']),
+        data.get('Manufacturer') or None,
+        int(cores) if cores is not None else None,
+        convert.parseScaled(data.get('Memory', ''), convert.memory_scale, 'GB'),
+        convert.parseScaled(data.get('Power Consumption', ''), convert.power_scale, 'kW'),
+    )
+
+    rows = []
+    for row in data.get('Rank') or [{}]:
+        rank = convert.parseNumber(row.get('Rank', ''))
+        rmax, rpeak = convert.rankPerformance(row)
+        rows.append(system + (
+            convert.parseListDate(row.get('List', '')),
+            int(rank) if rank is not None else None,
+            rmax,
+            rpeak))
+
+    return rows
+
+def scanSystems(store, batch_size=500):
+    """Iterate over every cached system, in batches (SCAN and pipelined GETs on Redis).
+
+    Parameters
+    ----------
+    store : object
+        The cache backend (see cache.py).
+    batch_size : int
+        The amount of keys fetched per round trip.
+
+    Yields
+    ------
+    list
+        The decoded systems of a batch.
+    """
+
+    keys = []
+    for key in store.scan('top500-sys-', batch_size):
+        keys.append(key)
+        if len(keys) >= batch_size:
+            yield decodeSystems(store, keys)
+            keys = []
+
+    if keys:
+        yield decodeSystems(store, keys)
+
+def decodeSystems(store, keys):
+    """Get a batch of keys at once and decode them.
+
+    Parameters
+    ----------
+    store : object
+        The cache backend (see cache.py).
+    keys : list
+        The keys to be fetched.
+
+    Returns
+    -------
+    list
+        The decoded systems; undecodable values are skipped.
+    """
+
+    systems = []
+    for raw in store.getMany(keys):
+        try:
+            systems.append(json.loads(raw))
+        except (json.JSONDecodeError, TypeError):
+            continue
+
+    return systems
+
+def exportSnapshot(store, path, batch_size=500):
+    """Write every cached system into a columnar file.
+
+    The format is chosen from the file extension: '.parquet' for Parquet,
+    '.arrow', '.ipc' or '.feather' for Arrow IPC, anything else for CSV.
+
+    Parameters
+    ----------
+    store : object
+        The cache backend (see cache.py).
+    path : str
+        The destination file.
+    batch_size : int
+        The amount of systems held in memory at once.
+
+    Returns
+    -------
+    int
+        The amount of rows written; False if fails.
+    """
+
+    extension = os.path.splitext(path)[1].lower()
+    columnar = extension in ('.parquet', '.arrow', '.ipc', '.feather')
+    if columnar and pyarrow is None:
+        path = os.path.splitext(path)[0] + '.csv'
+        columnar = False
+        sys.stderr.write('Notice: pyarrow not available, writing ' + path + ' instead.\n')
+
+    total = 0
+    writer = None
+    f = None
+    try:
+        if columnar:
+            if extension == '.parquet':
+                writer = pyarrow.parquet.ParquetWriter(path, schema())
+            else:
+                writer = pyarrow.ipc.new_file(path, schema())
+        else:
+            f = open(path, 'w', newline='')
+            writer = csv.writer(f)
+            writer.writerow(columns)
+
+        for systems in scanSystems(store, batch_size):
+            rows = []
+            for data in systems:
+                try:
+                    rows.extend(systemRows(data))
+                except (ValueError, KeyError, TypeError):
+                    continue
+
+            if columnar:
+                writer.write_batch(pyarrow.RecordBatch.from_arrays(
+                    [pyarrow.array([row[i] for row in rows], type=field.type) for i, field in enumerate(schema())],
+                    schema=schema()))
+            else:
+                writer.writerows(rows)
+
+            total = total + len(rows)
+
+    except (OSError, IOError) as e:
+        sys.stderr.write(str(e) + '\n')
+        return False
+
+    finally:
+        # Closed even if something else fails (eg. the cache), so the file isn't left open
+        if columnar and writer is not None:
+            writer.close()
+        if f is not None:
+            f.close()
+
+    return total
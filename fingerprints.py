@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Claim fingerprints: (property, normalized value, qualifiers) strings of the
+claims of an item, kept in the cache at top500-fp-[<target>-]<QID> along with
+the item revision they were taken at, as JSON: {"rev": <lastrevid>, "claims": [...]}.
+
+They are seeded from an entity read, and updated whenever addClaim() adds
+a claim. As long as the item lastrevid (a cheap page info query) is the
+one saved, the fingerprints are trusted instead of reading the entity, so
+re-runs only touch Wikibase for the claims that are actually new. Once
+someone else edits the item, the revision differs and they are seeded again.
+
+Copyright (c) 2019 Davod (Amitie 10g)
+
+Licensed under the MIT license. See LICENSE for details
+"""
+
+# :: Standard libraries
+import json
+
+# :: Local libraries
+import convert
+
+prefix = 'top500-fp-'
+
+def fingerprint(prop, value, qualifiers=()):
+    """Write the fingerprint of a claim.
+
+    Parameters
+    ----------
+    prop : str
+        The property (PXXX).
+    value : str
+        The normalized value (see normalizeTarget()).
+    qualifiers : iterable
+        The (property, normalized value) pairs of the qualifiers.
+
+    Returns
+    -------
+    str
+        The fingerprint.
+    """
+
+    return prop + '|' + value + '|' + ','.join(sorted(qualifier + '=' + target for qualifier, target in qualifiers))
+
+def claimProperty(fingerprint):
+    """Get the property of a fingerprint."""
+
+    return fingerprint.split('|', 1)[0]
+
+def normalizeItem(item):
+    """Normalize an item value (QXXX)."""
+
+    return str(item)
+
+def normalizeQuantity(amount, unit=None):
+    """Normalize a quantity; unit is the entity URI, None (or '1') if unitless."""
+
+    return str(convert.toDecimal(str(amount))) + ' ' + (str(unit) if unit and unit != '1' else '1')
+
+def normalizeDate(year, month):
+    """Normalize a time value, to month precision."""
+
+    return '%04d-%02d' % (int(year), int(month))
+
+def normalizeTarget(target):
+    """Normalize the target of a Pywikibot claim (ItemPage, WbQuantity, WbTime or str).
+
+    Returns
+    -------
+    str
+        The normalized value, as written by the normalize*() functions.
+    """
+
+    if hasattr(target, 'getID'):
+        return normalizeItem(target.getID())
+    if hasattr(target, 'amount'):
+        return normalizeQuantity(target.amount, getattr(target, 'unit', None))
+    if hasattr(target, 'year') and hasattr(target, 'month'):
+        return normalizeDate(target.year, target.month)
+
+    return str(target)
+
+def claimFingerprint(claim):
+    """Get the fingerprint of a Pywikibot claim, with its qualifiers."""
+
+    qualifiers = [(qualifier.getID(), normalizeTarget(qualifier.getTarget()))
+                  for values in claim.qualifiers.values() for qualifier in values]
+
+    return fingerprint(claim.getID(), normalizeTarget(claim.getTarget()), qualifiers)
+
+def itemFingerprints(item):
+    """Get the fingerprints of every claim of a loaded Pywikibot item."""
+
+    return {claimFingerprint(claim) for claims in item.claims.values() for claim in claims}
+
+def key(item, target=''):
+    """Get the key of the fingerprints of an item at a Wikibase target (the same QID
+    is another item at every target)."""
+
+    return prefix + (target + '-' if target else '') + item
+
+def load(store, item, target=''):
+    """Get the saved fingerprints of an item.
+
+    Parameters
+    ----------
+    store : object
+        The cache backend (see cache.py).
+    item : str
+        The item (QXXX).
+    target : str
+        The Wikibase target name; '' for the main one.
+
+    Returns
+    -------
+    tuple
+        (revision, set of fingerprints); (None, None) if not saved.
+    """
+
+    try:
+        saved = json.loads(store.get(key(item, target)))
+        return saved['rev'], set(saved['claims'])
+    except (json.JSONDecodeError, TypeError, KeyError):
+        return None, None
+
+def save(store, item, revision, claims, target=''):
+    """Save the fingerprints of an item, as valid at a revision."""
+
+    store.set(key(item, target), json.dumps({'rev':revision, 'claims':sorted(claims)}))
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+Secondary indexes over the cached TOP500 systems, kept as sets in the
+cache backend and updated whenever a system is saved:
+
+* top500-idx-all: every cached system
+* top500-idx-list-<mm/YYYY>: systems in a list
+* top500-idx-manufacturer-<name>: systems by manufacturer
+* top500-idx-site-<name>: systems by site
+* top500-idx-items: systems with a Wikibase item (at top500-item-<ID>)
+
+Copyright (c) 2019 Davod (Amitie 10g)
+
+Licensed under the MIT license. See LICENSE for details
+"""
+
+# :: Local library
+import export
+
+prefix = 'top500-idx-'
+
+def indexKeys(data):
+    """Get the index sets a system belongs to.
+
+    Parameters
+    ----------
+    data : dict
+        The system data, as returned by getTOP500Data().
+
+    Returns
+    -------
+    set
+        The set keys.
+    """
+
+    keys = {prefix + 'all'}
+
+    for row in data.get('Rank', []):
+        if row.get('List'):
+            keys.add(prefix + 'list-' + row['List'])
+
+    if data.get('Manufacturer'):
+        keys.add(prefix + 'manufacturer-' + data['Manufacturer'])
+
+    if data.get('Site'):
+        keys.add(prefix + 'site-' + data['Site'])
+
+    return keys
+
+def updateIndex(store, data, old=None):
+    """Add a system to its index sets, and remove it from the stale ones.
+
+    Parameters
+    ----------
+    store : object
+        The cache backend (see cache.py).
+    data : dict
+        The system data being saved.
+    old : dict
+        The system data previously cached, if any.
+    """
+
+    keys = indexKeys(data)
+    for key in keys:
+        store.sadd(key, data['ID'])
+
+    if old:
+        for key in indexKeys(old) - keys:
+            store.srem(key, data['ID'])
+
+def setItem(store, identifier, item, target=''):
+    """Save the Wikibase item of a system.
+
+    Parameters
+    ----------
+    store : object
+        The cache backend (see cache.py).
+    identifier : str
+        The TOP500 system identifier.
+    item : str
+        The Wikibase item (QXXX).
+    target : str
+        The Wikibase target name; empty for the main one. Other targets are
+        kept at top500-item-<target>-<ID> and top500-idx-items-<target>.
+    """
+
+    store.set(itemKey(identifier, target), item)
+    store.sadd(prefix + 'items' + ('-' + target if target else ''), str(identifier))
+
+def getItem(store, identifier, target=''):
+    """Get the Wikibase item of a system at a target; None if unknown."""
+
+    return store.get(itemKey(identifier, target))
+
+def itemKey(identifier, target=''):
+    """Get the key of the Wikibase item of a system at a target."""
+
+    return 'top500-item-' + (target + '-' if target else '') + str(identifier)
+
+def rebuildIndex(store, batch_size=500):
+    """Index every cached system (eg. the ones saved before the indexes existed).
+
+    Parameters
+    ----------
+    store : object
+        The cache backend (see cache.py).
+    batch_size : int
+        The amount of systems fetched at once.
+
+    Returns
+    -------
+    int
+        The amount of systems indexed.
+    """
+
+    total = 0
+    for systems in export.scanSystems(store, batch_size):
+        for data in systems:
+            try:
+                updateIndex(store, data)
+                total = total + 1
+            except (KeyError, TypeError, AttributeError):
+                continue
+
+    return total
+
+def query(store, field, value=None):
+    """Get the IDs matching a query.
+
+    Parameters
+    ----------
+    store : object
+        The cache backend (see cache.py).
+    field : str
+        One of:
+
+        * 'list', systems in the list 'value' (mm/YYYY)
+
+        * 'manufacturer', systems by manufacturer 'value'
+
+        * 'site', systems at site 'value'
+
+        * 'all', every system
+
+        * 'noitem', systems without a Wikibase item yet
+
+        * 'item', the Wikibase item of the system 'value'
+    value : str
+        The value to look up.
+
+    Returns
+    -------
+    list
+        The sorted IDs (or the item, for 'item'); False if unknown field.
+    """
+
+    if field == 'item':
+        item = getItem(store, value)
+        return [item] if item else []
+
+    if field == 'noitem':
+        members = store.smembers(prefix + 'all') - store.smembers(prefix + 'items')
+    elif field == 'all':
+        members = store.smembers(prefix + 'all')
+    elif field in ('list', 'manufacturer', 'site'):
+        members = store.smembers(prefix + field + '-' + str(value))
+    else:
+        return False
+
+    return sorted(members, key=lambda identifier: int(identifier) if identifier.isdigit() else 0)
@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+"""
+Bulk ingest of the TOP500 list download files (XML, CSV/TSV or XLSX),
+merged into the same shape returned by Top500Importer.getTOP500Data().
+
+Copyright (c) 2019 Davod (Amitie 10g)
+
+Licensed under the MIT license. See LICENSE for details
+"""
+
+# :: Standard libraries
+import os
+import re
+import csv
+import xml.etree.ElementTree as ElementTree
+
+# :: Third party library (optional)
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+# :: Local library
+import convert
+
+# Normalized header (lowercase, alphanumeric only) => system field
+fields = {
+    'rank':'Rank',
+    'systemid':'ID',
+    'name':'Name',
+    'systemname':'Name',
+    'computer':'Computer',
+    'site':'Site',
+    'siteid':'Site ID',
+    'manufacturer':'Manufacturer',
+    'totalcores':'Cores',
+    'cores':'Cores',
+    'numberofprocessors':'Cores',
+    'processors':'Cores',
+    'memory':'Memory',
+    'memorygb':'Memory',
+    'processor':'Processor',
+    'operatingsystem':'Operating System',
+    'power':'Power',
+    'powerkw':'Power',
+}
+
+performance_header = re.compile(r'^(rmax|rpeak)(?:([gtp])flops)?$')
+
+def normalize(header):
+    """Normalize a column or element name (eg. 'Rmax [TFlop/s]' => 'rmaxtflops').
+
+    Parameters
+    ----------
+    header : str
+        The name to be normalized.
+
+    Returns
+    -------
+    str
+        The normalized name.
+    """
+
+    header = str(header)
+    if '}' in header:
+        header = header.split('}', 1)[1]
+
+    return re.sub(r'[^a-z0-9]', '', header.lower().replace('flop/s', 'flops'))
+
+def listDateFromPath(path):
+    """Guess the list date from the file name (eg. 'TOP500_201806.xml').
+
+    Parameters
+    ----------
+    path : str
+        The file path.
+
+    Returns
+    -------
+    str
+        The date in TOP500 Rank table format (mm/YYYY); False if fails.
+    """
+
+    match = re.search(r'(19|20)([0-9]{2})(0[1-9]|1[0-2])', os.path.basename(path))
+    if match is None:
+        return False
+
+    return match.group(3) + '/' + match.group(1) + match.group(2)
+
+def readRows(path):
+    """Stream the rows of a list file as dicts of raw header=>value.
+
+    Parameters
+    ----------
+    path : str
+        The file path. XML is parsed incrementally; XLSX needs openpyxl.
+
+    Yields
+    ------
+    dict
+        The row.
+    """
+
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension == '.xml':
+        root = None
+        for event, elem in ElementTree.iterparse(path, events=('start', 'end')):
+            if root is None:
+                root = elem
+            if event != 'end':
+                continue
+            children = list(elem)
+            if children and any(normalize(child.tag) == 'systemid' for child in children):
+                yield {child.tag:(child.text or '').strip() for child in children}
+                # The root keeps every record parsed (even cleared) otherwise
+                root.clear()
+
+    elif extension == '.xlsx':
+        if openpyxl is None:
+            raise ValueError('Error: openpyxl is needed to read ' + path)
+        workbook = openpyxl.load_workbook(path, read_only=True)
+        rows = workbook.active.iter_rows(values_only=True)
+        headers = None
+        for row in rows:
+            if headers is None:
+                # Some files have a title row above the headers
+                if row and any(normalize(cell) == 'rank' for cell in row if cell is not None):
+                    headers = [str(cell) for cell in row]
+                continue
+            yield {headers[i]:('' if cell is None else str(cell)) for i, cell in enumerate(row) if i < len(headers)}
+        workbook.close()
+
+    else:
+        with open(path, newline='', encoding='utf-8') as f:
+            delimiter = '\t' if extension == '.tsv' else ','
+            for row in csv.DictReader(f, delimiter=delimiter):
+                yield row
+
+def parseRow(row):
+    """Map a raw row into system fields, and Rmax/Rpeak with their unit.
+
+    Parameters
+    ----------
+    row : dict
+        The raw row, as yielded by readRows().
+
+    Returns
+    -------
+    dict
+        The system fields, plus 'Rmax' and 'Rpeak' as (value, unit) tuples.
+    """
+
+    parsed = {}
+    for header, value in row.items():
+        if header is None or value is None:
+            continue
+        key = normalize(header)
+        value = str(value).strip()
+
+        match = performance_header.match(key)
+        if match is not None:
+            unit = (match.group(2) or 'g').upper() + 'Flops'
+            parsed[match.group(1).capitalize()] = (value, unit)
+        elif key in fields and value != '':
+            parsed.setdefault(fields[key], value)
+
+    return parsed
+
+def toRecord(parsed, date):
+    """Build a system record and its Rank row from a parsed list row.
+
+    Parameters
+    ----------
+    parsed : dict
+        The row, as returned by parseRow().
+    date : str
+        The list date (mm/YYYY).
+
+    Returns
+    -------
+    tuple
+        (record, rankrow), in the getTOP500Data() shape.
+    """
+
+    computer = parsed.get('Computer', '')
+    title = computer.split(' - ')
+    if len(title) > 1:
+        name = title[0]
+        platform = title[1].split(', ')[0]
+    else:
+        name = computer
+        platform = computer.split(', ')[0]
+
+    record = {'ID':str(int(convert.parseNumber(parsed['ID']))), 'Title':parsed.get('Name') or name, 'Platform':platform}
+    for field in ('Site', 'Manufacturer', 'Processor', 'Operating System'):
+        if field in parsed:
+            record[field] = parsed[field]
+
+    cores = convert.parseNumber(parsed.get('Cores', ''))
+    if cores is not None:
+        record['Cores'] = '{:,}'.format(int(cores))
+
+    memory = convert.parseNumber(parsed.get('Memory', ''))
+    if memory is not None:
+        record['Memory'] = '{:,f}'.format(memory).rstrip('0').rstrip('.') + ' GB'
+
+    power = convert.parseNumber(parsed.get('Power', ''))
+    if power is not None:
+        record['Power Consumption'] = '{:,.2f} kW'.format(power)
+
+    rankrow = {'List':date, 'Rank':parsed.get('Rank', ''), 'System':computer}
+    for role in ('Rmax', 'Rpeak'):
+        if role in parsed:
+            value, unit = parsed[role]
+            rankrow[role + ' (' + unit + ')'] = value
+
+    return (record, rankrow)
+
+def listSortKey(rankrow):
+    """Sort key for Rank rows, by list date.
+
+    Parameters
+    ----------
+    rankrow : dict
+        The Rank row.
+
+    Returns
+    -------
+    tuple
+        (year, month); (0, 0) if the date is invalid.
+    """
+
+    date = convert.parseListDate(rankrow.get('List', ''))
+    if date is None:
+        return (0, 0)
+
+    return (date.year, date.month)
+
+def mergeRank(old, new):
+    """Merge two Rank lists, by list date; new rows win. Newest list first.
+
+    Parameters
+    ----------
+    old : list
+        The existing Rank rows.
+    new : list
+        The Rank rows to be merged.
+
+    Returns
+    -------
+    list
+        The merged Rank rows.
+    """
+
+    merged = {row.get('List'):row for row in old}
+    merged.update({row.get('List'):row for row in new})
+
+    return sorted(merged.values(), key=listSortKey, reverse=True)
+
+def ingestFiles(paths):
+    """Read several list files into system records, with their Rank history.
+
+    Files are processed from the oldest list to the newest, so the system
+    fields come from the latest list the system appears in.
+
+    Parameters
+    ----------
+    paths : list
+        The list files. The date comes from the file name.
+
+    Returns
+    -------
+    dict
+        Pairs of ID=>record.
+    """
+
+    dated = []
+    for path in paths:
+        date = listDateFromPath(path)
+        if not date:
+            raise ValueError('Error: Unable to get the list date from ' + path)
+        dated.append((listSortKey({'List':date}), date, path))
+
+    records = {}
+    for sortkey, date, path in sorted(dated):
+        for row in readRows(path):
+            parsed = parseRow(row)
+            if 'ID' not in parsed or convert.parseNumber(parsed['ID']) is None:
+                continue
+
+            record, rankrow = toRecord(parsed, date)
+            rank = records.get(record['ID'], {}).get('Rank', [])
+            record['Rank'] = mergeRank(rank, [rankrow])
+            records[record['ID']] = record
+
+    return records
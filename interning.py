@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Interned claim targets, per Wikibase repository: the same handful of
+items (supercomputer, the Rmax/Rpeak roles, common operating systems and
+manufacturers), units and properties are used tens of times per system,
+so they are created once and reused, instead of building and validating
+identical objects for every claim.
+
+* item(): the ItemPage of an item, shared (never loaded, only used as target)
+* unit(): the unit URI, as a single string object
+* claim(): a new Claim of a property, created with the datatype already
+  known from the first one (the prototype), so it isn't looked up again
+
+Copyright (c) 2019 Davod (Amitie 10g)
+
+Licensed under the MIT license. See LICENSE for details
+"""
+
+# :: Standard libraries
+import sys
+import threading
+
+# :: Third party libraries
+import pywikibot
+
+# :: Interners of every repository in use
+interners = {}
+interners_lock = threading.Lock()
+
+class Interner:
+    """The interned targets and claim prototypes of a repository."""
+
+    def __init__(self, repo):
+        """Parameters
+        ----------
+        repo : pywikibot.site.DataSite
+            The Wikibase data repository.
+        """
+
+        self.repo = repo
+        self.items = {}
+        self.units = {}
+        self.datatypes = {}
+
+    def item(self, identifier):
+        """Get the ItemPage of an item (QXXX), created once."""
+
+        page = self.items.get(identifier)
+        if page is None:
+            page = self.items.setdefault(identifier, pywikibot.ItemPage(self.repo, identifier))
+
+        return page
+
+    def unit(self, uri):
+        """Get the unit URI, as the same string object every time."""
+
+        unit = self.units.get(uri)
+        if unit is None:
+            unit = self.units.setdefault(uri, sys.intern(str(uri)))
+
+        return unit
+
+    def claim(self, prop):
+        """Get a new Claim of a property (PXXX).
+
+        The first Claim of every property is the prototype: its datatype is
+        looked up once, and given to the next ones.
+
+        Returns
+        -------
+        pywikibot.Claim
+            The claim, without target.
+        """
+
+        datatype = self.datatypes.get(prop)
+        if datatype is not None:
+            return pywikibot.Claim(self.repo, prop, datatype=datatype)
+
+        prototype = pywikibot.Claim(self.repo, prop)
+        self.datatypes.setdefault(prop, prototype.type)
+
+        return prototype
+
+def forRepo(repo):
+    """Get the Interner of a repository, created on first use.
+
+    Parameters
+    ----------
+    repo : pywikibot.site.DataSite
+        The Wikibase data repository.
+
+    Returns
+    -------
+    Interner
+        The same Interner for every importer writing to the repository.
+    """
+
+    interner = interners.get(repo)
+    if interner is None:
+        with interners_lock:
+            interner = interners.setdefault(repo, Interner(repo))
+
+    return interner
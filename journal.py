@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Write-ahead journal of the planned Wikibase edits, stored at a local
+SQLite database. Edits are journaled before being executed, and marked
+as done once applied, so a crashed run can be replayed from the first
+pending edit without fetching or planning anything again.
+
+Every item update is journaled as a plan: an optional 'create' entry
+(when the item doesn't exist yet), the 'claim' entries, and a final
+'finish' entry (log, pushed hash).
+
+Copyright (c) 2019 Davod (Amitie 10g)
+
+Licensed under the MIT license. See LICENSE for details
+"""
+
+# :: Standard libraries
+import json
+import time
+import sqlite3
+import threading
+
+class Journal:
+    """The edit journal."""
+
+    def __init__(self, path):
+        """Parameters
+        ----------
+        path : str
+            The database file.
+        """
+
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=FULL')
+        self.db.execute('''CREATE TABLE IF NOT EXISTS edits (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            plan INTEGER,
+            item TEXT,
+            kind TEXT,
+            claim TEXT,
+            data TEXT,
+            datatype TEXT,
+            nonempty INTEGER,
+            state TEXT DEFAULT 'pending',
+            updated REAL)''')
+        self.db.execute('CREATE INDEX IF NOT EXISTS edits_state ON edits (state, seq)')
+
+    def append(self, item, entries):
+        """Journal the edits planned for an item, in one transaction.
+
+        Parameters
+        ----------
+        item : str
+            The Wikibase item ('Q0' if it will be created by a 'create' entry).
+        entries : list
+            The (kind, claim, data, datatype, nonempty) tuples, in order.
+
+        Returns
+        -------
+        int
+            The plan number.
+        """
+
+        with self.lock:
+            with self.db:
+                self.db.execute('BEGIN')
+                plan = self.db.execute('SELECT COALESCE(MAX(plan), 0) + 1 FROM edits').fetchone()[0]
+                self.db.executemany(
+                    'INSERT INTO edits (plan, item, kind, claim, data, datatype, nonempty, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    [(plan, item, kind, claim, json.dumps(data), datatype, int(nonempty), time.time())
+                     for kind, claim, data, datatype, nonempty in entries])
+
+        return plan
+
+    def pending(self, limit=100):
+        """Get the first pending edits, in journal order.
+
+        Parameters
+        ----------
+        limit : int
+            The maximum amount of edits.
+
+        Returns
+        -------
+        list
+            Dicts with the journal columns; 'data' decoded.
+        """
+
+        with self.lock:
+            rows = self.db.execute(
+                'SELECT seq, plan, item, kind, claim, data, datatype, nonempty FROM edits '
+                'WHERE state = ? ORDER BY seq LIMIT ?', ('pending', limit)).fetchall()
+
+        return [{'seq':row[0], 'plan':row[1], 'item':row[2], 'kind':row[3], 'claim':row[4],
+                 'data':json.loads(row[5]), 'datatype':row[6], 'nonempty':bool(row[7])} for row in rows]
+
+    def countPending(self):
+        """Get the amount of pending edits."""
+
+        with self.lock:
+            return self.db.execute('SELECT COUNT(*) FROM edits WHERE state = ?', ('pending',)).fetchone()[0]
+
+    def mark(self, seq, state='done'):
+        """Mark an edit as 'done' or 'failed'."""
+
+        with self.lock:
+            self.db.execute('UPDATE edits SET state = ?, updated = ? WHERE seq = ?', (state, time.time(), seq))
+
+    def countFailed(self, plan):
+        """Get the amount of failed edits of a plan."""
+
+        with self.lock:
+            return self.db.execute('SELECT COUNT(*) FROM edits WHERE plan = ? AND state = ?', (plan, 'failed')).fetchone()[0]
+
+    def setItem(self, plan, item):
+        """Set the item of the pending edits of a plan, once the item is created."""
+
+        with self.lock:
+            self.db.execute('UPDATE edits SET item = ? WHERE plan = ? AND state = ?', (item, plan, 'pending'))
+
+    def failPlan(self, plan):
+        """Mark every pending edit of a plan as failed (eg. if the item couldn't be created)."""
+
+        with self.lock:
+            self.db.execute('UPDATE edits SET state = ?, updated = ? WHERE plan = ? AND state = ?',
+                            ('failed', time.time(), plan, 'pending'))
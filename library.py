@@ -9,26 +9,72 @@ Licensed under the MIT license. See LICENSE for details
 """
 
 # :: Standard libraries
+import os
 import re
 import sys
+import csv
 import json
-import decimal
+import hashlib
+import time
+import email.utils
+import queue
 import datetime
+import sqlite3
+import threading
 import subprocess
+import collections
+import concurrent.futures
 
 # :: Third party library
 import redis
 import requests
 from bs4 import BeautifulSoup
 import pywikibot
+from pywikibot import pagegenerators
 
 # :: Local dictionaries
 import slist
 
+# :: Local libraries
+import cache
+import index
+import convert
+import export
+import ingest
+import journal
+import singleflight
+import priority as scheduling
+import quickstatements
+import analytics
+import savequeue
+import fingerprints
+import resolver
+import interning
+import changefeed
+import concurrency
+
 class Top500Importer:
     """This is the TOP500 importer class."""
 
-    def __init__(self, wiki_site, wiki_lang, redis_server, redis_port, instance_of, top500url, log_page, status_page):
+    # Seconds a system not found at TOP500 is not requested again
+    miss_ttl = 7 * 24 * 3600
+
+    # Seconds a worker holds the lease to request a page, renewed while requesting (see singleflight.py)
+    fetch_lease = 30
+
+    # Retries of a TOP500 request on HTTP 429, 5xx or connection errors, waiting
+    # fetch_backoff seconds, doubled every time (or as said by Retry-After), fetch_max_wait at most
+    fetch_retries = 3
+    fetch_backoff = 1.0
+    fetch_max_wait = 120
+
+    # Redis Stream of the changes of the systems (see changefeed.py), trimmed to about change_maxlen events
+    change_stream = 'top500-changes'
+    change_maxlen = 100000
+
+    def __init__(self, wiki_site, wiki_lang, redis_server, redis_port, instance_of, top500url, log_page, status_page,
+                 job_queue='top500-jobs', lazy=False, cache_backend='redis', cache_path='top500.cache',
+                 mapping=slist, target='', store=None):
         """Parameters
         ----------
         wiki_site : str
@@ -47,6 +93,21 @@ class Top500Importer:
             The Wikibase log page.
         status_page : str
             The Wikibase status page.
+        job_queue : str
+            The Redis list consumed in daemon mode.
+        lazy : bool
+            If True, don't connect to the Wikibase site until first used.
+        cache_backend : str
+            The cache backend: 'redis', 'sqlite' or 'mmap' (see cache.py).
+        cache_path : str
+            The cache file, for the local backends.
+        mapping : module
+            The property/statement mapping table of the Wikibase (slist.py by default).
+        target : str
+            The Wikibase target name; empty for the main one. Items, pushed
+            hashes and counters of other targets are kept apart.
+        store : object
+            An already open cache backend to share (see addTarget()).
         """
 
         # :: Set variables
@@ -58,14 +119,93 @@ class Top500Importer:
         self.top500url = top500url
         self.log_page = log_page
         self.status_page = status_page
+        self.job_queue = job_queue
+        self.mapping = mapping
+        self.target = target
+        self._site = None
+        self._repo = None
+
+        # :: Write-ahead edit journal (disabled until useJournal())
+        self.journal = None
+        self.journal_thread = None
+        self.journal_drain = True
+        self.journal_stop = threading.Event()
+        self.journal_event = threading.Event()
+
+        # :: Resolver for the strings missing from the mapping (disabled until useResolver())
+        self.resolver = None
+
+        # :: Claim fingerprints of the item being edited: (item, revision, set); cleared by finishItem()
+        self.fingerprint_memo = (None, None, None)
+
+        # :: Background save queue (disabled until useSaveQueue())
+        self.save_queue = None
+
+        # :: Run budget (see setBudget()): stop taking new systems once reached
+        self.deadline = None
+        self.max_edits = None
+        self.drain_timeout = None
+        self.edits = 0
+        self.journaled = 0
+        self.edits_lock = threading.Lock()
+        self.stopping = threading.Event()
+
+        # :: Other Wikibase targets fed with the same data: (importer, queue, thread)
+        self.targets = []
+
+        # :: Optional profiling.MemoryTracker, stepped once per item
+        self.memory_tracker = None
+
+        # :: Keep the HTTP connections to TOP500 alive between requests
+        self.session = requests.Session()
+
+        # :: Adaptive limit of the TOP500 requests in flight (disabled until useAdaptiveConcurrency())
+        self.limiter = None
 
         # :: If something went wrong, set self.error variable
         try:
-            self.redis = redis.Redis(host=self.redis_server, port=self.redis_port, db=0)
-            self.site = pywikibot.Site(self.wiki_site, self.wiki_lang)
-        except (redis.ConnectionError, pywikibot.exceptions.SiteDefinitionError) as e:
+            self.cache = store if store is not None else cache.openCache(cache_backend, self.redis_server, self.redis_port, cache_path)
+
+            # Redis client, for the features needing a Redis server; None for local backends
+            self.redis = self.cache.client
+
+            if not lazy:
+                self._site = pywikibot.Site(self.wiki_site, self.wiki_lang)
+        except (ValueError, redis.ConnectionError, pywikibot.exceptions.SiteDefinitionError) + cache.errors as e:
             self.error = e
 
+    # :: Properties
+
+    @property
+    def site(self):
+        """The Wikibase site, created on first use. Pywikibot logs in on the first write."""
+
+        if self._site is None:
+            self._site = pywikibot.Site(self.wiki_site, self.wiki_lang)
+
+        return self._site
+
+    @property
+    def connected(self):
+        """True once the Wikibase site has been created (see site)."""
+
+        return self._site is not None
+
+    @property
+    def repo(self):
+        """The Wikibase data repository, created on first use."""
+
+        if self._repo is None:
+            self._repo = self.site.data_repository()
+
+        return self._repo
+
+    @property
+    def interned(self):
+        """The interned claim targets and prototypes of the repository (see interning.py)."""
+
+        return interning.forRepo(self.repo)
+
     # :: Instance methods
 
     def getTOP500Data(self, identifier):
@@ -93,24 +233,126 @@ class Top500Importer:
             sys.stderr.write(str(e) + '\n')
             return False
 
-        # Check if able to load from Redis
+        # Check if able to load from cache
         try:
-            data = json.loads(self.redis.get('top500-sys-' + identifier))
+            data = json.loads(self.cache.get('top500-sys-' + identifier))
 
-        # If unable to load from Redis, get from the web normally
-        except (json.JSONDecodeError, redis.exceptions.RedisError, AttributeError, TypeError):
-            # Get data from TOP500 page
-            try:
-                r = requests.get(self.top500url + '/system/' + identifier)
+        # If unable to load from cache, get from the web normally
+        except (json.JSONDecodeError, AttributeError, TypeError) + cache.errors:
+            # Skip the systems recently found missing (eg. by the cache warmer)
+            if self.isMissing(identifier):
+                return False
 
-                # Check if request returns HTTP status code 200; return False if not.
-                if r.status_code != 200:
-                    raise ValueError(u'Notice: System not found.')
-            except (ValueError, requests.exceptions.RequestException) as e:
-                #sys.stderr.write(str(e) + '\n')
+            # Request it once, even if other workers are missing it too; the result is cached
+            data = self.singleFlight('sys-' + identifier,
+                                     lambda: self.refreshTOP500Data(identifier),
+                                     lambda: self.loadTOP500Data(identifier))
+            if not data:
                 return False
 
-            # Parse the raw text from the Request object
+        return data
+
+    def loadTOP500Data(self, identifier):
+        """Get a system from the cache only.
+
+        Parameters
+        ----------
+        identifier : str
+            The TOP500 system identifier.
+
+        Returns
+        -------
+        dict
+            The system; False if recently found missing; None if not cached.
+        """
+
+        if self.isMissing(identifier):
+            return False
+
+        try:
+            return json.loads(self.cache.get('top500-sys-' + str(identifier)))
+        except (json.JSONDecodeError, TypeError) + cache.errors:
+            return None
+
+    def refreshTOP500Data(self, identifier):
+        """Get a system from the TOP500 page, and cache it (or remember it as missing).
+
+        Parameters
+        ----------
+        identifier : str
+            The TOP500 system identifier.
+
+        Returns
+        -------
+        dict
+            The system; None if not found; False if fails.
+        """
+
+        data = self.fetchTOP500Data(identifier)
+        if data is None:
+            self.setMissing(identifier)
+        elif data:
+            self.storeTOP500Data(data)
+
+        return data
+
+    def singleFlight(self, name, fetch, load):
+        """Run fetch() only once across the workers sharing the Redis server;
+        the other workers missing the same page wait for its result.
+        Without Redis (or if it fails), just run fetch().
+
+        Parameters
+        ----------
+        name : str
+            The request name (eg. 'sys-<ID>').
+        fetch : callable
+            Requests and caches the result.
+        load : callable
+            Gets the cached result; None if not cached.
+
+        Returns
+        -------
+        object
+            The result.
+        """
+
+        if self.redis is None:
+            return fetch()
+
+        try:
+            return singleflight.fetchOnce(self.redis, name, fetch, load, self.fetch_lease)
+        except cache.errors:
+            return fetch()
+
+    def fetchTOP500Data(self, identifier):
+        """Get a system from the TOP500 page and parse it, without using the cache.
+
+        Parameters
+        ----------
+        identifier : str
+            The TOP500 system identifier.
+
+        Returns
+        -------
+        dict
+            The contents from page as list; None if not found; False if fails.
+        """
+
+        # Get data from TOP500 page
+        try:
+            r = self.requestTOP500('/system/' + identifier)
+
+            # Check if request returns HTTP status code 200; return None if not found, False if fails.
+            if r.status_code == 404:
+                return None
+            if r.status_code != 200:
+                raise ValueError(u'Notice: System not available.')
+        except (ValueError, requests.exceptions.RequestException) as e:
+            #sys.stderr.write(str(e) + '\n')
+            return False
+
+        # Parse the raw text from the Request object; a malformed page fails
+        try:
             top500rawdata = r.text
             top500soup = BeautifulSoup(top500rawdata, 'html.parser')
 
@@ -158,220 +400,543 @@ class Top500Importer:
                     rowdata.update({rankheaders[j]:cell.strip()})
                     j = j+1
                 rankdata.append(rowdata)
+        except (AttributeError, IndexError):
+            sys.stderr.write(u'Notice: Unable to parse the TOP500 page of ' + identifier + '\n')
+            return False
 
-            # Merge the data into the final dictionary
-            data = {}
-            data.update({'ID':identifier})
-            data.update({'Title':name, 'Platform':platform})
-            data.update(maindata)
-            data.update({'Rank':rankdata})
-
-            # Attemp to save into Redis server
-            try:
-                self.redis.set('top500-sys-' + identifier, json.dumps(data))
-
-            except (redis.exceptions.RedisError, AttributeError):
-                pass
+        # Merge the data into the final dictionary
+        data = {}
+        data.update({'ID':identifier})
+        data.update({'Title':name, 'Platform':platform})
+        data.update(maindata)
+        data.update({'Rank':rankdata})
 
         return data
 
-    def getTOP500SiteData(self, identifier):
-        """Get site (location) available at https://www.top500.org/site/id
-        Designed to be used inside a while loop.
+    def requestTOP500(self, path):
+        """Request a TOP500 page, within the adaptive concurrency limit if enabled.
+        Throttled (HTTP 429), server errors (5xx) and failed requests are retried
+        fetch_retries times, waiting as said by Retry-After, or with exponential backoff.
 
         Parameters
         ----------
-        identifier : str
-            The TOP500 site identifier.
+        path : str
+            The page path (eg. '/system/<ID>').
 
         Returns
         -------
-        dict
-            The data found at the site (location) page.
+        requests.Response
+            The response (the last one, if still failing); raises
+            requests.exceptions.RequestException if the last request fails.
         """
 
-        # Check if the identifier string integer-like (0-9)
-        try:
-            identifier = str(identifier)
-            if re.search('^[0-9]+$', identifier) is None:
-                raise ValueError('Error: Wrong value for identifier.')
-        except ValueError as e:
-            sys.stderr.write(str(e) + '\n')
-            return False
-
-        try:
-            data = self.redis.get('top500-loc-' + identifier).decode("utf-8")
-            data = json.loads(data)
-        except (json.JSONDecodeError, redis.exceptions.RedisError):
-            # Get data from TOP500 page
-            r = requests.get(self.top500url + '/system/' + identifier)
-            if r.status_code != 200:
-                return False
-
-            top500rawdata = r.text
-            top500soup = BeautifulSoup(top500rawdata, 'html.parser')
+        attempt = 0
+        while True:
+            if self.limiter is not None:
+                self.limiter.acquire()
+            start = time.time()
+            r = None
+            try:
+                r = self.session.get(self.top500url + path)
+            except requests.exceptions.RequestException:
+                if attempt >= self.fetch_retries:
+                    raise
+            finally:
+                # Every attempt counts for the limit; the slot isn't held while waiting
+                if self.limiter is not None:
+                    self.limiter.release(time.time() - start, r.status_code if r is not None else None)
 
-            # Get the title
-            title = ''.join(top500soup.find("title").get_text().replace("\n", '')).strip().split(' | ')
+            if r is not None and ((r.status_code != 429 and r.status_code < 500) or attempt >= self.fetch_retries):
+                return r
 
-            # Extract data from the main table
-            maintable = top500soup.find("table", attrs={"class":"table-condensed"})
+            time.sleep(self.retryDelay(r, attempt))
+            attempt = attempt + 1
 
-            mainheaders = []
-            for row in maintable.find_all("tr")[0:]:
-                th = [re.sub(r'\s\s+', ' ', td.get_text()).strip().replace(':', '') for td in row.find_all("th")]
-                mainheaders.append(''.join(th))
+    def retryDelay(self, r, attempt):
+        """Get the seconds to wait before retrying a TOP500 request.
 
-            maindata = {}
-            i = 0
-            for row in maintable.find_all("tr")[0:]:
-                dataset = [re.sub(r'\s\s+', ' ', td.get_text()).strip().replace(', ', '') for td in row.find_all("td")]
-                maindata.update({mainheaders[i]:''.join(dataset)})
-                i = i+1
+        Parameters
+        ----------
+        r : requests.Response
+            The failed response; None if the request failed.
+        attempt : int
+            The attempts failed before (0 for the first one).
 
-            data = {}
-            data.update({'ID':identifier})
-            data.update({'Title':title[0]})
-            data.update(maindata)
+        Returns
+        -------
+        float
+            Retry-After (in seconds or as HTTP date) if given; fetch_backoff
+            doubled every attempt otherwise; fetch_max_wait at most.
+        """
 
+        delay = self.fetch_backoff * 2 ** attempt
+        header = r.headers.get('Retry-After') if r is not None else None
+        if header:
             try:
-                self.redis.set('top500-loc-' + identifier, json.dumps(data))
-            except redis.exceptions.RedisError:
-                pass
+                delay = float(header)
+            except ValueError:
+                date = email.utils.parsedate_tz(header)
+                if date is not None:
+                    delay = email.utils.mktime_tz(date) - time.time()
 
-        return data
+        return min(self.fetch_max_wait, max(0.0, delay))
 
-    def addClaim(self, item, claim, data, datatype='string', nonempty=True):
-        """Add a claim/qualifier to a statement.
+    def useAdaptiveConcurrency(self, floor=1, ceiling=16, target_latency=2.0):
+        """Adjust the TOP500 requests in flight from their latency, errors
+        and 429 responses (see concurrency.py), for warm(), batch() and mass().
+        Metrics are saved at top500-concurrency after every adjustment.
 
         Parameters
         ----------
-        item : str
-            The item to be edited.
-        claim : str
-            The claim (property) to be added.
-        data : mixed
-            The value for the claim.
-            If you want to add qualifiers, you should format as list. The first key
-            contains the value; the second key contains a dict (associative array)
-            with pairs of Qualifier=>Value. Possible qualifiers are (see datatype):
-
-            * 'has_role', as 'statement' datatype
+        floor : int
+            The lowest amount of requests in flight.
+        ceiling : int
+            The highest amount of requests in flight.
+        target_latency : float
+            Seconds a request may take on average before the limit is cut.
+        """
 
-            * 'date', as 'date' datatype
-        datatype : str
-            The desired data type. Possible values are:
+        self.limiter = concurrency.AdaptiveLimit(floor, ceiling, target_latency, on_adjust=self.saveConcurrency)
 
-            * 'statement', Wikidata statement
+    def saveConcurrency(self, metrics):
+        """Save the adaptive concurrency metrics at top500-concurrency."""
 
-            * 'ammount', for numeric values added as ammount, with units (optional)
+        try:
+            self.cache.set('top500-concurrency', json.dumps(metrics))
+        except cache.errors:
+            pass
 
-            * 'date', in format mm/dd/YYYY. Parsing more format is planned
+    def concurrencyMetrics(self):
+        """Get the adaptive concurrency metrics (see concurrency.AdaptiveLimit.metrics()); None if disabled."""
 
-            * 'string', plain string not associated with a statement
-        nonempty : bool
-            If want or not to write a property already set (to avoid duplicates):
+        return self.limiter.metrics() if self.limiter is not None else None
 
-            * False (default): don't write
+    def storeTOP500Data(self, data, old=None):
+        """Save a system into the cache, along with its content hash,
+        and update the indexes.
 
-            * True: write anyway
+        Parameters
+        ----------
+        data : dict
+            The data retrived from getTOP500Data().
+        old : dict
+            The data previously cached, if any (to remove stale index entries).
 
         Returns
         -------
-        mixed
-            True if the item has been updated;
-            Pagename if the item has been created;
-            False if something fails.
+        bool
+            True if successful, False if fails.
         """
 
-        # Note: Non-critical exceptions printing are commented.
-
-        stripped = lambda s: "".join(i for i in s if 31 < ord(i) < 127)
+        try:
+            digest = self.recordHash(data)
 
-        summary = 'edited using [[:d:User:TOP500 importer|TOP500 importer]]'
+            # The previous hash and the item, to tell the change feed (only with Redis)
+            previous, item = None, None
+            if self.redis is not None:
+                previous, item = self.cache.getMany(['top500-hash-' + data['ID'], index.itemKey(data['ID'], self.target)])
 
-        # :: Validate data
+            self.cache.setMany({
+                'top500-sys-' + data['ID']:json.dumps(data),
+                'top500-hash-' + data['ID']:digest})
+            index.updateIndex(self.cache, data, old)
 
-        # Validate property
-        try:
-            claim = self.str2prop(claim)
-            if not claim:
-                raise ValueError(u'Error: Unknown property provided.')
-        except ValueError as e:
-            sys.stderr.write(str(e) + '\n')
+        except (AttributeError,) + cache.errors:
             return False
 
-        # Check if data contains qualifiers
-        if isinstance(data, list):
-            value = data[0]
-            qualifiers = data[1]
-        else:
-            value = data
-            qualifiers = False
+        if self.redis is not None and previous != digest:
+            self.publishChange('stored', data['ID'], item, digest, changefeed.summarize(data, old, previous is None))
 
-        # Create item
-        if item == 'Q0':
-            try:
-                item = pywikibot.ItemPage(self.site)
-                item.editLabels(labels=data, summary=summary)
-                item = item.getID()
-                return item
-            except ValueError as e:
-                sys.stderr.write(str(e) + '\n')
-                return False
-            except (pywikibot.exceptions.PageRelatedError,
-                    pywikibot.exceptions.WikiBaseError,
-                    pywikibot.exceptions.TimeoutError,
-                    pywikibot.exceptions.Server504Error,
-                    pywikibot.exceptions.ServerError) as e:
-                sys.stderr.write(str(e) + '\n')
-                return False
-        else:
-            try:
-                repo = self.site.data_repository()
-                item = pywikibot.ItemPage(repo, item)
-            except (pywikibot.exceptions.PageRelatedError,
-                    pywikibot.exceptions.WikiBaseError,
-                    pywikibot.exceptions.TimeoutError,
-                    pywikibot.exceptions.Server504Error,
-                    pywikibot.exceptions.ServerError) as e:
-                sys.stderr.write(str(e) + '\n')
-                return False
+        return True
 
-        # Check if claim has been set already
-        if nonempty:
-            try:
-                claims = item.get(u'claims')
-                if claim in claims[u'claims']:
-                    raise ValueError(u'Notice: Claim already set: ' + stripped(str(claim)))
-            except ValueError as e:
-                #sys.stderr.write(str(e) + '\n')
-                return False
+    def publishChange(self, kind, identifier, item, digest, changes):
+        """Append an event to the change feed (see changefeed.py); nothing without Redis.
 
-        # :: Set claim
+        Parameters
+        ----------
+        kind : str
+            'stored' or 'updated'.
+        identifier : str
+            The TOP500 system identifier.
+        item : str
+            The Wikibase item; None if unknown.
+        digest : str
+            The content hash of the system.
+        changes : dict
+            The change summary.
+
+        Returns
+        -------
+        str
+            The event ID; None if not published.
+        """
+
+        if self.redis is None:
+            return None
 
         try:
-            claim = pywikibot.Claim(repo, claim)
-        except (pywikibot.exceptions.PageRelatedError,
-                pywikibot.exceptions.WikiBaseError,
-                pywikibot.exceptions.TimeoutError,
-                pywikibot.exceptions.Server504Error,
-                pywikibot.exceptions.ServerError) as e:
+            return changefeed.publish(self.redis, self.change_stream, kind, identifier, item, digest, changes, self.change_maxlen)
+        except cache.errors as e:
             sys.stderr.write(str(e) + '\n')
-            return False
+            return None
 
-        # :: Set target
+    def followChanges(self, group, handler, consumer=None, once=False):
+        """Handle the events of the change feed as a member of a consumer group (see changefeed.consume()).
 
-        # Statement (QXXX)
-        if datatype == 'statement':
-            try:
-                value = self.str2statement(stripped(str(value)))
-                if not value:
-                    raise ValueError(u'Error: Unknown statement provided!\n')
-                claim.setTarget(pywikibot.ItemPage(repo, value))
-            except ValueError:
-                #sys.stderr.write(str(e) + '\n')
-                return False
+        Parameters
+        ----------
+        group : str
+            The consumer group.
+        handler : callable
+            Called with every event; return False to stop.
+        consumer : str
+            The consumer name; <host>-<pid> if None. Give the same name on
+            restart to get the events left unacknowledged at once; otherwise
+            they are taken over once pending for a minute.
+        once : bool
+            If True, stop once no more events are waiting.
+
+        Returns
+        -------
+        int
+            The amount of events handled; False if fails.
+        """
+
+        if self.redis is None:
+            sys.stderr.write(u'Error: The change feed needs the Redis cache backend\n')
+            return False
+
+        if consumer is None:
+            consumer = os.uname()[1] + '-' + str(os.getpid())
+
+        try:
+            return changefeed.consume(self.redis, self.change_stream, group, consumer, handler, once=once)
+        except cache.errors as e:
+            sys.stderr.write(str(e) + '\n')
+            return False
+
+    def isMissing(self, identifier):
+        """Check if a system has been recently found missing at TOP500.
+
+        Parameters
+        ----------
+        identifier : str
+            The TOP500 system identifier.
+
+        Returns
+        -------
+        bool
+            True if found missing within miss_ttl seconds; False otherwise.
+        """
+
+        try:
+            missing = self.cache.get('top500-miss-' + str(identifier))
+            return missing is not None and time.time() - float(missing) < self.miss_ttl
+        except (ValueError,) + cache.errors:
+            return False
+
+    def setMissing(self, identifier):
+        """Remember that a system has been found missing at TOP500.
+
+        Parameters
+        ----------
+        identifier : str
+            The TOP500 system identifier.
+        """
+
+        try:
+            self.cache.set('top500-miss-' + str(identifier), str(time.time()))
+        except cache.errors:
+            pass
+
+    def warm(self, ranges, workers=4, delay=0.5):
+        """Fill the cache with the systems in some ID ranges, without editing.
+        Only the systems neither cached nor recently found missing are requested,
+        so writers processing those ranges later don't need to request TOP500.
+
+        Parameters
+        ----------
+        ranges : list
+            The (first, last) ID ranges, as returned by parseRanges().
+        workers : int
+            The amount of concurrent requests; with adaptive concurrency,
+            the limit ceiling is used instead.
+        delay : float
+            Seconds each worker waits after every request, to be polite.
+
+        Returns
+        -------
+        bool
+            True if successful, False if fails.
+        """
+
+        for first, last in ranges:
+            identifiers = [str(identifier) for identifier in range(first, last + 1)]
+
+            try:
+                cached = self.cachedSystems()
+                pending = [identifier for identifier in identifiers
+                           if identifier not in cached and not self.isMissing(identifier)]
+            except cache.errors as e:
+                sys.stderr.write(str(e) + '\n')
+                return False
+
+            # With adaptive concurrency, the limit (not the workers) sets the requests in flight
+            if self.limiter is not None:
+                workers = self.limiter.ceiling
+
+            start = time.time()
+            fetched = 0
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, int(workers))) as executor:
+                for data in executor.map(lambda identifier: self.warmSystem(identifier, delay), pending):
+                    fetched = fetched + 1
+                    if fetched % 100 == 0:
+                        print(u'Debug: ' + str(fetched) + '/' + str(len(pending)) + ' pages, '
+                              + '%.2f' % (fetched / (time.time() - start)) + ' pages/sec'
+                              + (', limit ' + str(self.limiter.limit) if self.limiter is not None else '') + '\n')
+
+            elapsed = max(time.time() - start, 0.001)
+            try:
+                cached = self.cachedSystems()
+            except cache.errors as e:
+                sys.stderr.write(str(e) + '\n')
+                return False
+            filled = len([identifier for identifier in identifiers
+                          if identifier in cached or self.isMissing(identifier)])
+
+            print(u'Range ' + str(first) + '-' + str(last) + ': '
+                  + str(fetched) + ' pages in ' + '%.1f' % elapsed + ' s ('
+                  + '%.2f' % (fetched / elapsed) + ' pages/sec), cache fill '
+                  + '%.1f' % (100.0 * filled / len(identifiers)) + '%\n')
+
+        return True
+
+    def cachedSystems(self):
+        """Get the IDs of the systems cached (top500-sys-<ID>), indexed or not.
+
+        Returns
+        -------
+        set
+            The system IDs; raises cache.errors if fails.
+        """
+
+        return {key[len('top500-sys-'):] for key in self.cache.scan('top500-sys-')}
+
+    def warmSystem(self, identifier, delay=0):
+        """Fetch one system into the cache (see warm()).
+
+        Parameters
+        ----------
+        identifier : str
+            The TOP500 system identifier.
+        delay : float
+            Seconds to wait after the request.
+
+        Returns
+        -------
+        dict
+            The system; None if not found; False if fails.
+        """
+
+        data = self.singleFlight('sys-' + identifier,
+                                 lambda: self.refreshTOP500Data(identifier),
+                                 lambda: self.loadTOP500Data(identifier))
+
+        time.sleep(delay)
+        return data
+
+    def getTOP500SiteData(self, identifier):
+        """Get site (location) available at https://www.top500.org/site/id
+        Designed to be used inside a while loop.
+
+        Parameters
+        ----------
+        identifier : str
+            The TOP500 site identifier.
+
+        Returns
+        -------
+        dict
+            The data found at the site (location) page.
+        """
+
+        # Check if the identifier string integer-like (0-9)
+        try:
+            identifier = str(identifier)
+            if re.search('^[0-9]+$', identifier) is None:
+                raise ValueError('Error: Wrong value for identifier.')
+        except ValueError as e:
+            sys.stderr.write(str(e) + '\n')
+            return False
+
+        try:
+            data = json.loads(self.cache.get('top500-loc-' + identifier))
+        except (json.JSONDecodeError, TypeError) + cache.errors:
+            data = self.singleFlight('loc-' + identifier,
+                                     lambda: self.fetchTOP500SiteData(identifier),
+                                     lambda: self.loadTOP500SiteData(identifier))
+
+        return data
+
+    def loadTOP500SiteData(self, identifier):
+        """Get a site from the cache only; None if not cached."""
+
+        try:
+            return json.loads(self.cache.get('top500-loc-' + str(identifier)))
+        except (json.JSONDecodeError, TypeError) + cache.errors:
+            return None
+
+    def fetchTOP500SiteData(self, identifier):
+        """Get a site from the TOP500 page and parse it, and cache it.
+
+        Parameters
+        ----------
+        identifier : str
+            The TOP500 site identifier.
+
+        Returns
+        -------
+        dict
+            The data found at the site (location) page; False if fails.
+        """
+
+        # Get data from TOP500 page
+        try:
+            r = self.requestTOP500('/site/' + identifier)
+            if r.status_code != 200:
+                raise ValueError(u'Notice: Site not available.')
+        except (ValueError, requests.exceptions.RequestException) as e:
+            sys.stderr.write(str(e) + '\n')
+            return False
+
+        # Parse the raw text from the Request object; a malformed page fails
+        try:
+            top500rawdata = r.text
+            top500soup = BeautifulSoup(top500rawdata, 'html.parser')
+
+            # Get the title
+            title = ''.join(top500soup.find("title").get_text().replace("\n", '')).strip().split(' | ')
+
+            # Extract data from the main table
+            maintable = top500soup.find("table", attrs={"class":"table-condensed"})
+
+            mainheaders = []
+            for row in maintable.find_all("tr")[0:]:
+                th = [re.sub(r'\s\s+', ' ', td.get_text()).strip().replace(':', '') for td in row.find_all("th")]
+                mainheaders.append(''.join(th))
+
+            maindata = {}
+            i = 0
+            for row in maintable.find_all("tr")[0:]:
+                dataset = [re.sub(r'\s\s+', ' ', td.get_text()).strip().replace(', ', '') for td in row.find_all("td")]
+                maindata.update({mainheaders[i]:''.join(dataset)})
+                i = i+1
+        except (AttributeError, IndexError):
+            sys.stderr.write(u'Notice: Unable to parse the TOP500 page of site ' + identifier + '\n')
+            return False
+
+        data = {}
+        data.update({'ID':identifier})
+        data.update({'Title':title[0]})
+        data.update(maindata)
+
+        try:
+            self.cache.set('top500-loc-' + identifier, json.dumps(data))
+        except cache.errors:
+            pass
+
+        return data
+
+    def addClaim(self, item, claim, data, datatype='string', nonempty=True):
+        """Add a claim/qualifier to a statement.
+
+        Parameters
+        ----------
+        item : str
+            The item to be edited.
+        claim : str
+            The claim (property) to be added.
+        data : mixed
+            The value for the claim.
+            If you want to add qualifiers, you should format as list. The first key
+            contains the value; the second key contains a dict (associative array)
+            with pairs of Qualifier=>Value. Possible qualifiers are (see datatype):
+
+            * 'has_role', as 'statement' datatype
+
+            * 'date', as 'date' datatype
+        datatype : str
+            The desired data type. Possible values are:
+
+            * 'statement', Wikidata statement
+
+            * 'ammount', for numeric values added as ammount, with units (optional)
+
+            * 'date', in format mm/dd/YYYY. Parsing more format is planned
+
+            * 'string', plain string not associated with a statement
+        nonempty : bool
+            If want or not to write a property already set (to avoid duplicates):
+
+            * False (default): don't write
+
+            * True: write anyway
+
+        Returns
+        -------
+        mixed
+            True if the item has been updated;
+            Pagename if the item has been created;
+            None if there is nothing to write (claim already set, or unknown
+            property or value);
+            False if something fails.
+        """
+
+        # Note: Non-critical exceptions printing are commented.
+
+        summary = 'edited using [[:d:User:TOP500 importer|TOP500 importer]]'
+
+        # :: Validate data
+
+        # Validate property
+        try:
+            claim = self.str2prop(claim, self.mapping)
+            if not claim:
+                raise ValueError(u'Error: Unknown property provided.')
+        except ValueError as e:
+            sys.stderr.write(str(e) + '\n')
+            return None
+
+        # Check if data contains qualifiers
+        if isinstance(data, list):
+            value = data[0]
+            qualifiers = data[1]
+        else:
+            value = data
+            qualifiers = False
+
+        # Create item
+        if item == 'Q0':
+            try:
+                item = pywikibot.ItemPage(self.site)
+                item.editLabels(labels=data, summary=summary)
+                item = item.getID()
+                self.countEdits()
+                return item
+            except ValueError as e:
+                sys.stderr.write(str(e) + '\n')
+                return False
+            except (pywikibot.exceptions.PageRelatedError,
+                    pywikibot.exceptions.WikiBaseError,
+                    pywikibot.exceptions.TimeoutError,
+                    pywikibot.exceptions.Server504Error,
+                    pywikibot.exceptions.ServerError) as e:
+                sys.stderr.write(str(e) + '\n')
+                return False
+        else:
+            try:
+                repo = self.repo
+                item = pywikibot.ItemPage(repo, item)
             except (pywikibot.exceptions.PageRelatedError,
                     pywikibot.exceptions.WikiBaseError,
                     pywikibot.exceptions.TimeoutError,
@@ -380,177 +945,1505 @@ class Top500Importer:
                 sys.stderr.write(str(e) + '\n')
                 return False
 
-        # Amount (123.45 <suffix>)
-        elif datatype == 'amount':
+        # Check if claim has been set already, from the claim fingerprints (see fingerprints.py)
+        try:
+            known = self.claimFingerprints(item)
+            if nonempty and claim in {fingerprints.claimProperty(known_claim) for known_claim in known}:
+                raise ValueError(u'Notice: Claim already set: ' + convert.stripped(claim))
+
+            planned = self.plannedFingerprint(claim, value, datatype, qualifiers)
+            if planned is not None and planned in known:
+                raise ValueError(u'Notice: Same claim already set: ' + convert.stripped(claim))
+        except ValueError as e:
+            #sys.stderr.write(str(e) + '\n')
+            return None
+        except (pywikibot.exceptions.PageRelatedError,
+                pywikibot.exceptions.WikiBaseError,
+                pywikibot.exceptions.TimeoutError,
+                pywikibot.exceptions.Server504Error,
+                pywikibot.exceptions.ServerError) as e:
+            sys.stderr.write(str(e) + '\n')
+            return False
+
+        # :: Set claim
+
+        try:
+            claim = self.interned.claim(claim)
+        except (pywikibot.exceptions.PageRelatedError,
+                pywikibot.exceptions.WikiBaseError,
+                pywikibot.exceptions.TimeoutError,
+                pywikibot.exceptions.Server504Error,
+                pywikibot.exceptions.ServerError) as e:
+            sys.stderr.write(str(e) + '\n')
+            return False
+
+        # :: Set target
+
+        # Statement (QXXX)
+        if datatype == 'statement':
+            try:
+                value = self.toStatement(value)
+                if not value:
+                    raise ValueError(u'Error: Unknown statement provided!\n')
+                claim.setTarget(self.interned.item(value))
+            except ValueError:
+                #sys.stderr.write(str(e) + '\n')
+                return None
+            except (pywikibot.exceptions.PageRelatedError,
+                    pywikibot.exceptions.WikiBaseError,
+                    pywikibot.exceptions.TimeoutError,
+                    pywikibot.exceptions.Server504Error,
+                    pywikibot.exceptions.ServerError) as e:
+                sys.stderr.write(str(e) + '\n')
+                return False
+
+        # Amount (123.45 <suffix>)
+        elif datatype == 'amount':
+            try:
+                quantity = convert.toAmount(value, self.mapping)
+                if not quantity:
+                    raise ValueError(u'Error: Non-numeric value, or invalid unit provided!')
+                amount, unit = quantity
+            except ValueError as e:
+                #sys.stderr.write(str(e) + '\n')
+                return None
+
+            try:
+                if unit:
+                    claim.setTarget(pywikibot.WbQuantity(amount=amount, unit=self.interned.unit(unit), site=self.site))
+                else:
+                    claim.setTarget(pywikibot.WbQuantity(amount=amount, site=self.site))
+            except ValueError as e:
+                #sys.stderr.write(str(e) + '\n')
+                return False
+            except (pywikibot.exceptions.PageRelatedError,
+                    pywikibot.exceptions.WikiBaseError,
+                    pywikibot.exceptions.TimeoutError,
+                    pywikibot.exceptions.Server504Error,
+                    pywikibot.exceptions.ServerError) as e:
+                sys.stderr.write(str(e) + '\n')
+                return False
+
+        # Date (12/2018)
+        elif datatype == 'date':
+            try:
+                date = convert.toDate(value)
+                if not date:
+                    raise ValueError(u'Error: Invalid date provided!')
+                claim.setTarget(pywikibot.WbTime(year=date[0], month=date[1]))
+            except ValueError:
+                #sys.stderr.write(str(e) + '\n')
+                return None
+            except (pywikibot.exceptions.PageRelatedError,
+                    pywikibot.exceptions.WikiBaseError,
+                    pywikibot.exceptions.TimeoutError,
+                    pywikibot.exceptions.Server504Error,
+                    pywikibot.exceptions.ServerError) as e:
+                sys.stderr.write(str(e) + '\n')
+                return False
+
+        # String ("anything")
+        else:
+            try:
+                claim.setTarget(convert.stripped(value))
+            except ValueError as e:
+                #sys.stderr.write(str(e) + '\n')
+                return False
+            except (pywikibot.exceptions.TimeoutError,
+                    pywikibot.exceptions.Server504Error,
+                    pywikibot.exceptions.ServerError) as e:
+                sys.stderr.write(str(e) + '\n')
+                return False
+
+        # :: Add claim
+
+        try:
+            item.addClaim(claim, summary=summary)
+        except (pywikibot.exceptions.PageRelatedError,
+                pywikibot.exceptions.WikiBaseError,
+                pywikibot.exceptions.TimeoutError,
+                pywikibot.exceptions.Server504Error,
+                pywikibot.exceptions.ServerError) as e:
+            sys.stderr.write(str(e) + '\n')
+            return False
+
+        # :: Qualifiers
+
+        added = 0
+        if qualifiers is not False:
+            for qualifier_key, qualifier_value in qualifiers.items():
+                try:
+                    prop = self.str2prop(qualifier_key, self.mapping)
+                    if not prop:
+                        raise ValueError(u'Error: Unknown property provided!')
+                    qualifier = self.interned.claim(prop)
+                except (ValueError, pywikibot.exceptions.WikiBaseError) as e:
+                        #sys.stderr.write(str(e) + '\n')
+                    continue
+                except (pywikibot.exceptions.PageRelatedError,
+                        pywikibot.exceptions.TimeoutError,
+                        pywikibot.exceptions.Server504Error) as e:
+                    sys.stderr.write(str(e) + '\n')
+                    return False
+
+                if qualifier_key == 'has_role':
+                    try:
+                        statement = self.toStatement(qualifier_value)
+                        if not statement:
+                            raise ValueError(u'Error: \'has_role\' statement not set!')
+                        qualifier.setTarget(self.interned.item(statement))
+                    except (ValueError, pywikibot.exceptions.WikiBaseError) as e:
+                        #sys.stderr.write(str(e) + '\n')
+                        continue
+                    except (pywikibot.exceptions.PageRelatedError,
+                            pywikibot.exceptions.TimeoutError,
+                            pywikibot.exceptions.Server504Error) as e:
+                        sys.stderr.write(str(e) + '\n')
+                        return False
+
+                elif qualifier_key == 'date':
+
+                    try:
+                        date = convert.toDate(qualifier_value)
+                        if not date:
+                            raise ValueError(u'Error: Invalid date provided for qualifier!\n')
+                        qualifier.setTarget(pywikibot.WbTime(year=date[0], month=date[1]))
+                    except (ValueError, pywikibot.exceptions.WikiBaseError) as e:
+                        #sys.stderr.write(str(e) + '\n')
+                        continue
+                    except (pywikibot.exceptions.PageRelatedError,
+                            pywikibot.exceptions.TimeoutError,
+                            pywikibot.exceptions.Server504Error) as e:
+                        sys.stderr.write(str(e) + '\n')
+                        return False
+
+                else:
+                    try:
+                        qualifier.setTarget(qualifier_value)
+                    except (ValueError, pywikibot.exceptions.WikiBaseError) as e:
+                        #sys.stderr.write(str(e) + '\n')
+                        continue
+                    except (pywikibot.exceptions.PageRelatedError,
+                            pywikibot.exceptions.TimeoutError,
+                            pywikibot.exceptions.Server504Error) as e:
+                        sys.stderr.write(str(e) + '\n')
+                        return False
+
+                try:
+                    claim.addQualifier(qualifier, summary=summary)
+                    added = added + 1
+                except (ValueError, pywikibot.exceptions.WikiBaseError) as e:
+                    #sys.stderr.write(str(e) + '\n')
+                    continue
+                except (pywikibot.exceptions.PageRelatedError,
+                        pywikibot.exceptions.TimeoutError,
+                        pywikibot.exceptions.Server504Error) as e:
+                    sys.stderr.write(str(e) + '\n')
+                    return False
+
+        # Remember the claim, unless some qualifier is missing (then seed it again next time)
+        self.rememberClaim(item, planned if added == len(qualifiers or {}) else None)
+
+        self.countEdits()
+        return True
+
+    def toStatement(self, value):
+        """Get the item of a string, from the mapping or else from the resolver, if enabled.
+
+        Parameters
+        ----------
+        value : str
+            The string.
+
+        Returns
+        -------
+        str
+            The item; False if unknown.
+        """
+
+        item = convert.toStatement(value, self.mapping)
+        if item or self.resolver is None:
+            return item
+
+        try:
+            return self.resolver.resolve(convert.stripped(value))
+        except cache.errors as e:
+            sys.stderr.write(str(e) + '\n')
+            return False
+
+    def useResolver(self, index_path=None):
+        """Enable the resolver for the strings missing from the mapping (see resolver.py).
+
+        Parameters
+        ----------
+        index_path : str
+            The offline label index (TSV of label and item); None to use only wbsearchentities.
+
+        Returns
+        -------
+        bool
+            True if successful, False if unable to read the index.
+        """
+
+        try:
+            self.resolver = resolver.Resolver(self.cache, self.searchEntities, self.singleFlight, index_path=index_path)
+            return True
+        except (OSError, IOError, UnicodeDecodeError) as e:
+            sys.stderr.write(str(e) + '\n')
+            return False
+
+    def searchEntities(self, text):
+        """Look a string up through wbsearchentities.
+
+        Parameters
+        ----------
+        text : str
+            The string.
+
+        Returns
+        -------
+        list
+            The candidates, as returned by the API.
+        """
+
+        try:
+            return list(self.repo.search_entities(text, 'en', total=5))
+        except (pywikibot.exceptions.WikiBaseError,
+                pywikibot.exceptions.TimeoutError,
+                pywikibot.exceptions.Server504Error,
+                pywikibot.exceptions.ServerError) as e:
+            raise ValueError(str(e))
+
+    def reviewQueue(self):
+        """Get the strings resolved remotely, waiting for review (see resolver.py).
+
+        Returns
+        -------
+        list
+            Dicts with 'text', 'item' and 'candidates'; False if fails.
+        """
+
+        try:
+            return resolver.reviewQueue(self.cache)
+        except cache.errors as e:
+            sys.stderr.write(str(e) + '\n')
+            return False
+
+    def claimFingerprints(self, item):
+        """Get the fingerprints of the claims of an item (see fingerprints.py): the
+        saved ones if still valid at the item lastrevid, or else read from the entity.
+
+        Parameters
+        ----------
+        item : pywikibot.ItemPage
+            The item.
+
+        Returns
+        -------
+        set
+            The fingerprints.
+        """
+
+        identifier = item.getID()
+        if self.fingerprint_memo[0] == identifier:
+            return self.fingerprint_memo[2]
+
+        try:
+            revision, known = fingerprints.load(self.cache, identifier, self.target)
+        except cache.errors:
+            revision, known = None, None
+
+        if revision is None or revision != self.lastRevision(item):
+            item.get()
+            revision, known = item.latest_revision_id, fingerprints.itemFingerprints(item)
+            try:
+                fingerprints.save(self.cache, identifier, revision, known, self.target)
+            except cache.errors:
+                pass
+
+        self.fingerprint_memo = (identifier, revision, known)
+        return known
+
+    def rememberClaim(self, item, planned):
+        """Save the fingerprint of a claim just added, at the new item revision.
+
+        Parameters
+        ----------
+        item : pywikibot.ItemPage
+            The item.
+        planned : str
+            The fingerprint; None to drop the saved ones (eg. if not all the
+            qualifiers could be added).
+        """
+
+        identifier = item.getID()
+        known = self.claimFingerprints(item) if self.fingerprint_memo[0] == identifier else None
+
+        try:
+            revision = item.latest_revision_id
+        except (AttributeError, pywikibot.exceptions.PageRelatedError):
+            revision = None
+
+        try:
+            if planned is None or known is None or revision is None:
+                self.cache.delete(fingerprints.key(identifier, self.target))
+                self.fingerprint_memo = (None, None, None)
+                return
+
+            known.add(planned)
+            fingerprints.save(self.cache, identifier, revision, known, self.target)
+            self.fingerprint_memo = (identifier, revision, known)
+        except cache.errors:
+            self.fingerprint_memo = (None, None, None)
+
+    def plannedFingerprint(self, claim, value, datatype, qualifiers):
+        """Get the fingerprint of a claim about to be added (see addClaim()).
+
+        Parameters
+        ----------
+        claim : str
+            The property (PXXX).
+        value : str
+            The value, before conversion.
+        datatype : str
+            The value datatype.
+        qualifiers : dict
+            The qualifiers, before conversion; False if none.
+
+        Returns
+        -------
+        str
+            The fingerprint; None if some value is invalid.
+        """
+
+        if datatype == 'statement':
+            value = self.toStatement(value)
+            target = fingerprints.normalizeItem(value) if value else None
+        elif datatype == 'amount':
+            quantity = convert.toAmount(value, self.mapping)
+            target = fingerprints.normalizeQuantity(*quantity) if quantity else None
+        elif datatype == 'date':
+            date = convert.toDate(value)
+            target = fingerprints.normalizeDate(*date) if date else None
+        else:
+            target = convert.stripped(value)
+
+        if target is None:
+            return None
+
+        pairs = []
+        for qualifier_key, qualifier_value in (qualifiers or {}).items():
+            prop = self.str2prop(qualifier_key, self.mapping)
+            if qualifier_key == 'has_role':
+                qualifier_value = self.toStatement(qualifier_value)
+            elif qualifier_key == 'date':
+                date = convert.toDate(qualifier_value)
+                qualifier_value = fingerprints.normalizeDate(*date) if date else None
+            if not prop or not qualifier_value:
+                return None
+            pairs.append((prop, str(qualifier_value)))
+
+        return fingerprints.fingerprint(claim, target, pairs)
+
+    def lastRevision(self, item):
+        """Get the current revision of an item, without reading the entity.
+
+        Parameters
+        ----------
+        item : pywikibot.ItemPage
+            The item.
+
+        Returns
+        -------
+        int
+            The lastrevid; None if unknown.
+        """
+
+        request = self.repo.simple_request(action='query', prop='info', titles=item.title())
+        pages = request.submit().get('query', {}).get('pages', {})
+        for page in pages.values():
+            return page.get('lastrevid')
+
+        return None
+
+    def updateItem(self, data, item='Q0', updatelog=True, callback=None):
+        """Update an item.
+
+        Parameters
+        ----------
+        item : str
+            The Wikidata item to be edited. If no item provided, new one will be created.
+        data : dict
+            The data retrived from getTOP500Data().
+        updatelog : bool
+            If True, save the item at the log page.
+        callback : callable
+            Called with the result once the item is saved.
+
+        Returns
+        -------
+        bool
+            True if successful, False if fails. With the journal enabled,
+            True once the edits have been journaled; with the save queue
+            enabled, True once they have been queued.
+        """
+
+        if bool(re.search('^Q[0-9]+$', item)) is None:
+            return False
+
+        if self.journal is not None:
+            result = self.journalItem(data, item, updatelog)
+
+        elif self.save_queue is not None:
+            self.save_queue.put(lambda: self.writeItem(data, item, updatelog), callback)
+            return True
+
+        else:
+            result = self.writeItem(data, item, updatelog)
+
+        if callback is not None:
+            callback(result)
+
+        return result
+
+    def writeItem(self, data, item='Q0', updatelog=True):
+        """Save the edits of an item (see updateItem()).
+
+        Parameters
+        ----------
+        data : dict
+            The data retrived from getTOP500Data().
+        item : str
+            The Wikidata item to be edited. If 'Q0', new one will be created.
+        updatelog : bool
+            If True, save the item at the log page.
+
+        Returns
+        -------
+        bool
+            True if successful, False if fails (or some claim failed; then the
+            system isn't remembered as pushed, so --incremental retries it).
+        """
+
+        if item == 'Q0':
+            print(u'Creating new item...\n')
+            try:
+                item = self.addClaim(item, 'label', {'en':data['Title'], 'es':data['Title']}, 'label')
+                if not item:
+                    raise ValueError(u'Error: Something went wrong when creating a new item')
+            except (ValueError, IndexError, KeyError) as e:
+                sys.stderr.write(str(e) + '\n')
+                return False
+
+        label = None
+        failed = 0
+        for step, claim, value, datatype, nonempty in self.planItem(data):
+            if step != label:
+                print(u'\n' + step + '...')
+                label = step
+            try:
+                if self.addClaim(item, claim, value, datatype, nonempty) is False:
+                    failed = failed + 1
+            except (ValueError, IndexError) as e:
+                #sys.stderr.write(str(e) + '\n')
+                failed = failed + 1
+
+        if failed:
+            sys.stderr.write(u'Error: ' + str(failed) + ' claims failed at ' + item + '\n')
+
+        self.finishItem(data, item, updatelog, failed == 0)
+
+        return failed == 0
+
+    def planItem(self, data):
+        """Plan the claims to be added for a system, in order.
+
+        Parameters
+        ----------
+        data : dict
+            The data retrived from getTOP500Data().
+
+        Returns
+        -------
+        list
+            The (step, claim, value, datatype, nonempty) tuples, as addClaim()
+            arguments; step is a label for the progress output.
+        """
+
+        plan = [('Instance of', 'instance_of', self.instance_of, 'statement', True)]
+
+        # Bus is not available at Wikidata yet, see Wikidata:Property_proposal/bus
+        for step, claim, field, datatype in (('Manufacturer', 'manufacturer', 'Manufacturer', 'statement'),
+                                             ('Site', 'site', 'Site', 'statement'),
+                                             ('Cores', 'cores', 'Cores', 'amount'),
+                                             ('Memory', 'memory', 'Memory', 'amount'),
+                                             ('CPU', 'cpu', 'Processor', 'statement'),
+                                             ('Power', 'power', 'Power Consumption', 'amount'),
+                                             ('OS', 'os', 'Operating System', 'statement'),
+                                             ('Platform', 'platform', 'Platform', 'statement'),
+                                             ('Top500 ID', 'top500identifier', 'ID', 'string')):
+            if field in data:
+                plan.append((step, claim, data[field], datatype, True))
+
+        # Performance (loop)
+        for rankdata in data.get('Rank', []):
+            date = rankdata.get('List')
+
+            try:
+                rmax = rankdata['Rmax (GFlops)'] + ' GFlops'
+                rpeak = rankdata['Rpeak (GFlops)'] + ' GFlops'
+            except (ValueError, IndexError, KeyError):
+                try:
+                    rmax = rankdata['Rmax (TFlops)'] + ' TFlops'
+                    rpeak = rankdata['Rpeak (TFlops)'] + ' TFlops'
+                except (ValueError, IndexError, KeyError):
+                    try:
+                        rmax = rankdata['Rmax (PFlops)'] + ' PFlops'
+                        rpeak = rankdata['Rpeak (PFlops)'] + ' PFlops'
+                    except (ValueError, IndexError, KeyError):
+                        #sys.stderr.write(str(e) + '\n')
+                        continue
+
+            plan.append(('Performance', 'performance', [rmax, {'has_role':'rmax', 'date':date}], 'amount', False))
+            plan.append(('Performance', 'performance', [rpeak, {'has_role':'rpeak', 'date':date}], 'amount', False))
+
+        # Best rank ever, if the metrics have been computed (see analytics.py)
+        try:
+            metrics = analytics.getMetrics(self.cache, data['ID'])
+        except (KeyError,) + cache.errors:
+            metrics = None
+
+        if metrics:
+            plan.append(('Ranking', 'ranking', [str(metrics['best_rank']), {'date':metrics['best_list']}], 'amount', True))
+
+        return plan
+
+    def finishItem(self, data, item, updatelog=True, complete=True):
+        """Log an updated item, and remember what has been pushed.
+
+        Parameters
+        ----------
+        data : dict
+            The data retrived from getTOP500Data().
+        item : str
+            The Wikidata item updated.
+        updatelog : bool
+            If True, save the item at the log page.
+        complete : bool
+            False if some claim failed: the item is remembered, but not the
+            system as pushed (nor announced at the change feed).
+        """
+
+        # The item is done: its fingerprints are checked at its lastrevid again next time
+        self.fingerprint_memo = (None, None, None)
+
+        # Once everything done, log
+        if updatelog:
+            self.updateLog(item)
+
+        # Remember the item and, if every claim has been written, what has been pushed, for incremental runs
+        try:
+            index.setItem(self.cache, data['ID'], item, self.target)
+            if not complete:
+                return
+
+            digest = self.recordHash(data)
+            pushed = self.cache.get(self.pushedKey(data['ID'])) if self.redis is not None else None
+            self.cache.set(self.pushedKey(data['ID']), self.pushedHash(data))
+        except (AttributeError, KeyError) + cache.errors:
+            return
+
+        self.publishChange('updated', data['ID'], item, digest, {'target':self.target, 'first':pushed is None})
+
+    def useSaveQueue(self, backlog=50):
+        """Enable the background save queue (see savequeue.py). From now,
+        updateItem() queues the edits, and returns without waiting for them.
+
+        Parameters
+        ----------
+        backlog : int
+            The maximum amount of items waiting to be saved.
+        """
+
+        self.save_queue = savequeue.SaveQueue(backlog)
+
+    def whenSaved(self, callback):
+        """Run a callback once every edit queued so far is saved (at once,
+        without the save queue); eg. to update a counter after the item updates.
+
+        Parameters
+        ----------
+        callback : callable
+            Called with None.
+        """
+
+        if self.save_queue is not None:
+            self.save_queue.put(None, callback)
+        else:
+            callback(None)
+
+    def stopSaveQueue(self, drain=True):
+        """Stop the save queue.
+
+        Parameters
+        ----------
+        drain : bool
+            If True, save every queued item first (for drain_timeout seconds
+            at most, if set); if False, stop after the current one.
+        """
+
+        if self.save_queue is None:
+            return
+
+        self.save_queue.stop(drain, self.drain_timeout)
+        self.save_queue = None
+
+    def stopWriters(self, drain=True):
+        """Stop every background writer: the save queue, the journal applier
+        and the other Wikibase targets.
+
+        Parameters
+        ----------
+        drain : bool
+            If True, write what is pending first (see drain_timeout).
+        """
+
+        self.stopSaveQueue(drain)
+        self.stopApplier(drain)
+        self.stopTargets(drain)
+
+    def useJournal(self, path):
+        """Enable the write-ahead edit journal (see journal.py). From now,
+        updateItem() only journals the edits, and the applier executes them.
+
+        Parameters
+        ----------
+        path : str
+            The journal file.
+
+        Returns
+        -------
+        bool
+            True if successful, False if fails.
+        """
+
+        try:
+            self.journal = journal.Journal(path)
+            return True
+        except sqlite3.Error as e:
+            sys.stderr.write(str(e) + '\n')
+            return False
+
+    def journalItem(self, data, item='Q0', updatelog=True):
+        """Journal the edits for an item, to be executed by the applier.
+
+        Parameters
+        ----------
+        data : dict
+            The data retrived from getTOP500Data().
+        item : str
+            The Wikidata item to be edited. If 'Q0', new one will be created.
+        updatelog : bool
+            If True, save the item at the log page once applied.
+
+        Returns
+        -------
+        bool
+            True if successful, False if fails.
+        """
+
+        entries = []
+        if item == 'Q0':
+            if 'Title' not in data:
+                return False
+            entries.append(('create', 'label', {'en':data['Title'], 'es':data['Title']}, 'label', True))
+
+        for step, claim, value, datatype, nonempty in self.planItem(data):
+            entries.append(('claim', claim, value, datatype, nonempty))
+
+        entries.append(('finish', None, {'data':data, 'updatelog':updatelog}, None, False))
+
+        try:
+            self.journal.append(item, entries)
+        except sqlite3.Error as e:
+            sys.stderr.write(str(e) + '\n')
+            return False
+
+        # Journaled edits count against the run budget, as they are applied later
+        self.countEdits(len(entries) - 1, journaled=True)
+
+        self.journal_event.set()
+        return True
+
+    def applyJournal(self):
+        """Execute the pending journal edits, in order, until there are none left
+        (or the applier is stopped without draining).
+
+        Returns
+        -------
+        int
+            The amount of edits applied.
+        """
+
+        applied = 0
+        while not self.journal_stop.is_set() or self.journal_drain:
+            try:
+                entries = self.journal.pending()
+            except sqlite3.Error as e:
+                sys.stderr.write(str(e) + '\n')
+                break
+
+            if not entries:
+                break
+
+            for entry in entries:
+                if self.journal_stop.is_set() and not self.journal_drain:
+                    return applied
+
+                state = 'done'
+                if entry['kind'] == 'create':
+                    print(u'Creating new item...\n')
+                    try:
+                        item = self.addClaim('Q0', 'label', entry['data'], 'label')
+                    except pywikibot.exceptions.Error as e:
+                        sys.stderr.write(str(e) + '\n')
+                        item = False
+                    if item:
+                        self.journal.setItem(entry['plan'], item)
+                    else:
+                        sys.stderr.write(u'Error: Something went wrong when creating a new item\n')
+                        self.journal.failPlan(entry['plan'])
+                        break
+
+                elif entry['item'] == 'Q0':
+                    # The item of this plan hasn't been created (eg. pending 'create' failed)
+                    state = 'failed'
+
+                elif entry['kind'] == 'finish':
+                    self.finishItem(entry['data']['data'], entry['item'], entry['data']['updatelog'],
+                                    self.journal.countFailed(entry['plan']) == 0)
+
+                else:
+                    try:
+                        if self.addClaim(entry['item'], entry['claim'], entry['data'], entry['datatype'], entry['nonempty']) is False:
+                            state = 'failed'
+                    except (ValueError, IndexError) as e:
+                        #sys.stderr.write(str(e) + '\n')
+                        state = 'failed'
+
+                    # Any Wikibase error (eg. APIError) only fails this edit, the applier goes on
+                    except pywikibot.exceptions.Error as e:
+                        sys.stderr.write(str(e) + '\n')
+                        state = 'failed'
+
+                self.journal.mark(entry['seq'], state)
+                applied = applied + 1
+
+                # Re-read the plan, as a 'create' changes the item of the next entries
+                if entry['kind'] == 'create':
+                    break
+
+        return applied
+
+    def startApplier(self):
+        """Start the journal applier in a background thread.
+
+        Returns
+        -------
+        threading.Thread
+            The applier thread.
+        """
+
+        def run():
+            while not self.journal_stop.is_set():
+                self.applyJournal()
+                self.journal_event.wait(1)
+                self.journal_event.clear()
+            if self.journal_drain:
+                self.applyJournal()
+
+        self.journal_stop.clear()
+        self.journal_thread = threading.Thread(target=run, name='journal-applier', daemon=True)
+        self.journal_thread.start()
+        return self.journal_thread
+
+    def stopApplier(self, drain=True):
+        """Stop the journal applier.
+
+        Parameters
+        ----------
+        drain : bool
+            If True, apply every pending edit first (for drain_timeout seconds
+            at most, if set); if False, stop after the current edit (the rest
+            is kept in the journal for replay).
+        """
+
+        if self.journal_thread is None:
+            return
+
+        self.journal_drain = drain
+        self.journal_stop.set()
+        self.journal_event.set()
+        self.journal_thread.join(self.drain_timeout if drain else None)
+
+        if self.journal_thread.is_alive():
+            sys.stderr.write(u'Notice: Drain window over, the pending edits are kept for --replay\n')
+            self.journal_drain = False
+            self.journal_thread.join()
+
+        self.journal_thread = None
+
+    def setBudget(self, max_runtime=None, max_edits=None, drain_timeout=None):
+        """Limit the run; once reached, no new system is taken, and the
+        one in progress is finished (or journaled).
+
+        Parameters
+        ----------
+        max_runtime : float
+            Seconds from now; None for no limit.
+        max_edits : int
+            Edits (items created and claims added, or journaled); None for no limit.
+        drain_timeout : float
+            Seconds the journal applier may keep applying the pending edits
+            once stopped; None for no limit.
+        """
+
+        self.deadline = time.time() + max_runtime if max_runtime else None
+        self.max_edits = max_edits or None
+        self.drain_timeout = drain_timeout
+
+    def requestStop(self, *args):
+        """Stop taking new systems (eg. on SIGTERM); usable as signal handler."""
+
+        if not self.stopping.is_set():
+            sys.stderr.write(u'Notice: Stopping after the current system\n')
+        self.stopping.set()
+
+    def countEdits(self, amount=1, journaled=False):
+        """Count edits against the run budget; safe from the writer threads.
+
+        Parameters
+        ----------
+        amount : int
+            The amount of edits.
+        journaled : bool
+            If True, the edits have been journaled (to be applied later), not made.
+        """
+
+        with self.edits_lock:
+            if journaled:
+                self.journaled = self.journaled + amount
+            else:
+                self.edits = self.edits + amount
+
+    def shouldStop(self):
+        """Check if the run must stop taking new systems (see setBudget())."""
+
+        if self.stopping.is_set():
+            return True
+
+        if self.deadline is not None and time.time() >= self.deadline:
+            sys.stderr.write(u'Notice: Run time budget reached\n')
+            self.stopping.set()
+        elif self.max_edits is not None and max(self.edits, self.journaled) >= self.max_edits:
+            sys.stderr.write(u'Notice: Edit budget reached\n')
+            self.stopping.set()
+
+        return self.stopping.is_set()
+
+    def addTarget(self, importer, delay=0, backlog=1000):
+        """Feed another Wikibase target with every system updated here, from
+        a writer thread of its own, so the data is fetched and parsed once.
+
+        Parameters
+        ----------
+        importer : Top500Importer
+            The importer of the target (with its own site, mapping and target name).
+        delay : float
+            Seconds the target writer waits after every item (its rate limit).
+        backlog : int
+            The maximum amount of systems waiting for the target writer;
+            once reached, the main writer waits.
+
+        Returns
+        -------
+        threading.Thread
+            The target writer thread.
+        """
+
+        pending = queue.Queue(maxsize=backlog)
+        thread = threading.Thread(target=importer.writeTarget, args=(pending, delay),
+                                  name='target-' + importer.target, daemon=True)
+        thread.start()
+        self.targets.append((importer, pending, thread))
+        return thread
+
+    def writeTarget(self, pending, delay=0):
+        """Update the items of this target with the systems queued by fanOut(),
+        until None is queued. Progress is saved as the main writer does, with
+        '-<target>' added to the counter prefix (eg. 'masscount-<target>.<mul>').
+
+        Parameters
+        ----------
+        pending : queue.Queue
+            The (data, incremental, counter) entries to be written.
+        delay : float
+            Seconds to wait after every item.
+        """
+
+        while not self.stopping.is_set():
+            entry = pending.get()
+            if entry is None:
+                break
+
+            data, incremental, counter = entry
+            print(u'Debug: ' + self.target + ': ID: ' + str(data['ID']) + '\n')
+
+            # Any error only fails this system: if the thread died, fanOut() would block forever
+            try:
+                if incremental and self.isUnchanged(data):
+                    print(u'Notice: ' + self.target + ': System unchanged, skipping.\n')
+                else:
+                    try:
+                        item = index.getItem(self.cache, data['ID'], self.target) or 'Q0'
+                    except cache.errors:
+                        item = 'Q0'
+
+                    try:
+                        if not self.updateItem(data, item):
+                            raise ValueError(u'Error: ' + self.target + ': Something went wrong when updating ' + str(data['ID']))
+                    finally:
+                        time.sleep(delay)
+            except Exception as e:
+                sys.stderr.write(type(e).__name__ + ': ' + str(e) + '\n')
+
+            if counter is not None:
+                amount, mul, prefix = counter
+                self.whenSaved(lambda result, amount=amount, mul=mul, prefix=prefix:
+                               self.updateCounter(amount, mul, self.targetPrefix(prefix)))
+
+    def fanOut(self, data, incremental=False, counter=None, only=None):
+        """Queue a system for the other Wikibase targets (see addTarget()).
+        Each target checks by itself if the system is unchanged for it.
+
+        Parameters
+        ----------
+        data : dict
+            The data retrived from getTOP500Data().
+        incremental : bool
+            If True, the targets skip the system if unchanged since last pushed to them.
+        counter : tuple
+            (amount, mul, prefix) of the main writer counter (see updateCounter()),
+            saved by every target under its own prefix; None if not counted.
+        only : list
+            The names of the targets to be fed; None for every target.
+        """
+
+        for importer, pending, thread in self.targets:
+            if only is None or importer.target in only:
+                pending.put((data, incremental, counter))
+
+    def targetPrefix(self, prefix):
+        """Get the counter prefix of this target (see writeTarget())."""
+
+        return prefix + '-' + self.target if self.target else prefix
+
+    def targetCounters(self, mul, prefix, default):
+        """Read the counters of the other targets, to resume the ones behind.
+
+        Parameters
+        ----------
+        mul : mixed
+            The counter suffix (see readCounter()).
+        prefix : str
+            The counter prefix of the main writer.
+        default : int
+            The value of the counters not saved yet.
+
+        Returns
+        -------
+        dict
+            Pairs of target name=>counter.
+        """
+
+        return {importer.target:importer.readCounter(mul, importer.targetPrefix(prefix)) or default
+                for importer, pending, thread in self.targets}
+
+    def stopTargets(self, drain=True):
+        """Stop the target writers.
+
+        Parameters
+        ----------
+        drain : bool
+            If True, write every queued system first (for drain_timeout seconds
+            at most, if set); if False, drop them.
+        """
+
+        for importer, pending, thread in self.targets:
+            if not drain:
+                try:
+                    while True:
+                        pending.get_nowait()
+                except queue.Empty:
+                    pass
+            pending.put(None)
+
+        deadline = time.time() + self.drain_timeout if drain and self.drain_timeout else None
+        for importer, pending, thread in self.targets:
+            thread.join(max(0, deadline - time.time()) if deadline is not None else None)
+            if thread.is_alive():
+                # Drain window over: stop after the current system
+                importer.requestStop()
+                thread.join()
+
+        self.targets = []
+
+    def pushedKey(self, identifier):
+        """Get the key of the hash last pushed to this target."""
+
+        return 'top500-pushed-' + (self.target + '-' if self.target else '') + str(identifier)
+
+    def pushedHash(self, data):
+        """Get the hash of what is pushed for a system: its content hash (see
+        recordHash()), plus the best rank from its metrics (see planItem()), if
+        computed; so the ranking is written once --metrics has run.
+
+        Parameters
+        ----------
+        data : dict
+            The data retrived from getTOP500Data().
+
+        Returns
+        -------
+        str
+            The SHA-1 hex digest; the content hash if no metrics.
+        """
+
+        digest = self.recordHash(data)
+        try:
+            metrics = analytics.getMetrics(self.cache, data['ID'])
+        except (KeyError,) + cache.errors:
+            metrics = None
+
+        if not metrics:
+            return digest
+
+        return self.recordHash({'hash':digest, 'best_rank':metrics.get('best_rank'), 'best_list':metrics.get('best_list')})
+
+    def isUnchanged(self, data):
+        """Check if a system is the same as the last one pushed to Wikibase.
+
+        Parameters
+        ----------
+        data : dict
+            The data retrived from getTOP500Data().
+
+        Returns
+        -------
+        bool
+            True if the content hash (and ranking) matches the pushed one; False otherwise.
+        """
+
+        try:
+            return self.cache.get(self.pushedKey(data['ID'])) == self.pushedHash(data)
+
+        except (AttributeError, KeyError) + cache.errors:
+            return False
+
+    def updateStatus(self, status=0):
+        """Update status page.
+
+        Parameters
+        ----------
+        status : int
+            The status:
+
+             * 0: stopped
+
+             * 1: running
+
+             * 2: error (if something went wrong)
+
+        Returns
+        -------
+        object
+            pywikibot.Page.save() result: True if successful; False if fails.
+        """
+
+        summary = 'update bot status: '
+
+        if status == 0:
+            summary = summary + 'running'
+        elif status == 2:
+            summary = summary + 'stopped'
+        elif status == 128:
+            summary = summary + 'ended one'
+        elif status == 1:
+            summary = summary + 'error'
+
+        try:
+            page = pywikibot.Page(self.site, self.status_page)
+            page.text = str(status)
+            return page.save(summary=summary, minor=True)
+        except (NameError, AttributeError):
+            return False
+        except (pywikibot.exceptions.PageRelatedError,
+                pywikibot.exceptions.WikiBaseError,
+                pywikibot.exceptions.TimeoutError,
+                pywikibot.exceptions.Server504Error) as e:
+            sys.stderr.write(str(e) + '\n')
+            return False
+
+    def getLog(self):
+        """Get the contents from Log page.
+
+        Parameters
+        ----------
+        void
+
+        Returns
+        -------
+        string
+            Page contents (as wikitext).
+        """
+
+        try:
+            page = pywikibot.Page(self.site, self.log_page)
+            return page.get()
+        except (pywikibot.exceptions.PageRelatedError,
+                pywikibot.exceptions.WikiBaseError,
+                pywikibot.exceptions.TimeoutError,
+                pywikibot.exceptions.Server504Error) as e:
+            sys.stderr.write(str(e) + '\n')
+            return False
+
+    def updateLog(self, item):
+        """Save logs when item is updated.
+
+        Parameters
+        ----------
+        item : str
+            The Wikidata item to be edited. If no item provided, new one will be created.
+
+        Returns
+        -------
+        bool
+            pywikibot.Page.save() result: True if successful; False if fails.
+        """
+
+        tries = 3
+        for i in range(tries):
+            try:
+                page = pywikibot.Page(self.site, self.log_page)
+                page.text = page.text.replace('<!-- End List -->', '') + '* {{q|' + item + "}}\n<!-- End List -->\n"
+                summary = 'Item [[' + item + ']] successfuly updated'
+                return page.save(summary=summary, minor=True)
+            except (pywikibot.EditConflict,
+                    pywikibot.exceptions.TimeoutError,
+                    pywikibot.exceptions.Server504Error) as e:
+                if i < tries - 1: # i is zero indexed
+                    continue
+
+                sys.stderr.write(str(e) + '\n')
+                return False
+            except (pywikibot.OtherPageSaveError,
+                    pywikibot.exceptions.WikiBaseError) as e:
+                sys.stderr.write(str(e) + '\n')
+                return False
+            break
+
+    def main(self, identifier, item, incremental=False):
+        """Main function, to fill individual items, if already exist.
+
+        Parameters
+        ----------
+        id : str
+            The TOP500 system identifier.
+        item : str
+            The Wikidata item.
+        incremental : bool
+            If True, skip the system if unchanged since last pushed.
+
+        Returns
+        -------
+        bool
+            True if successful, False if fails.
+        """
+
+        try:
+            data = self.getTOP500Data(identifier)
+            if not data:
+                raise ValueError('Error: No data found!')
+
+            # Feed the other Wikibase targets first, they skip unchanged systems by themselves
+            self.fanOut(data, incremental)
+
+            if incremental and self.isUnchanged(data):
+                print(u'Notice: System unchanged, skipping.\n')
+                return True
+
+            try:
+                if not self.updateItem(data, item, False):
+                    raise ValueError('Error: Something went wrong when updating!')
+            except ValueError as e:
+                sys.stderr.write(str(e) + '\n')
+                return False
+        except ValueError as e:
+            sys.stderr.write(str(e) + '\n')
+            return False
+
+        return True
+
+    def mass(self, mul=0, incremental=False, priority=False):
+        """Create items with data in masse.
+
+        Parameters
+        ----------
+        mul : int
+            The multiplier.
+        incremental : bool
+            If True, skip the systems unchanged since last pushed.
+        priority : bool
+            If True, process the systems by priority (see priority.py) instead
+            of numeric order. The order is saved at 'massorder.<mul>', and
+            the progress at 'prioritycount.<mul>'.
+
+        Returns
+        -------
+        void
+        """
+
+        fact = 2000
+
+        try:
+            mul = int(mul)
+        except (ValueError, NameError):
+            mul = 0
+
+        first = int((mul*fact)+1)
+        limit = int(((mul*fact)+1)+fact)
+
+        # The counters hold the last system done (prioritycount) or the one to resume at (masscount)
+        if priority:
+            prefix = 'prioritycount'
+            order = self.massOrder(mul, range(first, limit))
+            start = (self.readCounter(mul, prefix) or 0) + 1
+            targets = {target:done + 1 for target, done in self.targetCounters(mul, prefix, 0).items()}
+            pending = enumerate(order, 1)
+
+        else:
+            prefix = 'masscount'
+            start = self.readCounter(mul) or first
+            targets = self.targetCounters(mul, prefix, first)
+            pending = ((identifier, identifier) for identifier in range(first, limit))
+
+        # Resume from the target furthest behind; the systems before start are only written to the targets
+        resume = min([start] + list(targets.values()))
+        pending = ((counter, identifier) for counter, identifier in pending if counter >= resume)
+
+        for counter, identifier, data in self.prefetch(pending):
+
+            if self.shouldStop():
+                break
+
+            print(u'Debug: ID: ' + str(identifier) + "\n")
+
+            # Update the counter once the item is saved (see whenSaved())
+            saved = lambda result, counter=counter: self.updateCounter(counter, str(mul), prefix)
+
             try:
-                if not value:
-                    raise ValueError(u'Notice: Empty value.')
-                value = value.split(' ')
-                amount = self.formatDecimal(value[0])
-                if not amount:
-                    raise ValueError(u'Error: Non-numeric value provided!')
-            except ValueError as e:
-                #sys.stderr.write(str(e) + '\n')
-                return False
+                if not data:
+                    raise ValueError
+
+                # Feed the other Wikibase targets first, they skip unchanged systems by themselves
+                self.fanOut(data, incremental, (counter, str(mul), prefix),
+                            [target for target, target_start in targets.items() if counter >= target_start])
+
+                # Already written here, only behind at some target
+                if counter < start:
+                    continue
+
+                if incremental and self.isUnchanged(data):
+                    raise ValueError
 
-            if len(value) > 1:
-                try:
-                    entity_helper_string = "http://www.wikidata.org/entity/"
-                    unit = self.str2statement(value[1])
-                    if not unit:
-                        raise ValueError(u'Error: Invalid ammount and/or unit provided!')
-                    unit = entity_helper_string + unit
-                    claim.setTarget(pywikibot.WbQuantity(amount=amount, unit=unit, site=self.site))
-                except ValueError as e:
-                    #sys.stderr.write(str(e) + '\n')
-                    return False
-                except (pywikibot.exceptions.PageRelatedError,
-                        pywikibot.exceptions.WikiBaseError,
-                        pywikibot.exceptions.TimeoutError,
-                        pywikibot.exceptions.Server504Error,
-                        pywikibot.exceptions.ServerError) as e:
-                    sys.stderr.write(str(e) + '\n')
-                    return False
-            else:
                 try:
-                    claim.setTarget(pywikibot.WbQuantity(amount=amount, site=self.site))
+                    if not self.updateItem(data, callback=saved):
+                        raise ValueError('Something went wrong when updating.')
+
                 except ValueError as e:
-                    #sys.stderr.write(str(e) + '\n')
-                    return False
-                except (pywikibot.exceptions.PageRelatedError,
-                        pywikibot.exceptions.WikiBaseError,
-                        pywikibot.exceptions.TimeoutError,
-                        pywikibot.exceptions.Server504Error,
-                        pywikibot.exceptions.ServerError) as e:
                     sys.stderr.write(str(e) + '\n')
-                    return False
 
-        # Date (12/2018)
-        elif datatype == 'date':
-            try:
-                date = self.getDate(value)
-                if not date:
-                    raise ValueError(u'Error: Invalid date provided!')
-                claim.setTarget(pywikibot.WbTime(year=date[0], month=date[1]))
             except ValueError:
-                #sys.stderr.write(str(e) + '\n')
-                return False
-            except (pywikibot.exceptions.PageRelatedError,
-                    pywikibot.exceptions.WikiBaseError,
-                    pywikibot.exceptions.TimeoutError,
-                    pywikibot.exceptions.Server504Error,
-                    pywikibot.exceptions.ServerError) as e:
-                sys.stderr.write(str(e) + '\n')
-                return False
+                if counter >= start:
+                    self.whenSaved(saved)
 
-        # String ("anything")
-        else:
-            try:
-                claim.setTarget(stripped(str(value)))
-            except ValueError as e:
-                #sys.stderr.write(str(e) + '\n')
-                return False
-            except (pywikibot.exceptions.TimeoutError,
-                    pywikibot.exceptions.Server504Error,
-                    pywikibot.exceptions.ServerError) as e:
-                sys.stderr.write(str(e) + '\n')
-                return False
+            if self.memory_tracker is not None:
+                self.memory_tracker.step()
 
-        # :: Add claim
+        return True
+
+    def prefetch(self, pending):
+        """Get the systems to be written, in order (see getTOP500Data()). With
+        adaptive concurrency, the next ones are fetched ahead, within the limit.
+
+        Parameters
+        ----------
+        pending : iterable
+            The (counter, identifier) pairs.
+
+        Yields
+        ------
+        tuple
+            (counter, identifier, data); data is False if fails.
+        """
+
+        if self.limiter is None:
+            for counter, identifier in pending:
+                yield counter, identifier, self.getTOP500Data(str(identifier))
+            return
 
+        window = collections.deque()
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.limiter.ceiling)
         try:
-            item.addClaim(claim, summary=summary)
-        except (pywikibot.exceptions.PageRelatedError,
-                pywikibot.exceptions.WikiBaseError,
-                pywikibot.exceptions.TimeoutError,
-                pywikibot.exceptions.Server504Error,
-                pywikibot.exceptions.ServerError) as e:
+            for counter, identifier in pending:
+                window.append((counter, identifier, executor.submit(self.getTOP500Data, str(identifier))))
+                if len(window) >= self.limiter.ceiling:
+                    counter, identifier, future = window.popleft()
+                    yield counter, identifier, future.result()
+
+            while window:
+                counter, identifier, future = window.popleft()
+                yield counter, identifier, future.result()
+
+        finally:
+            # Stopped early: don't fetch the systems not requested yet
+            for counter, identifier, future in window:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+    def massOrder(self, mul, identifiers):
+        """Get the priority order of a mass import range; computed on the
+        first run and saved at 'massorder.<mul>', so resuming keeps it.
+
+        Parameters
+        ----------
+        mul : int
+            The multiplier.
+        identifiers : iterable
+            The TOP500 system identifiers of the range.
+
+        Returns
+        -------
+        list
+            The identifiers, highest priority first.
+        """
+
+        path = 'massorder.' + str(mul)
+
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (OSError, IOError, ValueError):
+            pass
+
+        try:
+            order = scheduling.schedule(self.cache, identifiers)
+        except cache.errors as e:
             sys.stderr.write(str(e) + '\n')
-            return False
+            order = [str(identifier) for identifier in identifiers]
 
-        # :: Qualifiers
+        try:
+            with open(path, 'w') as f:
+                json.dump(order, f)
+        except (OSError, IOError) as e:
+            sys.stderr.write(str(e) + '\n')
 
-        if qualifiers is not False:
-            for qualifier_key, qualifier_value in qualifiers.items():
-                try:
-                    prop = self.str2prop(qualifier_key)
-                    if not prop:
-                        raise ValueError(u'Error: Unknown property provided!')
-                    qualifier = pywikibot.Claim(repo, prop)
-                except (ValueError, pywikibot.exceptions.WikiBaseError) as e:
-                        #sys.stderr.write(str(e) + '\n')
-                    continue
-                except (pywikibot.exceptions.PageRelatedError,
-                        pywikibot.exceptions.TimeoutError,
-                        pywikibot.exceptions.Server504Error) as e:
-                    sys.stderr.write(str(e) + '\n')
-                    return False
+        return order
 
-                if qualifier_key == 'has_role':
-                    try:
-                        statement = self.str2statement(stripped(str(qualifier_value)))
-                        if not statement:
-                            raise ValueError(u'Error: \'has_role\' statement not set!')
-                        qualifier.setTarget(pywikibot.ItemPage(repo, statement))
-                    except (ValueError, pywikibot.exceptions.WikiBaseError) as e:
-                        #sys.stderr.write(str(e) + '\n')
-                        continue
-                    except (pywikibot.exceptions.PageRelatedError,
-                            pywikibot.exceptions.TimeoutError,
-                            pywikibot.exceptions.Server504Error) as e:
-                        sys.stderr.write(str(e) + '\n')
-                        return False
+    def batch(self, path, jobs=1, incremental=False):
+        """Update the (Wikidata item, TOP500 id) pairs listed in a file.
+        Progress is saved after every line at 'batchcount.<file name>',
+        and the next run resumes from the last completed line.
 
-                elif qualifier_key == 'date':
+        Parameters
+        ----------
+        path : str
+            The CSV, TSV or JSONL file (see readPairs()).
+        jobs : int
+            The amount of systems fetched from TOP500 in parallel, ahead
+            of the (sequential) Wikibase updates; with adaptive concurrency,
+            the limit ceiling is used instead.
+        incremental : bool
+            If True, skip the systems unchanged since last pushed.
 
-                    try:
-                        date = self.getDate(qualifier_value)
-                        if not date:
-                            raise ValueError(u'Error: Invalid date provided for qualifier!\n')
-                        qualifier.setTarget(pywikibot.WbTime(year=int(date[0]), month=int(date[1])))
-                    except (ValueError, pywikibot.exceptions.WikiBaseError) as e:
-                        #sys.stderr.write(str(e) + '\n')
-                        continue
-                    except (pywikibot.exceptions.PageRelatedError,
-                            pywikibot.exceptions.TimeoutError,
-                            pywikibot.exceptions.Server504Error) as e:
-                        sys.stderr.write(str(e) + '\n')
-                        return False
+        Returns
+        -------
+        bool
+            True if successful, False if unable to read the file.
+        """
 
-                else:
-                    try:
-                        qualifier.setTarget(qualifier_value)
-                    except (ValueError, pywikibot.exceptions.WikiBaseError) as e:
-                        #sys.stderr.write(str(e) + '\n')
+        name = os.path.basename(path)
+        done = self.readCounter(name, 'batchcount') or 0
+
+        try:
+            jobs = max(1, int(jobs))
+        except (ValueError, TypeError):
+            jobs = 1
+
+        if self.limiter is not None:
+            jobs = self.limiter.ceiling
+
+        # Resume from the target furthest behind; the lines up to done are only written to the targets
+        targets = self.targetCounters(name, 'batchcount', 0)
+        resume = min([done] + list(targets.values()))
+
+        try:
+            pairs = ((line, item, identifier) for line, item, identifier in self.readPairs(path) if line > resume)
+
+            with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+                window = collections.deque()
+                for line, item, identifier in pairs:
+                    if self.shouldStop():
+                        break
+                    window.append((line, item, identifier, executor.submit(self.getTOP500Data, identifier)))
+                    if len(window) < jobs * 2:
                         continue
-                    except (pywikibot.exceptions.PageRelatedError,
-                            pywikibot.exceptions.TimeoutError,
-                            pywikibot.exceptions.Server504Error) as e:
-                        sys.stderr.write(str(e) + '\n')
-                        return False
+                    self.batchUpdate(name, *window.popleft(), incremental=incremental, done=done, targets=targets)
 
-                try:
-                    claim.addQualifier(qualifier, summary=summary)
-                except (ValueError, pywikibot.exceptions.WikiBaseError) as e:
-                    #sys.stderr.write(str(e) + '\n')
-                    continue
-                except (pywikibot.exceptions.PageRelatedError,
-                        pywikibot.exceptions.TimeoutError,
-                        pywikibot.exceptions.Server504Error) as e:
-                    sys.stderr.write(str(e) + '\n')
-                    return False
+                while window and not self.shouldStop():
+                    self.batchUpdate(name, *window.popleft(), incremental=incremental, done=done, targets=targets)
+
+                # Stopped: the systems fetched ahead are left for the next run
+                for line, item, identifier, future in window:
+                    future.cancel()
+
+        except (OSError, IOError, UnicodeDecodeError) as e:
+            sys.stderr.write(str(e) + '\n')
+            return False
 
         return True
 
-    def updateItem(self, data, item='Q0', updatelog=True):
-        """Update an item.
+    def batchUpdate(self, name, line, item, identifier, future, incremental=False, done=0, targets=None):
+        """Update one item from a batch file, once its data has been fetched.
 
         Parameters
         ----------
+        name : str
+            The batch file name, for the counter.
+        line : int
+            The line number in the batch file.
         item : str
-            The Wikidata item to be edited. If no item provided, new one will be created.
-        data : dict
-            The data retrived from getTOP500Data().
+            The Wikidata item.
+        identifier : str
+            The TOP500 system identifier.
+        future : concurrent.futures.Future
+            The pending getTOP500Data() result.
+        incremental : bool
+            If True, skip the systems unchanged since last pushed.
+        done : int
+            The last line done here; the lines up to it are only written to the targets.
+        targets : dict
+            Pairs of target name=>last line done there (see targetCounters()).
 
         Returns
         -------
@@ -558,335 +2451,383 @@ class Top500Importer:
             True if successful, False if fails.
         """
 
-        if bool(re.search('^Q[0-9]+$', item)) is None:
-            return False
-
-        if item == 'Q0':
-            print(u'Creating new item...\n')
-            try:
-                item = self.addClaim(item, 'label', {'en':data['Title'], 'es':data['Title']}, 'label')
-                if not item:
-                    raise ValueError(u'Error: Something went wrong when creating a new item')
-            except (ValueError, IndexError) as e:
-                sys.stderr.write(str(e) + '\n')
-                return False
+        print(u'Debug: Line: ' + str(line) + ' ' + item + ' ' + identifier + "\n")
 
-        # Instance of
-        print(u'\nInstance of...')
         try:
-            self.addClaim(item, 'instance_of', self.instance_of, 'statement')
-        except (ValueError, IndexError) as e:
-            #sys.stderr.write(str(e) + '\n')
-            pass
+            data = future.result()
+            if not data:
+                raise ValueError('Error: No data found for ' + identifier)
 
-        # Manufacturer
-        print(u'\nManufacturer...')
-        try:
-            self.addClaim(item, 'manufacturer', data['Manufacturer'], 'statement')
-        except (ValueError, IndexError) as e:
-            #sys.stderr.write(str(e) + '\n')
-            pass
+            # Feed the other Wikibase targets first, they skip unchanged systems by themselves
+            self.fanOut(data, incremental, (line, name, 'batchcount'),
+                        [target for target, target_done in (targets or {}).items() if line > target_done])
 
-        # Site
-        print(u'\nSite...')
-        try:
-            self.addClaim(item, 'site', data['Site'], 'statement')
-        except (ValueError, IndexError) as e:
-            #sys.stderr.write(str(e) + '\n')
-            pass
+            # Already written here, only behind at some target
+            if line <= done:
+                return True
+
+            if incremental and self.isUnchanged(data):
+                print(u'Notice: System unchanged, skipping.\n')
+
+            elif not self.updateItem(data, item, False):
+                raise ValueError('Error: Something went wrong when updating ' + item)
+
+            success = True
+
+        except ValueError as e:
+            sys.stderr.write(str(e) + '\n')
+            success = False
+
+        # The counter never goes back (to the lines only behind at some target)
+        if line > done:
+            self.whenSaved(lambda result: self.updateCounter(line, name, 'batchcount'))
+
+        if self.memory_tracker is not None:
+            self.memory_tracker.step()
+
+        return success
+
+    def enqueueJob(self, identifier, item):
+        """Add a targeted update to the daemon queue.
+
+        Parameters
+        ----------
+        identifier : str
+            The TOP500 system identifier.
+        item : str
+            The Wikidata item.
+
+        Returns
+        -------
+        bool
+            True if successful, False if fails.
+        """
 
-        # Cores
-        print(u'\nCores...')
         try:
-            self.addClaim(item, 'cores', data['Cores'], 'amount')
-        except (ValueError, IndexError) as e:
-            #sys.stderr.write(str(e) + '\n')
-            pass
+            if self.redis is None:
+                raise ValueError('Error: The job queue needs the Redis cache backend.')
+            # Consumed from the tail (see daemon())
+            self.redis.lpush(self.job_queue, json.dumps({'id':str(identifier), 'item':item}))
+            return True
+        except (ValueError, redis.exceptions.RedisError) as e:
+            sys.stderr.write(str(e) + '\n')
+            return False
+
+    def daemon(self, timeout=5, incremental=False, worker=None):
+        """Consume targeted updates from the Redis queue, until interrupted.
+        Jobs are JSON objects like {"id": "<TOP500 id>", "item": "<Wikidata item>"};
+        the failed ones are moved to '<queue>-failed'.
 
-        # Memory
-        print(u'\nMemory...')
-        try:
-            self.addClaim(item, 'memory', data['Memory'], 'amount')
-        except (ValueError, IndexError) as e:
-            #sys.stderr.write(str(e) + '\n')
-            pass
+        Every job is moved to a processing list ('<queue>-processing[-<worker>]')
+        while handled, and removed from it once done, so the jobs of a daemon
+        that died are queued again when it starts over (with the same worker
+        name). Several daemons on the same queue need distinct worker names.
+        The status page is updated (logging in) on the first job.
 
-        # CPU
-        print(u'\nCPU...')
-        try:
-            self.addClaim(item, 'cpu', data['Processor'], 'statement')
-        except (ValueError, IndexError) as e:
-            #sys.stderr.write(str(e) + '\n')
-            pass
+        Parameters
+        ----------
+        timeout : int
+            Seconds to block waiting for a job before polling again.
+        incremental : bool
+            Incremental update (see main()).
+        worker : str
+            The worker name; None if only one daemon consumes the queue.
 
-        # Bus (not available at Wikidata yet, see Wikidata:Property_proposal/bus)
-        #print(u'\nBus...')
-        #try:
-            #self.addClaim(item, 'bus', [data['bus'], {'has_role':'interconnect'}], 'statement')
-        #except (ValueError, IndexError) as e:
-            #sys.stderr.write(str(e) + '\n')
-            #pass
+        Returns
+        -------
+        bool
+            True once stopped (see setBudget()); False if unable to read from Redis.
+        """
 
-        # Power
-        print(u'\nPower...')
-        try:
-            self.addClaim(item, 'power', data['Power Consumption'], 'amount')
-        except (ValueError, IndexError) as e:
-            #sys.stderr.write(str(e) + '\n')
-            pass
+        if self.redis is None:
+            sys.stderr.write('Error: The daemon needs the Redis cache backend.\n')
+            return False
 
-        # Operating sistem
-        print(u'\nOS...')
-        try:
-            self.addClaim(item, 'os', data['Operating System'], 'statement')
-        except (ValueError, IndexError) as e:
-            #sys.stderr.write(str(e) + '\n')
-            pass
+        processing = self.job_queue + '-processing' + ('-' + worker if worker else '')
 
-        # Platform
-        print(u'\nPlatform...')
+        # Queue again the jobs left by a previous run, at the tail (taken first), oldest last;
+        # each one is removed once queued, so a crash in between only repeats it
         try:
-            self.addClaim(item, 'platform', data['Platform'], 'statement')
-        except (ValueError, IndexError) as e:
-            #sys.stderr.write(str(e) + '\n')
-            pass
+            job = self.redis.lindex(processing, 0)
+            while job is not None:
+                self.redis.rpush(self.job_queue, job)
+                self.redis.lrem(processing, 1, job)
+                job = self.redis.lindex(processing, 0)
+        except redis.exceptions.RedisError as e:
+            sys.stderr.write(str(e) + '\n')
+            return False
 
-        # Top500 ID
-        print(u'\nTop500 ID...')
-        try:
-            self.addClaim(item, 'top500identifier', data['ID'], 'string')
-        except (ValueError, IndexError) as e:
-            #sys.stderr.write(str(e) + '\n')
-            pass
+        started = False
+        while not self.shouldStop():
+            try:
+                job = self.redis.brpoplpush(self.job_queue, processing, timeout)
+            except redis.exceptions.RedisError as e:
+                sys.stderr.write(str(e) + '\n')
+                return False
 
-        # Performance (loop)
-        print(u'\nPerformance...')
-        try:
-            for rankdata in data['Rank']:
-                date = rankdata['List']
+            if job is None:
+                continue
 
-                try:
-                    rmax = rankdata['Rmax (GFlops)'] + ' GFlops'
-                    rpeak = rankdata['Rpeak (GFlops)'] + ' GFlops'
-                except (ValueError, IndexError):
-                    try:
-                        rmax = rankdata['Rmax (TFlops)'] + ' TFlops'
-                        rpeak = rankdata['Rpeak (TFlops)'] + ' TFlops'
-                    except (ValueError, IndexError):
-                        try:
-                            rmax = rankdata['Rmax (PFlops)'] + ' PFlops'
-                            rpeak = rankdata['Rpeak (PFlops)'] + ' PFlops'
-                        except (ValueError, IndexError):
-                            #sys.stderr.write(str(e) + '\n')
-                            pass
+            if not started:
+                self.updateStatus(0)
+                started = True
 
+            try:
+                request = json.loads(job)
+                print(u'Debug: Job: ' + request['item'] + ' ' + request['id'] + "\n")
+                if self.memory_tracker is not None:
+                    self.memory_tracker.step()
+                if not self.main(request['id'], request['item'], incremental):
+                    raise ValueError('Error: Job failed: ' + job.decode('utf-8'))
+            except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+                sys.stderr.write(str(e) + '\n')
                 try:
-                    self.addClaim(item, 'performance', [rmax, {'has_role':'rmax', 'date':date}], 'amount', False)
-                    self.addClaim(item, 'performance', [rpeak, {'has_role':'rpeak', 'date':date}], 'amount', False)
-                except (ValueError, IndexError) as e:
-                    #sys.stderr.write(str(e) + '\n')
+                    self.redis.rpush(self.job_queue + '-failed', job)
+                except redis.exceptions.RedisError:
                     pass
 
-        except (ValueError, IndexError) as e:
-            #sys.stderr.write(str(e) + '\n')
-            pass
-
-        # Once everything done, log
-        if updatelog:
-            self.updateLog(item)
+            # Done once saved (with the save queue, after the edits queued so far)
+            self.whenSaved(lambda result, job=job: self.finishJob(processing, job))
 
         return True
 
-    def updateStatus(self, status=0):
-        """Update status page.
+    def finishJob(self, processing, job):
+        """Remove a job from the processing list of the daemon (see daemon())."""
+
+        try:
+            self.redis.lrem(processing, 1, job)
+        except redis.exceptions.RedisError as e:
+            sys.stderr.write(str(e) + '\n')
+
+    def ingest(self, paths):
+        """Build the systems from TOP500 list files and save them into the cache.
+        The Rank rows are merged with the ones already cached.
 
         Parameters
         ----------
-        status : int
-            The status:
+        paths : list
+            The list files (XML, CSV/TSV or XLSX), named after the list date
+            (eg. 'TOP500_201806.xml').
 
-             * 0: stopped
+        Returns
+        -------
+        int
+            The amount of systems saved; False if fails.
+        """
 
-             * 1: running
+        try:
+            records = ingest.ingestFiles(paths)
+        except (ValueError, OSError, IOError, ingest.ElementTree.ParseError) as e:
+            sys.stderr.write(str(e) + '\n')
+            return False
 
-             * 2: error (if something went wrong)
+        saved = 0
+        for identifier, data in records.items():
+            try:
+                cached = json.loads(self.cache.get('top500-sys-' + identifier))
+                merged = dict(cached)
+                merged.update({key:value for key, value in data.items() if key != 'Rank'})
+                merged['Rank'] = ingest.mergeRank(cached.get('Rank', []), data['Rank'])
+                data = merged
+            except (json.JSONDecodeError, AttributeError, TypeError) + cache.errors:
+                cached = None
+
+            if self.storeTOP500Data(data, cached):
+                saved = saved + 1
+
+        return saved
+
+    def query(self, field, value=None):
+        """Query the local indexes of the cached systems (see index.query()).
+
+        Parameters
+        ----------
+        field : str
+            'list', 'manufacturer', 'site', 'all', 'noitem' or 'item'.
+        value : str
+            The value to look up.
 
         Returns
         -------
-        object
-            pywikibot.Page.save() result: True if successful; False if fails.
+        list
+            The matching IDs (or the item, for 'item'); False if fails.
         """
 
-        summary = 'update bot status: '
+        try:
+            return index.query(self.cache, field, value)
+        except cache.errors as e:
+            sys.stderr.write(str(e) + '\n')
+            return False
 
-        if status == 0:
-            summary = summary + 'running'
-        elif status == 2:
-            summary = summary + 'stopped'
-        elif status == 128:
-            summary = summary + 'ended one'
-        elif status == 1:
-            summary = summary + 'error'
+    def rebuildIndex(self):
+        """Index every cached system.
+
+        Returns
+        -------
+        int
+            The amount of systems indexed; False if fails.
+        """
 
         try:
-            page = pywikibot.Page(self.site, self.status_page)
-            page.text = str(status)
-            return page.save(summary=summary, minor=True)
-        except (NameError, AttributeError):
-            return False
-        except (pywikibot.exceptions.PageRelatedError,
-                pywikibot.exceptions.WikiBaseError,
-                pywikibot.exceptions.TimeoutError,
-                pywikibot.exceptions.Server504Error) as e:
+            return index.rebuildIndex(self.cache)
+        except cache.errors as e:
             sys.stderr.write(str(e) + '\n')
             return False
 
-    def getLog(self):
-        """Get the contents from Log page.
+    def exportSnapshot(self, path):
+        """Export every cached system into a columnar file (Parquet, Arrow IPC or CSV).
 
         Parameters
         ----------
-        void
+        path : str
+            The destination file; the format is chosen from its extension.
 
         Returns
         -------
-        string
-            Page contents (as wikitext).
+        int
+            The amount of rows written; False if fails.
         """
 
         try:
-            page = pywikibot.Page(self.site, self.log_page)
-            return page.get()
-        except (pywikibot.exceptions.PageRelatedError,
-                pywikibot.exceptions.WikiBaseError,
-                pywikibot.exceptions.TimeoutError,
-                pywikibot.exceptions.Server504Error) as e:
+            return export.exportSnapshot(self.cache, path)
+        except cache.errors as e:
             sys.stderr.write(str(e) + '\n')
             return False
 
-    def updateLog(self, item):
-        """Save logs when item is updated.
-
-        Parameters
-        ----------
-        item : str
-            The Wikidata item to be edited. If no item provided, new one will be created.
+    def updateMetrics(self):
+        """Compute the derived metrics of every cached system (see analytics.py),
+        and save them next to the systems.
 
         Returns
         -------
-        bool
-            pywikibot.Page.save() result: True if successful; False if fails.
+        int
+            The amount of systems saved; False if fails.
         """
 
-        tries = 3
-        for i in range(tries):
-            try:
-                page = pywikibot.Page(self.site, self.log_page)
-                page.text = page.text.replace('<!-- End List -->', '') + '* {{q|' + item + "}}\n<!-- End List -->\n"
-                summary = 'Item [[' + item + ']] successfuly updated'
-                return page.save(summary=summary, minor=True)
-            except (pywikibot.EditConflict,
-                    pywikibot.exceptions.TimeoutError,
-                    pywikibot.exceptions.Server504Error) as e:
-                if i < tries - 1: # i is zero indexed
-                    continue
-
-                sys.stderr.write(str(e) + '\n')
-                return False
-            except (pywikibot.OtherPageSaveError,
-                    pywikibot.exceptions.WikiBaseError) as e:
-                sys.stderr.write(str(e) + '\n')
-                return False
-            break
+        try:
+            return analytics.updateMetrics(self.cache)
+        except (ImportError,) + cache.errors as e:
+            sys.stderr.write(str(e) + '\n')
+            return False
 
-    def main(self, identifier, item):
-        """Main function, to fill individual items, if already exist.
+    def exportQuickStatements(self, path, batch_size=50):
+        """Export the edits for every cached system as QuickStatements (v2) commands:
+        a CREATE block for systems without item, and the claims planned by planItem().
+        The existing items are loaded in batches, to skip the claims already set,
+        from their fingerprints (as addClaim() does); systems whose item can't be
+        loaded are skipped.
 
         Parameters
         ----------
-        id : str
-            The TOP500 system identifier.
-        item : str
-            The Wikidata item.
+        path : str
+            The destination file.
+        batch_size : int
+            The amount of systems (and items loaded) at once.
 
         Returns
         -------
-        bool
-            True if successful, False if fails.
+        int
+            The amount of systems exported; False if fails.
         """
 
+        total = 0
+
         try:
-            data = self.getTOP500Data(identifier)
-            if not data:
-                raise ValueError('Error: No data found!')
+            with open(path, 'w', encoding='utf-8') as f:
+                for systems in export.scanSystems(self.cache, batch_size):
+                    identifiers = [str(data.get('ID')) for data in systems]
+                    items = dict(zip(identifiers, self.cache.getMany([index.itemKey(identifier, self.target) for identifier in identifiers])))
+                    existing = self.loadFingerprints([item for item in items.values() if item])
+
+                    for data in systems:
+                        item = items.get(str(data.get('ID')))
+                        if item and item not in existing:
+                            sys.stderr.write(u'Notice: Skipping ' + str(data.get('ID')) + ', unable to load ' + item + '\n')
+                            continue
 
-            try:
-                if not self.updateItem(data, item, False):
-                    raise ValueError('Error: Something went wrong when updating!')
-            except ValueError as e:
-                sys.stderr.write(str(e) + '\n')
-                return False
-        except ValueError as e:
+                        try:
+                            known = existing.get(item, set())
+                            plan = self.skipKnownClaims(self.planItem(data), known)
+                            commands = quickstatements.itemCommands(data, plan, item,
+                                                                    {fingerprints.claimProperty(claim) for claim in known})
+                        except (KeyError, TypeError, AttributeError):
+                            continue
+
+                        f.write('\n'.join(commands) + '\n')
+                        total = total + 1
+
+        except (OSError, IOError) + cache.errors as e:
             sys.stderr.write(str(e) + '\n')
             return False
 
-        return True
+        return total
 
-    def mass(self, mul=0):
-        """Create items with data in masse.
+    def loadFingerprints(self, items):
+        """Get the claim fingerprints of some items (see fingerprints.py), loading them in one request.
 
         Parameters
         ----------
-        void
+        items : list
+            The items (QXXX).
 
         Returns
         -------
-        void
+        dict
+            Pairs of item=>set of fingerprints; items unable to be loaded are left out.
         """
 
-        fact = 2000
-
-        try:
-            mul = int(mul)
-        except (ValueError, NameError):
-            mul = 0
+        existing = {}
+        if not items:
+            return existing
 
         try:
-            identifier = self.readCounter(mul)
-            if not identifier:
-                raise ValueError
-        except ValueError:
-            identifier = int((mul*fact)+1)
-
-        limit = int(((mul*fact)+1)+fact)
-
-        while identifier < limit:
-
-            print(u'Debug: ID: ' + str(identifier) + "\n")
-
-            try:
-                data = self.getTOP500Data(str(identifier))
+            pages = [pywikibot.ItemPage(self.repo, item) for item in items]
+            for page in pagegenerators.PreloadingEntityGenerator(pages, groupsize=len(pages)):
+                existing[page.getID()] = fingerprints.itemFingerprints(page)
+        except (pywikibot.exceptions.PageRelatedError,
+                pywikibot.exceptions.WikiBaseError,
+                pywikibot.exceptions.TimeoutError,
+                pywikibot.exceptions.Server504Error,
+                pywikibot.exceptions.ServerError) as e:
+            sys.stderr.write(str(e) + '\n')
 
-                if not data:
-                    raise ValueError
+        return existing
 
-                try:
-                    if self.updateItem(data):
-                        self.updateCounter(identifier, str(mul))
+    def skipKnownClaims(self, plan, known):
+        """Drop the planned claims already set at an item, or planned twice,
+        comparing their fingerprints (as addClaim() does).
 
-                    else:
-                        raise ValueError('Something went wrong when updating.')
+        Parameters
+        ----------
+        plan : list
+            The (step, claim, value, datatype, nonempty) tuples from planItem().
+        known : set
+            The fingerprints of the item claims; empty for a new item.
 
-                except ValueError as e:
-                    sys.stderr.write(str(e) + '\n')
-                    self.updateCounter(identifier, str(mul))
+        Returns
+        -------
+        list
+            The remaining tuples.
+        """
 
-            except ValueError:
-                self.updateCounter(identifier, str(mul))
+        known = set(known)
+        remaining = []
+        for step in plan:
+            claim, data, datatype = step[1], step[2], step[3]
+            if isinstance(data, list):
+                value, qualifiers = data[0], data[1]
+            else:
+                value, qualifiers = data, False
 
-            identifier = identifier + 1
+            prop = self.str2prop(claim, self.mapping)
+            planned = self.plannedFingerprint(prop, value, datatype, qualifiers) if prop else None
+            if planned is not None:
+                if planned in known:
+                    continue
+                known.add(planned)
+            remaining.append(step)
 
-        return True
+        return remaining
 
     # :: Static methods
 
@@ -914,6 +2855,24 @@ class Top500Importer:
         except (ValueError, IndexError):
             return False
 
+    @staticmethod
+    def recordHash(data):
+        """Get a stable hash of a system, independent of the keys order.
+
+        Parameters
+        ----------
+        data : dict
+            The data retrived from getTOP500Data().
+
+        Returns
+        -------
+        str
+            The SHA-1 hex digest.
+        """
+
+        serialized = json.dumps(data, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha1(serialized.encode('utf-8')).hexdigest()
+
     @staticmethod
     def formatDecimal(num):
         """Normalize decimal numbers, remove trailing zeroes
@@ -930,12 +2889,7 @@ class Top500Importer:
             The number as Decimal value, with trailing zeroes removed.
         """
 
-        try:
-            dec = decimal.Decimal(str(num))
-            return dec.quantize(decimal.Decimal(1)) if dec == dec.to_integral() else dec.normalize()
-
-        except decimal.InvalidOperation:
-            return False
+        return convert.toDecimal(str(num))
 
     @staticmethod
     def str2statement(statement):
@@ -955,13 +2909,15 @@ class Top500Importer:
         return slist.statements.get(str(statement), False)
 
     @staticmethod
-    def str2prop(prop):
+    def str2prop(prop, mapping=slist):
         """Parse arbitrary string into a Wikidata property.
 
         Parameters
         ----------
         prop : str
             The string to be parsed.
+        mapping : module
+            The mapping table (slist.py, or the one of another Wikibase target).
 
         Returns
         -------
@@ -972,7 +2928,7 @@ class Top500Importer:
         if prop == 'label':
             return 'label'
 
-        return slist.properties.get(str(prop), False)
+        return mapping.properties.get(str(prop), False)
 
     @staticmethod
     def identifier2url(prop):
@@ -992,13 +2948,84 @@ class Top500Importer:
         return slist.identifiers.get(str(prop), False)
 
     @staticmethod
-    def updateCounter(amount, mul=1):
+    def parseRanges(text):
+        """Parse ID ranges like '1-2000,4001-6000' (or single IDs like '5').
+
+        Parameters
+        ----------
+        text : str
+            The ranges, comma-separated.
+
+        Returns
+        -------
+        list
+            The (first, last) tuples, inclusive; False if fails.
+        """
+
+        ranges = []
+        try:
+            for part in str(text).split(','):
+                bounds = part.strip().split('-')
+                first, last = int(bounds[0]), int(bounds[-1])
+                if len(bounds) > 2 or first < 0 or last < first:
+                    raise ValueError
+                ranges.append((first, last))
+        except ValueError:
+            return False
+
+        return ranges
+
+    @staticmethod
+    def readPairs(path):
+        """Read (Wikidata item, TOP500 id) pairs from a file.
+
+        JSONL lines are objects like {"id": "<TOP500 id>", "item": "<Wikidata item>"};
+        CSV and TSV (by extension) have the item in the first column and the
+        TOP500 id in the second one. Lines not matching are skipped (eg. headers).
+
+        Parameters
+        ----------
+        path : str
+            The file path.
+
+        Yields
+        ------
+        tuple
+            (line number, item, identifier).
+        """
+
+        extension = os.path.splitext(path)[1].lower()
+
+        with open(path, newline='', encoding='utf-8') as f:
+            for line, text in enumerate(f, 1):
+                if extension in ('.jsonl', '.json'):
+                    try:
+                        request = json.loads(text)
+                        row = [request['item'], str(request['id'])]
+                    except (json.JSONDecodeError, KeyError, TypeError):
+                        continue
+                else:
+                    row = next(csv.reader([text], delimiter='\t' if extension == '.tsv' else ','), [])
+
+                if len(row) < 2:
+                    continue
+                item, identifier = row[0].strip(), row[1].strip()
+                if re.search('^Q[0-9]+$', item) is None or re.search('^[0-9]+$', identifier) is None:
+                    continue
+                yield (line, item, identifier)
+
+    @staticmethod
+    def updateCounter(amount, mul=1, prefix='masscount'):
         """Update the counter, in both internal and Wiki.
 
         Parameters
         ----------
         id : int
             The amount.
+        mul : mixed
+            The multiplier (or any other suffix for the counter file).
+        prefix : str
+            The counter file prefix.
 
         Returns
         -------
@@ -1007,7 +3034,7 @@ class Top500Importer:
         """
 
         try:
-            f = open("masscount."+str(mul), "w")
+            f = open(prefix+"."+str(mul), "w")
             f.write(str(amount))
             f.close()
             return True
@@ -1016,13 +3043,15 @@ class Top500Importer:
             return False
 
     @staticmethod
-    def readCounter(mul):
+    def readCounter(mul, prefix='masscount'):
         """Read the identifier counter from local file.
 
         Parameters
         ----------
         mul: int
-            The multiplier.
+            The multiplier (or any other suffix for the counter file).
+        prefix : str
+            The counter file prefix.
 
         Returns
         -------
@@ -1030,7 +3059,7 @@ class Top500Importer:
             The identifier; False otherwise.
         """
         try:
-            f = open("masscount."+str(mul), "r")
+            f = open(prefix+"."+str(mul), "r")
             identifier = f.read()
             f.close()
             return int(identifier)
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Priority scheduling for the mass import: the systems of a range are
+ordered by how valuable their update is, from the cached data, so the
+edits that matter most land first under the same edit budget:
+
+1. the latest TOP500 list the system appears in (newest first)
+2. its best rank ever (best first)
+3. systems without a Wikibase item first (top500-idx-items)
+
+Systems not cached yet can't be ranked, and go last in numeric order.
+
+Copyright (c) 2019 Davod (Amitie 10g)
+
+Licensed under the MIT license. See LICENSE for details
+"""
+
+# :: Local libraries
+import convert
+import export
+import index
+import records
+
+def priorityKey(data, has_item=False):
+    """Get the sort key of a system; lower keys go first.
+
+    Parameters
+    ----------
+    data : dict
+        The system data, as returned by getTOP500Data().
+    has_item : bool
+        True if the system already has a Wikibase item.
+
+    Returns
+    -------
+    tuple
+        (-latest list month, best rank, has_item, ID).
+    """
+
+    latest, best = 0, 65536
+    for row in data.get('Rank', []):
+        date = convert.parseListDate(row.get('List'))
+        if date is not None:
+            latest = max(latest, records.packMonth(date.year, date.month))
+        try:
+            best = min(best, int(row.get('Rank')))
+        except (ValueError, TypeError):
+            continue
+
+    return (-latest, best, bool(has_item), int(data['ID']))
+
+def schedule(store, identifiers, batch_size=500):
+    """Order some systems by priority.
+
+    Parameters
+    ----------
+    store : object
+        The cache backend (see cache.py).
+    identifiers : list
+        The TOP500 system identifiers.
+    batch_size : int
+        The amount of systems fetched at once.
+
+    Returns
+    -------
+    list
+        The identifiers, as str, highest priority first.
+    """
+
+    identifiers = [str(identifier) for identifier in identifiers]
+    items = store.smembers(index.prefix + 'items')
+
+    ranked = []
+    for start in range(0, len(identifiers), batch_size):
+        keys = ['top500-sys-' + identifier for identifier in identifiers[start:start + batch_size]]
+        for data in export.decodeSystems(store, keys):
+            try:
+                ranked.append((priorityKey(data, str(data['ID']) in items), str(data['ID'])))
+            except (KeyError, ValueError, TypeError, AttributeError):
+                continue
+
+    ranked.sort()
+    order = [identifier for key, identifier in ranked]
+
+    known = set(order)
+    order.extend(identifier for identifier in identifiers if identifier not in known)
+
+    return order
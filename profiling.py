@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Profiling helpers for the mass and single runs:
+
+* cProfile statistics (open with pstats or snakeviz)
+* a sampling profiler writing folded stacks (flamegraph.pl, speedscope)
+* tracemalloc snapshots every N items, to catch memory growth
+
+Copyright (c) 2019 Davod (Amitie 10g)
+
+Licensed under the MIT license. See LICENSE for details
+"""
+
+# :: Standard libraries
+import sys
+import time
+import cProfile
+import threading
+import contextlib
+import collections
+import tracemalloc
+
+@contextlib.contextmanager
+def profiled(stats_path=None, sample_path=None, interval=0.005):
+    """Profile the code run inside the 'with' block.
+
+    Parameters
+    ----------
+    stats_path : str
+        Where to dump the cProfile statistics; None to disable.
+    sample_path : str
+        Where to write the sampled folded stacks; None to disable.
+    interval : float
+        Seconds between samples.
+    """
+
+    profile = cProfile.Profile() if stats_path else None
+    sampler = Sampler(interval) if sample_path else None
+
+    if sampler is not None:
+        sampler.start()
+    if profile is not None:
+        profile.enable()
+
+    try:
+        yield
+    finally:
+        if profile is not None:
+            profile.disable()
+            profile.dump_stats(stats_path)
+            sys.stderr.write('Notice: Profile saved at ' + stats_path + '\n')
+        if sampler is not None:
+            sampler.stop()
+            sampler.write(sample_path)
+            sys.stderr.write('Notice: Sampled stacks saved at ' + sample_path + '\n')
+
+class Sampler(threading.Thread):
+    """Sample the stacks of every thread at regular intervals (eg. the save
+    queue, journal applier and target writers too), each one under its thread name."""
+
+    def __init__(self, interval=0.005):
+        """Parameters
+        ----------
+        interval : float
+            Seconds between samples.
+        """
+
+        threading.Thread.__init__(self, name='profile-sampler', daemon=True)
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        """Sample until stopped."""
+
+        while not self.stopped.wait(self.interval):
+            names = {thread.ident:thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == self.ident:
+                    continue
+
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(code.co_filename.rsplit('/', 1)[-1] + ':' + code.co_name)
+                    frame = frame.f_back
+                if stack:
+                    stack.append('thread:' + names.get(thread_id, str(thread_id)))
+                    self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        """Stop sampling, and wait for the thread."""
+
+        self.stopped.set()
+        self.join()
+
+    def write(self, path):
+        """Write the samples as folded stacks ('frame;frame;frame count' per line)."""
+
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(stack + ' ' + str(count) + '\n')
+
+class MemoryTracker:
+    """Take a tracemalloc snapshot every N items, printing the biggest growths."""
+
+    def __init__(self, every, prefix='top500'):
+        """Parameters
+        ----------
+        every : int
+            Items between snapshots.
+        prefix : str
+            Snapshot files prefix; files are '<prefix>.<items>.snapshot'.
+        """
+
+        self.every = int(every)
+        self.prefix = prefix
+        self.items = 0
+        self.previous = None
+        tracemalloc.start()
+
+    def step(self):
+        """Count one item, and take a snapshot if due."""
+
+        self.items = self.items + 1
+        if self.every <= 0 or self.items % self.every != 0:
+            return
+
+        snapshot = tracemalloc.take_snapshot()
+        snapshot.dump(self.prefix + '.' + str(self.items) + '.snapshot')
+
+        current, peak = tracemalloc.get_traced_memory()
+        sys.stderr.write('Notice: ' + str(self.items) + ' items, ' + str(current // 1024) + ' KiB traced ('
+                         + str(peak // 1024) + ' KiB peak) at ' + time.strftime('%H:%M:%S') + '\n')
+
+        if self.previous is not None:
+            for stat in snapshot.compare_to(self.previous, 'lineno')[:5]:
+                sys.stderr.write('  ' + str(stat) + '\n')
+
+        self.previous = snapshot
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+QuickStatements (v2, tab separated) export of the cached systems, as an
+alternative to editing through Pywikibot: the commands for the whole
+corpus are written at once, to be run by batch tooling.
+
+The claims are the ones planned by Top500Importer.planItem(), and the
+duplicate avoidance is the same as addClaim(): the claims already set (same
+property, value and qualifiers) are dropped by Top500Importer.skipKnownClaims(),
+and the claims to be written only if empty are skipped when the item already
+has that property.
+
+Copyright (c) 2019 Davod (Amitie 10g)
+
+Licensed under the MIT license. See LICENSE for details
+"""
+
+# :: Local libraries
+import slist
+import convert
+
+def formatValue(value, datatype):
+    """Write a value as QuickStatements value.
+
+    Parameters
+    ----------
+    value : str
+        The value, as passed to addClaim().
+    datatype : str
+        'statement', 'amount', 'date' or 'string'.
+
+    Returns
+    -------
+    str
+        The value; False if invalid (as addClaim() would fail).
+    """
+
+    if datatype == 'statement':
+        return convert.toStatement(value)
+
+    if datatype == 'amount':
+        quantity = convert.toAmount(value)
+        if not quantity:
+            return False
+        amount, unit = quantity
+        if unit:
+            return str(amount) + 'U' + unit[len(convert.entity_url) + 1:]
+        return str(amount)
+
+    if datatype == 'date':
+        date = convert.toDate(value)
+        if not date:
+            return False
+        return '+%04d-%02d-01T00:00:00Z/10' % date
+
+    return quote(convert.stripped(value))
+
+def quote(text):
+    """Quote a string value (QuickStatements has no escaping, so double quotes are replaced)."""
+
+    return '"' + str(text).replace('"', "'") + '"'
+
+def claimCommand(subject, claim, data, datatype):
+    """Write a claim, with its qualifiers, as one command.
+
+    Parameters
+    ----------
+    subject : str
+        The item (QXXX), or 'LAST' for the item just created.
+    claim : str
+        The claim name (see slist.properties).
+    data : mixed
+        The value, or [value, {qualifier:value}] as passed to addClaim().
+    datatype : str
+        The value datatype.
+
+    Returns
+    -------
+    str
+        The command; False if the property or the value is invalid.
+    """
+
+    prop = slist.properties.get(claim, False)
+    if isinstance(data, list):
+        value, qualifiers = data[0], data[1]
+    else:
+        value, qualifiers = data, {}
+
+    value = formatValue(value, datatype)
+    if not prop or not value:
+        return False
+
+    command = [subject, prop, value]
+
+    # Invalid qualifiers are skipped, as addClaim() does
+    for qualifier_key, qualifier_value in qualifiers.items():
+        qualifier = slist.properties.get(qualifier_key, False)
+        if qualifier_key == 'has_role':
+            qualifier_value = formatValue(qualifier_value, 'statement')
+        elif qualifier_key == 'date':
+            qualifier_value = formatValue(qualifier_value, 'date')
+        else:
+            qualifier_value = formatValue(qualifier_value, 'string')
+        if qualifier and qualifier_value:
+            command.extend([qualifier, qualifier_value])
+
+    return '\t'.join(command)
+
+def itemCommands(data, plan, item=None, existing=frozenset()):
+    """Write the commands to create or update the item of a system.
+
+    Parameters
+    ----------
+    data : dict
+        The system data, as returned by getTOP500Data().
+    plan : list
+        The (step, claim, value, datatype, nonempty) tuples from planItem().
+    item : str
+        The item to be updated; None to create a new one.
+    existing : set
+        The properties already set at the item.
+
+    Returns
+    -------
+    list
+        The commands.
+    """
+
+    if item is None:
+        subject = 'LAST'
+        commands = ['CREATE',
+                    'LAST\tLen\t' + quote(data['Title']),
+                    'LAST\tLes\t' + quote(data['Title'])]
+    else:
+        subject = item
+        commands = []
+
+    written = set(existing)
+    for step, claim, value, datatype, nonempty in plan:
+        prop = slist.properties.get(claim, False)
+        if nonempty and prop in written:
+            continue
+
+        command = claimCommand(subject, claim, value, datatype)
+        if command:
+            commands.append(command)
+            written.add(prop)
+
+    return commands
@@ -0,0 +1,352 @@
+# -*- coding: utf-8 -*-
+"""
+Compact, typed record for a TOP500 system, for holding the whole corpus
+in memory (analysis, diffing).
+
+Numeric values are parsed once; the Rank table is stored as parallel
+arrays: list dates as packed month indexes (year * 12 + month - 1), and
+Rmax/Rpeak as float64 in GFlops. Conversion from and to the dict returned
+by Top500Importer.getTOP500Data() is lossless: values whose original text
+can't be rebuilt from the parsed number are kept as they came.
+
+Copyright (c) 2019 Davod (Amitie 10g)
+
+Licensed under the MIT license. See LICENSE for details
+"""
+
+# :: Standard libraries
+import re
+import sys
+import array
+
+# :: Local libraries
+import convert
+import export
+
+# Main table fields stored as numbers, with their scale and default unit
+numeric_fields = {
+    'Cores':(None, None),
+    'Memory':(convert.memory_scale, 'GB'),
+    'Power Consumption':(convert.power_scale, 'kW'),
+}
+
+number_text = re.compile(r'^-?[0-9,]*[0-9](\.[0-9]+)?$')
+
+nan = float('nan')
+
+def numberFormat(text):
+    """Get the format code of a number as written in TOP500 (eg. '148,600.00').
+
+    Parameters
+    ----------
+    text : str
+        The number as text.
+
+    Returns
+    -------
+    int
+        The decimals if grouped with commas, -(decimals + 1) if not; None if
+        the text is not a plain number.
+    """
+
+    match = number_text.match(text)
+    if match is None:
+        return None
+
+    decimals = len(match.group(1)) - 1 if match.group(1) else 0
+    return decimals if ',' in text else -(decimals + 1)
+
+def formatNumber(value, code):
+    """Write a number back, using a format code from numberFormat().
+
+    Parameters
+    ----------
+    value : float
+        The number.
+    code : int
+        The format code.
+
+    Returns
+    -------
+    str
+        The number as text.
+    """
+
+    if code >= 0:
+        return '{:,.{}f}'.format(value, code)
+
+    return '{:.{}f}'.format(value, -code - 1)
+
+def flopsScale(header):
+    """Get the factor to GFlops of a Rmax/Rpeak header (eg. 'Rmax (TFlops)')."""
+
+    return convert.flops_scale[convert.rank_header.match(header).group(2)]
+
+def packMonth(year, month):
+    """Pack a list date into a month index."""
+
+    return year * 12 + month - 1
+
+def unpackMonth(packed):
+    """Unpack a month index into (year, month)."""
+
+    return (packed // 12, packed % 12 + 1)
+
+class SystemRecord:
+    """A TOP500 system, with typed fields and a columnar Rank table."""
+
+    __slots__ = ('identifier', 'fields', 'numbers', 'lists', 'ranks', 'rmax', 'rpeak',
+                 'rmax_formats', 'rpeak_formats', 'perf_headers', 'perf_index',
+                 'rank_columns', 'rank_extra', 'odd_rows')
+
+    def __init__(self, identifier):
+        """Parameters
+        ----------
+        identifier : str
+            The TOP500 system identifier.
+        """
+
+        self.identifier = identifier
+        self.fields = {}            # Other main table fields, as text
+        self.numbers = {}           # Field => (value in canonical unit, unit, format code)
+        self.lists = array.array('H')
+        self.ranks = array.array('H')
+        self.rmax = array.array('d')
+        self.rpeak = array.array('d')
+        self.rmax_formats = array.array('b')
+        self.rpeak_formats = array.array('b')
+        self.perf_headers = []      # Distinct (Rmax header, Rpeak header) pairs
+        self.perf_index = array.array('B')
+        self.rank_columns = []      # Other Rank table columns
+        self.rank_extra = []        # One list per column in rank_columns, None if missing
+        self.odd_rows = {}          # Row index => Rank row kept as it came
+
+    # :: Properties
+
+    @property
+    def cores(self):
+        """The number of cores."""
+        return self.number('Cores')
+
+    @property
+    def memory(self):
+        """The memory, in GB."""
+        return self.number('Memory')
+
+    @property
+    def power(self):
+        """The power consumption, in kW."""
+        return self.number('Power Consumption')
+
+    def number(self, field):
+        """Get a numeric main table field; None if missing or not numeric."""
+
+        if field in self.numbers:
+            return self.numbers[field][0]
+
+        scale, unit = numeric_fields[field]
+        if field not in self.fields:
+            return None
+        if scale is None:
+            return convert.parseNumber(self.fields[field])
+        return convert.parseScaled(self.fields[field], scale, unit)
+
+    def listDates(self):
+        """Get the list dates of the Rank table, as (year, month)."""
+
+        return [unpackMonth(packed) for packed in self.lists]
+
+    # :: Conversion
+
+    @classmethod
+    def fromDict(cls, data):
+        """Build a record from a system, as returned by getTOP500Data().
+
+        Parameters
+        ----------
+        data : dict
+            The system data.
+
+        Returns
+        -------
+        SystemRecord
+            The record.
+        """
+
+        record = cls(sys.intern(str(data['ID'])))
+
+        for field, value in data.items():
+            if field in ('ID', 'Rank'):
+                continue
+            if field in numeric_fields and isinstance(value, str) and record.addNumber(field, value):
+                continue
+            record.fields[sys.intern(field)] = sys.intern(value) if isinstance(value, str) else value
+
+        rows = data.get('Rank', [])
+        for row in rows:
+            record.addRow(row)
+
+        for column in record.rank_extra:
+            column.extend([None] * (len(rows) - len(column)))
+
+        return record
+
+    def addNumber(self, field, text):
+        """Store a numeric main table field, if it can be written back as it came.
+
+        Returns
+        -------
+        bool
+            True if stored as number, False if it must be kept as text.
+        """
+
+        scale, default = numeric_fields[field]
+        parts = text.split(' ')
+        if len(parts) > 2 or (scale is None and len(parts) > 1):
+            return False
+
+        code = numberFormat(parts[0])
+        unit = parts[1] if len(parts) > 1 else None
+        if code is None or (scale is not None and scale.get(unit or default) is None):
+            return False
+
+        value = convert.parseNumber(parts[0])
+        if scale is not None:
+            value = value * scale[unit or default]
+
+        self.numbers[sys.intern(field)] = (value, sys.intern(unit) if unit else None, code)
+        if self.numberText(field) != text:
+            del self.numbers[field]
+            return False
+
+        return True
+
+    def numberText(self, field):
+        """Write a numeric main table field back as text."""
+
+        value, unit, code = self.numbers[field]
+        scale, default = numeric_fields[field]
+        if scale is not None:
+            value = value / scale[unit or default]
+        text = formatNumber(value, code)
+
+        return text + ' ' + unit if unit else text
+
+    def addRow(self, row):
+        """Append a Rank table row to the arrays."""
+
+        index = len(self.lists)
+        packed, rank, performance = 0, 0, {}
+
+        try:
+            date = convert.parseListDate(row['List'])
+            packed = packMonth(date.year, date.month)
+            rank = int(row['Rank'])
+
+            for header, value in row.items():
+                match = convert.rank_header.match(header)
+                if match is not None:
+                    code = numberFormat(value)
+                    performance[match.group(1)] = (header, convert.parseNumber(value) * convert.flops_scale[match.group(2)], code)
+
+            headers = (performance['Rmax'][0], performance['Rpeak'][0])
+            if headers not in self.perf_headers:
+                self.perf_headers.append(headers)
+            regular = performance['Rmax'][2] is not None and performance['Rpeak'][2] is not None and 0 < rank < 65536
+
+        except (KeyError, ValueError, TypeError, AttributeError):
+            regular = False
+
+        if regular:
+            self.lists.append(packed)
+            self.ranks.append(rank)
+            self.rmax.append(performance['Rmax'][1])
+            self.rpeak.append(performance['Rpeak'][1])
+            self.rmax_formats.append(performance['Rmax'][2])
+            self.rpeak_formats.append(performance['Rpeak'][2])
+            self.perf_index.append(self.perf_headers.index(headers))
+        else:
+            self.lists.append(0)
+            self.ranks.append(0)
+            self.rmax.append(nan)
+            self.rpeak.append(nan)
+            self.rmax_formats.append(0)
+            self.rpeak_formats.append(0)
+            self.perf_index.append(0)
+
+        for header, value in row.items():
+            if header in ('List', 'Rank') or convert.rank_header.match(header):
+                continue
+            if header not in self.rank_columns:
+                self.rank_columns.append(sys.intern(header))
+                self.rank_extra.append([None] * index)
+            column = self.rank_extra[self.rank_columns.index(header)]
+            column.extend([None] * (index - len(column)))
+            column.append(sys.intern(value) if isinstance(value, str) else value)
+
+        # Keep the row as it came, if it can't be written back from the arrays
+        if not regular or self.rowDict(index) != row:
+            self.odd_rows[index] = dict(row)
+
+    def rowDict(self, index):
+        """Write a Rank table row back as dict (ignoring odd_rows)."""
+
+        year, month = unpackMonth(self.lists[index])
+        rmax_header, rpeak_header = self.perf_headers[self.perf_index[index]]
+        row = {
+            'List':'%02d/%d' % (month, year),
+            'Rank':str(self.ranks[index]),
+            rmax_header:formatNumber(self.rmax[index] / flopsScale(rmax_header), self.rmax_formats[index]),
+            rpeak_header:formatNumber(self.rpeak[index] / flopsScale(rpeak_header), self.rpeak_formats[index]),
+        }
+        for header, column in zip(self.rank_columns, self.rank_extra):
+            if index < len(column) and column[index] is not None:
+                row[header] = column[index]
+
+        return row
+
+    def toDict(self):
+        """Write the record back as returned by getTOP500Data().
+
+        Returns
+        -------
+        dict
+            The system data.
+        """
+
+        data = {'ID':self.identifier}
+        data.update(self.fields)
+        for field in self.numbers:
+            data[field] = self.numberText(field)
+
+        data['Rank'] = [self.odd_rows[index] if index in self.odd_rows else self.rowDict(index)
+                        for index in range(len(self.lists))]
+
+        return data
+
+def loadCorpus(store, batch_size=500):
+    """Load every cached system as records.
+
+    Parameters
+    ----------
+    store : object
+        The cache backend (see cache.py).
+    batch_size : int
+        The amount of systems fetched at once.
+
+    Returns
+    -------
+    dict
+        Pairs of ID=>SystemRecord.
+    """
+
+    corpus = {}
+    for systems in export.scanSystems(store, batch_size):
+        for data in systems:
+            try:
+                record = SystemRecord.fromDict(data)
+                corpus[record.identifier] = record
+            except (KeyError, TypeError, AttributeError):
+                continue
+
+    return corpus
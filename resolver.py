@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+Resolver for the strings missing from slist.py (new CPUs, sites, manufacturers...):
+they are looked up at an offline label index (TSV of label and item, eg.
+extracted from a dump), or else through wbsearchentities.
+
+Every result, found or not, is memoized in the cache at top500-resolve-<sha1>
+for a while, so each distinct string costs one lookup at most across every
+shard and run. The candidates are added to the review set (top500-review),
+so the good ones can be added to slist.py. Only an unambiguous result (one
+candidate labelled exactly as the string) is used for the claims.
+
+Copyright (c) 2019 Davod (Amitie 10g)
+
+Licensed under the MIT license. See LICENSE for details
+"""
+
+# :: Standard libraries
+import csv
+import json
+import time
+import hashlib
+
+prefix = 'top500-resolve-'
+review_key = 'top500-review'
+
+class Resolver:
+    """The resolver."""
+
+    def __init__(self, store, search, flight=None, ttl=30 * 24 * 3600, negative_ttl=7 * 24 * 3600, index_path=None):
+        """Parameters
+        ----------
+        store : object
+            The cache backend (see cache.py).
+        search : callable
+            Looks a string up remotely; returns dicts with 'id' and 'label'
+            (as wbsearchentities does); raises ValueError if fails.
+        flight : callable
+            flight(name, fetch, load), to run a lookup once across workers
+            (see Top500Importer.singleFlight()); None to just run it.
+        ttl : int
+            Seconds a found item is memoized.
+        negative_ttl : int
+            Seconds a string not found is memoized.
+        index_path : str
+            The offline label index, a TSV file of label and item; None if none.
+        """
+
+        self.store = store
+        self.search = search
+        self.flight = flight
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.index = {}
+
+        if index_path:
+            with open(index_path, 'r', encoding='utf-8', newline='') as f:
+                for row in csv.reader(f, delimiter='\t'):
+                    if len(row) >= 2:
+                        self.index.setdefault(row[0], row[1])
+
+    def resolve(self, text):
+        """Get the item of a string.
+
+        Parameters
+        ----------
+        text : str
+            The string missing from slist.py.
+
+        Returns
+        -------
+        str
+            The item; False if not found (or ambiguous).
+        """
+
+        text = str(text).strip()
+        if not text:
+            return False
+
+        if text in self.index:
+            return self.index[text]
+
+        # Memoized: no lookup, nor lease
+        item = self.load(text)
+        if item is not None:
+            return item
+
+        if self.flight is None:
+            return self.lookup(text)
+
+        return self.flight('resolve-' + self.digest(text), lambda: self.lookup(text), lambda: self.load(text))
+
+    @staticmethod
+    def digest(text):
+        """Get the SHA-1 of a string, for the keys."""
+
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def key(self, text):
+        """Get the memo key of a string."""
+
+        return prefix + self.digest(text)
+
+    def load(self, text):
+        """Get the memoized result of a string.
+
+        Returns
+        -------
+        str
+            The item; False if memoized as not found; None if not memoized (or expired).
+        """
+
+        try:
+            memo = json.loads(self.store.get(self.key(text)))
+            ttl = self.ttl if memo['item'] else self.negative_ttl
+            if time.time() - memo['time'] >= ttl:
+                return None
+            return memo['item'] or False
+        except (json.JSONDecodeError, TypeError, KeyError):
+            return None
+
+    def lookup(self, text):
+        """Look a string up remotely, memoize the result and add the candidates
+        to the review set.
+
+        Returns
+        -------
+        str
+            The item; False if not found, ambiguous, or if the lookup fails.
+        """
+
+        try:
+            candidates = [{'id':candidate.get('id'), 'label':candidate.get('label'),
+                           'description':candidate.get('description')} for candidate in self.search(text)]
+        except ValueError:
+            return False
+
+        exact = [candidate['id'] for candidate in candidates if candidate['label'] == text]
+        item = exact[0] if len(exact) == 1 else False
+
+        self.store.set(self.key(text), json.dumps({'item':item or None, 'time':time.time()}))
+        if candidates:
+            self.store.sadd(review_key, json.dumps({'text':text, 'item':item or None, 'candidates':candidates}, sort_keys=True))
+
+        return item
+
+def reviewQueue(store):
+    """Get the strings waiting for review, as dicts with 'text', 'item' and 'candidates'."""
+
+    entries = []
+    for raw in store.smembers(review_key):
+        try:
+            entries.append(json.loads(raw))
+        except (json.JSONDecodeError, TypeError):
+            continue
+
+    return sorted(entries, key=lambda entry: entry['text'])
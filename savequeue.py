@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Background save queue for the Wikibase edits, in the spirit of the
+Pywikibot asynchronous put queue: the edits of every item are queued as
+one task and saved by a single thread, in order, while the next system
+is being fetched and planned. A callback is run once each task is done
+(eg. to update the counters), also in order.
+
+The queue is bounded: once full, queueing waits for the saves.
+
+Copyright (c) 2019 Davod (Amitie 10g)
+
+Licensed under the MIT license. See LICENSE for details
+"""
+
+# :: Standard libraries
+import sys
+import queue
+import threading
+
+class SaveQueue:
+    """The save queue."""
+
+    def __init__(self, backlog=50):
+        """Parameters
+        ----------
+        backlog : int
+            The maximum amount of tasks waiting.
+        """
+
+        self.pending = queue.Queue(maxsize=max(1, int(backlog)))
+        self.drain = True
+        self.thread = threading.Thread(target=self.run, name='save-queue', daemon=True)
+        self.thread.start()
+
+    def put(self, task, callback=None):
+        """Queue a task.
+
+        Parameters
+        ----------
+        task : callable
+            Saves the edits, and returns the result; None to only run the callback
+            once the tasks queued before are done.
+        callback : callable
+            Called with the task result once done.
+        """
+
+        self.pending.put((task, callback))
+
+    def run(self):
+        """Run the tasks, in order, until stopped."""
+
+        while True:
+            entry = self.pending.get()
+            if entry is None:
+                break
+
+            # Stopped without draining: the rest is dropped (and redone by the next run)
+            if not self.drain:
+                continue
+
+            task, callback = entry
+            try:
+                result = task() if task is not None else None
+
+            # Any error (eg. pywikibot APIError) only fails the task: if the thread died,
+            # put() would block forever once the queue is full
+            except Exception as e:
+                sys.stderr.write(type(e).__name__ + ': ' + str(e) + '\n')
+                result = False
+
+            if callback is not None:
+                callback(result)
+
+    def stop(self, drain=True, timeout=None):
+        """Stop the queue.
+
+        Parameters
+        ----------
+        drain : bool
+            If True, run the queued tasks first (for timeout seconds at most,
+            if set); if False, stop after the current one.
+        timeout : float
+            Seconds to drain at most.
+        """
+
+        self.drain = drain
+        self.pending.put(None)
+        self.thread.join(timeout if drain else None)
+
+        if self.thread.is_alive():
+            sys.stderr.write(u'Notice: Drain window over, the queued edits are dropped\n')
+            self.drain = False
+            self.thread.join()
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Single-flight requests across workers sharing a Redis server: when several
+workers miss the cache for the same page at once, only the first one takes
+a short lease (a Redis key set with NX/EX) and requests TOP500; the others
+wait for its result on a pub/sub channel instead of requesting it again.
+
+* top500-lock-<name>: the lease, holding the owner token
+* top500-done-<name>: the channel the result is published to, as JSON
+
+While the owner is requesting (eg. waiting to retry a throttled request),
+the lease is renewed every third of its time; if the owner dies, it expires
+and one of the waiters takes it over.
+
+Copyright (c) 2019 Davod (Amitie 10g)
+
+Licensed under the MIT license. See LICENSE for details
+"""
+
+# :: Standard libraries
+import json
+import time
+import uuid
+import threading
+
+prefix = 'top500-'
+
+# Delete the lease only if still owned (it may have expired and been taken over)
+release_script = '''
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+'''
+
+# Extend the lease only if still owned
+renew_script = '''
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+'''
+
+def keepLease(client, lock, token, lease, done):
+    """Renew a lease every third of its time, until done is set or it is lost."""
+
+    while not done.wait(lease / 3.0):
+        try:
+            if not client.eval(renew_script, 1, lock, token, int(lease)):
+                return
+        except Exception:
+            # Unable to renew (eg. Redis is gone): the lease just expires
+            return
+
+def fetchOnce(client, name, fetch, load, lease=30):
+    """Get a result, requesting it only once across every worker.
+
+    Parameters
+    ----------
+    client : redis.Redis
+        The Redis client.
+    name : str
+        The request name (eg. 'sys-<ID>').
+    fetch : callable
+        Requests and caches the result; must return something JSON serializable.
+    load : callable
+        Gets the cached result; None if not cached yet.
+    lease : int
+        Seconds the lease is held without renewal (and waiters wait before
+        checking it again).
+
+    Returns
+    -------
+    object
+        The result of load() or fetch(), from this or another worker.
+    """
+
+    lock = prefix + 'lock-' + name
+    channel = prefix + 'done-' + name
+    token = uuid.uuid4().hex
+
+    while True:
+        if client.set(lock, token, nx=True, ex=lease):
+            done = threading.Event()
+            renewer = threading.Thread(target=keepLease, args=(client, lock, token, lease, done), daemon=True)
+            renewer.start()
+            try:
+                # Check again, the owner of the previous lease may have cached it
+                result = load()
+                if result is None:
+                    result = fetch()
+                client.publish(channel, json.dumps(result))
+            finally:
+                done.set()
+                renewer.join()
+                client.eval(release_script, 1, lock, token)
+
+            return result
+
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        try:
+            pubsub.subscribe(channel)
+
+            # The result may have been published before subscribing
+            result = load()
+            if result is not None:
+                return result
+
+            deadline = time.time() + lease
+            while time.time() < deadline and client.exists(lock):
+                message = pubsub.get_message(timeout=1.0)
+                if message is not None and message['type'] == 'message':
+                    return json.loads(message['data'])
+        finally:
+            pubsub.close()
+
+        # The lease has been released or has expired without a result: try to take it (or wait again, if renewed)
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""
+Local stand-in for the TOP500 web site, for load and scaling tests of the
+fetch layer without requesting top500.org. It serves /system/<id> and
+/site/<id> pages, either archived (HTML files saved at <archive>/system/<id>.html
+and <archive>/site/<id>.html) or synthetic (generated from the ID, always
+the same for the same ID), with configurable latency, error rate and
+404 density. Request counters are served as JSON at /stats.
+
+Point the importer at it by setting 'top500url' at config.py to the
+printed URL (eg. http://localhost:8500).
+
+Copyright (c) 2019 Davod (Amitie 10g)
+
+Licensed under the MIT license. See LICENSE for details
+
+Usage: python3 standin.py [--port <port>] [--archive <dir>] [--latency <seconds>] [--jitter <seconds>] [--error-rate <0-1>] [--missing <0-1>]
+"""
+
+# :: Standard libraries
+import os
+import re
+import sys
+import json
+import time
+import getopt
+import random
+import hashlib
+import threading
+import socketserver
+import collections
+import http.server
+
+# :: Values for the synthetic pages
+manufacturers = ['HPE', 'IBM', 'Cray/HPE', 'Lenovo', 'Fujitsu', 'NEC', 'Dell EMC', 'Atos']
+processors = ['Intel Xeon E5-2680v2 10C 2.8GHz', 'Intel Xeon Phi 7250F 68C 1.4GHz', 'Opteron 6176 12C 2.3GHz',
+              'Itanium 2 1.44GHz', 'NEC 3.2GHz', 'MIPS 250MHz']
+systems = ['Linux', 'CentOS', 'SUSE Linux Enterprise Server 12', 'AIX', 'Cray Linux Environment']
+platforms = ['Cray XC40', 'ProLiant SL230s', 'BlueGene/Q', 'PRIMERGY CX400', 'SX-ACE']
+
+path_pattern = re.compile(r'^/(system|site)/([0-9]+)/?$')
+
+class Settings:
+    """The stand-in behavior, shared by every request."""
+
+    def __init__(self, archive=None, latency=0.0, jitter=0.0, error_rate=0.0, missing=0.0):
+        """Parameters
+        ----------
+        archive : str
+            The directory of archived pages; None to serve only synthetic pages.
+        latency : float
+            Seconds every response is delayed.
+        jitter : float
+            Extra random delay, up to this many seconds.
+        error_rate : float
+            Fraction of the requests answered with HTTP 503.
+        missing : float
+            Fraction of the IDs answered with HTTP 404 (always the same IDs).
+        """
+
+        self.archive = archive
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.missing = missing
+        self.lock = threading.Lock()
+        self.stats = collections.Counter()
+
+    def count(self, key):
+        """Increase a request counter."""
+
+        with self.lock:
+            self.stats[key] += 1
+
+    def isMissing(self, kind, identifier):
+        """Check if an ID is answered with 404 (a stable fraction of them)."""
+
+        digest = hashlib.sha1((kind + '/' + identifier).encode('utf-8')).digest()
+        return int.from_bytes(digest[:4], 'big') / 4294967296.0 < self.missing
+
+def systemPage(identifier):
+    """Generate a synthetic /system/<id> page, as parsed by fetchTOP500Data()."""
+
+    rnd = random.Random('system-' + identifier)
+    cores = rnd.randint(1, 512) * 1024
+    first = rnd.randint(1993, 2019)
+    rmax = rnd.uniform(0.1, 100000.0)
+
+    main = [('Site', 'Site ' + str(rnd.randint(1, 2000))),
+            ('Manufacturer', rnd.choice(manufacturers)),
+            ('Cores', '{:,}'.format(cores)),
+            ('Memory', '{:,}'.format(cores * 2) + ' GB'),
+            ('Processor', rnd.choice(processors)),
+            ('Interconnect', 'Aries interconnect'),
+            ('Power Consumption', '{:,.2f}'.format(cores / 100.0) + ' kW'),
+            ('Operating System', rnd.choice(systems))]
+
+    rows = []
+    rank = rnd.randint(1, 500)
+    for year in range(first, min(first + rnd.randint(1, 10), 2020)):
+        for month in (6, 11):
+            rows.append(['%02d/%d' % (month, year), str(rank), '{:,}'.format(cores),
+                         '{:,.2f}'.format(rmax), '{:,.2f}'.format(rmax * rnd.uniform(1.1, 2.0))])
+            rank = min(500, rank + rnd.randint(0, 60))
+
+    html = ['<html><head><title>System ' + identifier + ' | TOP500</title></head><body>',
+            '<h1>System ' + identifier + ' - ' + rnd.choice(platforms) + ', ' + rnd.choice(processors) + '</h1>',
+            '<table class="table table-condensed">']
+    html.extend('<tr><th>' + key + ':</th><td>' + value + '</td></tr>' for key, value in main)
+    html.append('</table><table class="table table-responsive">')
+    html.append('<tr><th>List</th><th>Rank</th><th>Cores</th><th>Rmax (TFlops)</th><th>Rpeak (TFlops)</th></tr>')
+    html.extend('<tr>' + ''.join('<td>' + cell + '</td>' for cell in row) + '</tr>' for row in rows)
+    html.append('</table></body></html>')
+
+    return '\n'.join(html)
+
+def sitePage(identifier):
+    """Generate a synthetic /site/<id> page, as parsed by getTOP500SiteData()."""
+
+    rnd = random.Random('site-' + identifier)
+    main = [('Site', 'Site ' + identifier),
+            ('City', 'City ' + str(rnd.randint(1, 500))),
+            ('Country', rnd.choice(['United States', 'Japan', 'China', 'Germany', 'France'])),
+            ('Segment', rnd.choice(['Research', 'Academic', 'Industry', 'Government'])),
+            ('URL', 'https://example.org/' + identifier)]
+
+    html = ['<html><head><title>Site ' + identifier + ' | TOP500</title></head><body>',
+            '<h1>Site ' + identifier + '</h1>',
+            '<table class="table table-condensed">']
+    html.extend('<tr><th>' + key + ':</th><td>' + value + '</td></tr>' for key, value in main)
+    html.append('</table></body></html>')
+
+    return '\n'.join(html)
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    """Answer the requests, as set at server.settings."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        """Serve a page, an error, or the counters."""
+
+        settings = self.server.settings
+
+        if self.path == '/stats':
+            with settings.lock:
+                return self.reply(200, json.dumps(dict(settings.stats)), 'application/json')
+
+        match = path_pattern.match(self.path)
+        if match is None:
+            settings.count('404')
+            return self.reply(404, 'Not found')
+
+        kind, identifier = match.group(1), match.group(2)
+        settings.count('requests')
+        settings.count(kind + '/' + identifier)
+
+        time.sleep(settings.latency + random.uniform(0, settings.jitter))
+
+        if random.random() < settings.error_rate:
+            settings.count('503')
+            return self.reply(503, 'Service unavailable')
+
+        if settings.isMissing(kind, identifier):
+            settings.count('404')
+            return self.reply(404, 'Not found')
+
+        page = None
+        if settings.archive:
+            try:
+                with open(os.path.join(settings.archive, kind, identifier + '.html'), encoding='utf-8') as f:
+                    page = f.read()
+            except (OSError, IOError):
+                pass
+
+        if page is None:
+            page = systemPage(identifier) if kind == 'system' else sitePage(identifier)
+
+        settings.count('200')
+        return self.reply(200, page)
+
+    def reply(self, status, body, content_type='text/html; charset=utf-8'):
+        """Send a response."""
+
+        body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Don't log every request."""
+
+        pass
+
+class Server(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    """HTTP server answering every request in a thread of its own."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+def serve(port=8500, settings=None):
+    """Run the stand-in until interrupted.
+
+    Parameters
+    ----------
+    port : int
+        The port to listen at (localhost).
+    settings : Settings
+        The behavior; None for the defaults.
+    """
+
+    server = Server(('localhost', port), Handler)
+    server.settings = settings or Settings()
+    print(u'Serving the TOP500 stand-in at http://localhost:' + str(port) + ' (set it as top500url at config.py)\n')
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == '__main__':
+    usage = 'Usage: python3 standin.py [--port <port>] [--archive <dir>] [--latency <seconds>] [--jitter <seconds>] [--error-rate <0-1>] [--missing <0-1>]\n'
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], '', ['port=', 'archive=', 'latency=', 'jitter=', 'error-rate=', 'missing='])
+        options = dict(opts)
+        port = int(options.get('--port', 8500))
+        settings = Settings(options.get('--archive'),
+                            float(options.get('--latency', 0)),
+                            float(options.get('--jitter', 0)),
+                            float(options.get('--error-rate', 0)),
+                            float(options.get('--missing', 0)))
+    except (getopt.GetoptError, ValueError):
+        print(usage)
+        sys.exit(1)
+
+    serve(port, settings)